@@ -0,0 +1,240 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from crowd_counters import HALF_LIFE_SECS, MAX_KEYS, cold_cutoff, decayed
+
+# =====================================================
+# CONFIG
+# =====================================================
+STATE_DB_PATH = "footpath_state.db"   # runtime state, kept apart from the read-only route data
+MAX_RETRIES = 200
+SETUP_TIMEOUT_SECS = 30     # schema and pragmas may wait on other writers; increments retry instead
+PRUNE_EVERY = 1000    # writes per process between sweeps of cold keys
+
+
+# =====================================================
+# SHARED PATH ASSIGNMENT COUNTERS
+# =====================================================
+# Every Streamlit session, worker thread and worker process talks to the same
+# SQLite file in WAL mode, so readers never block the writer and each
+# increment is a single short UPSERT transaction.
+# Besides the lifetime assign_count, each path keeps an exponentially decayed
+# live_load (see crowd_counters.py) so that old assignments stop penalising it.
+# prune() drops cold paths to stay inside the memory budget; their counts are
+# folded into assignment_totals first, so total() stays a lifetime figure
+# while counts()/get() of a pruned path start again from zero.
+class AssignmentEngine:
+    def __init__(self, db_path=STATE_DB_PATH, half_life=HALF_LIFE_SECS,
+                 max_keys=MAX_KEYS, clock=time.time):
+        self.db_path = os.path.abspath(db_path)
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self.clock = clock
+        self._local = threading.local()
+        self._writes = 0
+        conn = sqlite3.connect(self.db_path, timeout=SETUP_TIMEOUT_SECS, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL;")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS path_assignments (
+                station_name   TEXT    NOT NULL,
+                start_location TEXT    NOT NULL,
+                end_location   TEXT    NOT NULL,
+                path_name      TEXT    NOT NULL,
+                assign_count   INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (station_name, start_location, end_location, path_name)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS assignment_totals (
+                id            INTEGER PRIMARY KEY CHECK (id = 0),
+                retired_count INTEGER NOT NULL DEFAULT 0
+            );
+            INSERT OR IGNORE INTO assignment_totals (id) VALUES (0);
+        """)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(path_assignments);")}
+        if "live_load" not in columns:
+            conn.executescript("""
+                ALTER TABLE path_assignments ADD COLUMN live_load REAL NOT NULL DEFAULT 0;
+                ALTER TABLE path_assignments ADD COLUMN updated_at REAL NOT NULL DEFAULT 0;
+            """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_path_assignments_age "
+            "ON path_assignments (updated_at);"
+        )
+        conn.close()
+
+    def _connection(self):
+        # sqlite3 handles are cheap to keep but must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # busy_timeout 0 once set up: contention is handled by _write() with
+            # short, jittered retries instead of SQLite's busy handler, whose
+            # sleeps grow to 100 ms and line waiting writers up behind each other
+            conn = sqlite3.connect(self.db_path, timeout=SETUP_TIMEOUT_SECS,
+                                   isolation_level=None)
+            conn.execute("PRAGMA synchronous = NORMAL;")
+            conn.execute("PRAGMA busy_timeout = 0;")
+            half_life = self.half_life
+            conn.create_function(
+                "decayed", 3,
+                lambda value, updated_at, now: decayed(value, updated_at, now, half_life),
+                deterministic=True
+            )
+            self._local.conn = conn
+        return conn
+
+    def _write(self, fn):
+        conn = self._connection()
+        delay = 0.0002
+        for _ in range(MAX_RETRIES):
+            try:
+                conn.execute("BEGIN IMMEDIATE;")
+            except sqlite3.OperationalError as exc:
+                if "locked" not in str(exc) and "busy" not in str(exc):
+                    raise
+                time.sleep(delay * random.random())
+                delay = min(delay * 2, 0.01)
+                continue
+            try:
+                result = fn(conn)
+                conn.execute("COMMIT;")
+                return result
+            except Exception:
+                conn.execute("ROLLBACK;")
+                raise
+        raise sqlite3.OperationalError("assignment engine: database stayed locked")
+
+    UPSERT_SQL = """
+        INSERT INTO path_assignments
+            (station_name, start_location, end_location, path_name,
+             assign_count, live_load, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (station_name, start_location, end_location, path_name)
+        DO UPDATE SET
+            assign_count = assign_count + excluded.assign_count,
+            live_load = decayed(live_load, updated_at, excluded.updated_at) + excluded.live_load,
+            updated_at = MAX(updated_at, excluded.updated_at)
+    """
+
+    def record(self, station_name, start_location, end_location, path_name, n=1, now=None):
+        # atomic increment; returns the new lifetime count for this path
+        now = self.clock() if now is None else now
+
+        def upsert(conn):
+            return conn.execute(
+                self.UPSERT_SQL + " RETURNING assign_count;",
+                (station_name, start_location, end_location, path_name, n, n, now)
+            ).fetchone()[0]
+        result = self._write(upsert)
+        self._after_writes(1)
+        return result
+
+    def record_many(self, keys, now=None):
+        # group commit: one transaction for a whole batch of assignments
+        now = self.clock() if now is None else now
+        rows = [(*key, 1, 1, now) for key in keys]
+
+        def upsert_all(conn):
+            conn.executemany(self.UPSERT_SQL + ";", rows)
+            return len(rows)
+        result = self._write(upsert_all)
+        self._after_writes(len(rows))
+        return result
+
+    def _after_writes(self, n):
+        # amortised housekeeping keeps the table inside the memory budget
+        # without a per-event cost that grows with traffic
+        self._writes += n
+        if self._writes >= PRUNE_EVERY:
+            self._writes = 0
+            self.prune()
+
+    def prune(self, now=None):
+        now = self.clock() if now is None else now
+
+        def retire(conn, rows_sql, params):
+            # keep the lifetime total of the rows about to be deleted
+            conn.execute(
+                "UPDATE assignment_totals SET retired_count = retired_count + "
+                "(SELECT COALESCE(SUM(assign_count), 0) FROM (" + rows_sql + "));",
+                params
+            )
+
+        def sweep(conn):
+            # a range on idx_path_assignments_age, so the write lock is held
+            # for the rows removed rather than a scan of the whole table
+            cutoff = (cold_cutoff(now, self.half_life),)
+            retire(conn, "SELECT assign_count FROM path_assignments WHERE updated_at < ?", cutoff)
+            removed = conn.execute(
+                "DELETE FROM path_assignments WHERE updated_at < ?;", cutoff
+            ).rowcount
+            # still over budget: drop the least recently assigned paths
+            overflow = conn.execute("SELECT COUNT(*) FROM path_assignments;").fetchone()[0] \
+                - self.max_keys
+            if overflow > 0:
+                retire(conn, "SELECT assign_count FROM path_assignments "
+                             "ORDER BY updated_at LIMIT ?", (overflow,))
+                removed += conn.execute(
+                    """
+                    DELETE FROM path_assignments
+                    WHERE (station_name, start_location, end_location, path_name) IN (
+                        SELECT station_name, start_location, end_location, path_name
+                        FROM path_assignments ORDER BY updated_at LIMIT ?
+                    );
+                    """,
+                    (overflow,)
+                ).rowcount
+            return removed
+        return self._write(sweep)
+
+    def counts(self, station_name, start_location, end_location):
+        # all paths of one source/destination pair in a single index range read
+        rows = self._connection().execute(
+            """
+            SELECT path_name, assign_count
+            FROM path_assignments
+            WHERE station_name = ? AND start_location = ? AND end_location = ?;
+            """,
+            (station_name, start_location, end_location)
+        ).fetchall()
+        return dict(rows)
+
+    def get(self, station_name, start_location, end_location, path_name):
+        return self.counts(station_name, start_location, end_location).get(path_name, 0)
+
+    def loads(self, station_name, start_location, end_location, now=None):
+        # time-decayed load per path – what the live crowd estimate should use
+        now = self.clock() if now is None else now
+        rows = self._connection().execute(
+            """
+            SELECT path_name, live_load, updated_at
+            FROM path_assignments
+            WHERE station_name = ? AND start_location = ? AND end_location = ?;
+            """,
+            (station_name, start_location, end_location)
+        ).fetchall()
+        return {
+            path: decayed(load, updated_at, now, self.half_life)
+            for path, load, updated_at in rows
+        }
+
+    def total(self):
+        # lifetime assignments, including those of pruned paths
+        row = self._connection().execute(
+            "SELECT (SELECT COALESCE(SUM(assign_count), 0) FROM path_assignments) "
+            "+ (SELECT retired_count FROM assignment_totals);"
+        ).fetchone()
+        return row[0]
+
+    def reset(self):
+        def clear(conn):
+            conn.execute("DELETE FROM path_assignments;")
+            conn.execute("UPDATE assignment_totals SET retired_count = 0;")
+        self._write(clear)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
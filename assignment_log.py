@@ -0,0 +1,289 @@
+import argparse
+import atexit
+import glob
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+
+import metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:         # only compaction needs it; logging works without
+    pa = pq = None
+
+# =====================================================
+# CONFIG
+# =====================================================
+LOG_DIR = os.environ.get("FOOTPATH_ASSIGNMENT_LOG", "assignment_log")
+EXPORT_DIR = os.path.join(LOG_DIR, "parquet")
+BATCH_SIZE = 4096               # records per group commit...
+FLUSH_EVERY_SECS = 0.2          # ...or whatever arrived within this long
+SEGMENT_BYTES = 64 * 1024 * 1024
+SEGMENT_SECS = 60 * 60          # a segment is sealed after an hour even if small
+ORPHAN_SECS = 3 * SEGMENT_SECS  # an open segment untouched this long lost its writer
+QUEUE_SIZE = 100_000            # back-pressure only if the disk stalls for a long time
+
+OPEN_SUFFIX = ".jsonl.open"
+SEALED_SUFFIX = ".jsonl"
+SEGMENT_RE = re.compile(r"assignments-\d{8}-\d{6}-(\d+)-\d+" + re.escape(OPEN_SUFFIX) + "$")
+
+FIELDS = ("ts", "station", "start", "end", "path", "live_crowd", "live_time")
+
+
+# =====================================================
+# APPEND-ONLY LOG (group commit on a background thread)
+# =====================================================
+# append() only puts the record on a queue, so the request path never waits
+# for the disk. One writer thread per process drains the queue in batches:
+# a batch is written as JSON lines and fsync'ed once. Each process writes
+# its own segment files, so several workers never interleave lines; full or
+# old segments are renamed from *.jsonl.open to *.jsonl ("sealed") and are
+# then ready for compaction.
+class AssignmentLog:
+    def __init__(self, log_dir=LOG_DIR, batch_size=BATCH_SIZE,
+                 flush_every=FLUSH_EVERY_SECS, clock=time.time):
+        self.log_dir = os.path.abspath(log_dir)
+        os.makedirs(self.log_dir, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_every = flush_every
+        self.clock = clock
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(QUEUE_SIZE)
+        self._file = None
+        self._segment_started = 0.0
+        self._seq = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="assignment-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def append(self, station_name, start_location, end_location, path_name,
+               live_crowd, live_time, ts=None):
+        record = (self.clock() if ts is None else ts, station_name, start_location,
+                  end_location, path_name, live_crowd, live_time)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1       # never block a request on the log
+            metrics.inc("assignment_log_dropped_total")
+
+    def append_many(self, records):
+        for record in records:
+            self.append(*record)
+
+    # ---------------- writer thread ----------------
+    def _run(self):
+        # queue items: record tuples, flush markers (Events) and None to stop
+        stop = False
+        while not stop:
+            batch, markers = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_every
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                if stop or markers or len(batch) >= self.batch_size:
+                    break
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as exc:
+                    self._recover(batch, exc)
+            for marker in markers:
+                marker.set()
+        try:
+            self._seal()
+        except OSError as exc:
+            self._report(exc)
+
+    def _write(self, batch):
+        now = self.clock()
+        if self._file is not None and (self._file.tell() >= SEGMENT_BYTES
+                                       or now - self._segment_started >= SEGMENT_SECS):
+            self._seal()
+        if self._file is None:
+            self._seq += 1
+            name = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+            path = os.path.join(self.log_dir, f"assignments-{name}-{os.getpid()}-{self._seq}{OPEN_SUFFIX}")
+            self._file = open(path, "ab")
+            self._segment_started = now
+        lines = []
+        for record in batch:
+            row = dict(zip(FIELDS, record))
+            row["live_crowd"] = None if row["live_crowd"] is None else int(row["live_crowd"])
+            row["live_time"] = None if row["live_time"] is None else float(row["live_time"])
+            lines.append(json.dumps(row, ensure_ascii=False))
+        self._file.write(("\n".join(lines) + "\n").encode("utf-8"))
+        self._file.flush()
+        os.fsync(self._file.fileno())       # one fsync per batch: the group commit
+        self.written += len(batch)
+        metrics.inc("assignment_log_written_total", len(batch))
+
+    def _seal(self):
+        if self._file is None:
+            return
+        path = self._file.name
+        file, self._file = self._file, None
+        file.close()
+        try:
+            os.replace(path, path[:-len(OPEN_SUFFIX)] + SEALED_SUFFIX)
+        except FileNotFoundError:
+            pass                    # already sealed (seal_orphans) or removed
+
+    def _recover(self, batch, exc):
+        # a failed write (disk full, fsync error, segment gone) loses this
+        # batch, never the writer: the next batch starts a fresh segment
+        self._report(exc)
+        self.dropped += len(batch)
+        metrics.inc("assignment_log_dropped_total", len(batch))
+        try:
+            self._seal()
+        except OSError:
+            self._file = None
+
+    def _report(self, exc):
+        metrics.inc("assignment_log_errors_total")
+        print(f"assignment log: write failed in {self.log_dir}: {exc!r}", file=sys.stderr)
+
+    def flush(self, timeout=10.0):
+        # wait until everything appended so far is on disk (benchmarks, shutdown)
+        marker = threading.Event()
+        self._queue.put(marker)
+        return marker.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=30)
+
+
+# =====================================================
+# COMPACTION (sealed JSON segments -> date-partitioned Parquet)
+# =====================================================
+# Output is Hive-style: <out>/date=YYYY-MM-DD/<segment>.parquet, so pandas,
+# pyarrow.dataset, DuckDB or Spark can prune by date without touching the
+# serving databases. Each segment maps to one deterministically named file
+# per date, written to a temp file and renamed before the segment is
+# removed – rerunning after a crash rewrites the same files, never duplicates.
+SCHEMA_FIELDS = (("ts", "float64"), ("station", "string"), ("start", "string"),
+                 ("end", "string"), ("path", "string"), ("live_crowd", "int32"),
+                 ("live_time", "float64"))
+
+
+def arrow_schema():
+    return pa.schema([(name, getattr(pa, kind)()) for name, kind in SCHEMA_FIELDS])
+
+
+def read_segment(path):
+    rows, skipped = [], 0
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+                values = tuple(row.get(name) for name in FIELDS)
+                if not isinstance(values[0], (int, float)):
+                    raise ValueError("no timestamp")
+            except (ValueError, AttributeError):
+                skipped += 1        # torn last line of a crashed writer
+                continue
+            rows.append(values)
+    return rows, skipped
+
+
+def writer_alive(path):
+    # the writer's pid is part of the segment name; a quiet but live writer
+    # still owns its segment however old it is
+    match = SEGMENT_RE.search(os.path.basename(path))
+    if match is None:
+        return False
+    try:
+        os.kill(int(match.group(1)), 0)
+    except PermissionError:
+        return True                 # alive, owned by another user
+    except (ProcessLookupError, OverflowError):
+        return False
+    return True
+
+
+def seal_orphans(log_dir=LOG_DIR, now=None):
+    # open segments whose writer died (no writes for ORPHAN_SECS) are sealed as is
+    now = time.time() if now is None else now
+    sealed = 0
+    for path in glob.glob(os.path.join(log_dir, f"*{OPEN_SUFFIX}")):
+        try:
+            idle = now - os.path.getmtime(path)
+        except FileNotFoundError:
+            continue                # sealed by its writer meanwhile
+        if idle >= ORPHAN_SECS and not writer_alive(path):
+            os.replace(path, path[:-len(OPEN_SUFFIX)] + SEALED_SUFFIX)
+            sealed += 1
+    return sealed
+
+
+def compact(log_dir=LOG_DIR, out_dir=EXPORT_DIR, keep_segments=False):
+    if pa is None:
+        raise RuntimeError("compaction needs pyarrow (pip install pyarrow)")
+    seal_orphans(log_dir)
+    schema = arrow_schema()
+    segments = sorted(glob.glob(os.path.join(log_dir, f"*{SEALED_SUFFIX}")))
+    records = skipped = 0
+    for segment in segments:
+        rows, bad = read_segment(segment)
+        skipped += bad
+        by_date = {}
+        for row in rows:
+            day = time.strftime("%Y-%m-%d", time.localtime(row[0]))
+            by_date.setdefault(day, []).append(row)
+        stem = os.path.basename(segment)[:-len(SEALED_SUFFIX)]
+        for day, day_rows in by_date.items():
+            columns = list(zip(*day_rows))
+            table = pa.table({name: pa.array(columns[i], type=schema.field(name).type)
+                              for i, name in enumerate(FIELDS)}, schema=schema)
+            part_dir = os.path.join(out_dir, f"date={day}")
+            os.makedirs(part_dir, exist_ok=True)
+            target = os.path.join(part_dir, f"{stem}.parquet")
+            tmp = f"{target}.{os.getpid()}.tmp"
+            pq.write_table(table, tmp, compression="zstd")
+            os.replace(tmp, target)
+        records += len(rows)
+        if not keep_segments:
+            os.remove(segment)
+    return len(segments), records, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact the assignment log into Parquet.")
+    parser.add_argument("--log-dir", default=LOG_DIR)
+    parser.add_argument("--out", default=None, help="default: <log-dir>/parquet")
+    parser.add_argument("--keep-segments", action="store_true")
+    args = parser.parse_args()
+
+    out_dir = args.out or os.path.join(args.log_dir, "parquet")
+    t0 = time.perf_counter()
+    segments, records, skipped = compact(args.log_dir, out_dir, args.keep_segments)
+    print(f"✅ Compacted {records:,} assignments from {segments} segments into {out_dir} "
+          f"in {time.perf_counter() - t0:.2f} s ({skipped} malformed lines skipped)")
+
+
+if __name__ == "__main__":
+    main()
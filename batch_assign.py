@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+# =====================================================
+# CONFIG
+# =====================================================
+BASE_CROWD_RANGE = (30, 70)     # random background crowd (%) when no footfall is observed
+CROWD_PER_ASSIGNMENT = 8        # +8% per recent assignment on the same path
+CROWD_CLIP = (5, 95)
+PATTERN_JITTER = 15             # ± spread of the per-slot crowd pattern
+
+
+# =====================================================
+# LIVE CROWD / TIME (single request, vectorised over paths)
+# =====================================================
+def live_crowd(base_random, load):
+    crowd = base_random + np.asarray(load, dtype=float) * CROWD_PER_ASSIGNMENT
+    return np.clip(crowd, *CROWD_CLIP).astype(int)
+
+
+def live_time(base_time, crowd):
+    return np.round(np.asarray(base_time, dtype=float) * (1 + np.asarray(crowd) / 100), 1)
+
+
+def live_routes(base_df, path_loads=None, rng=np.random, observed_crowd=None):
+    # the results-stage table: one draw per path instead of an iterrows loop;
+    # paths with sensor footfall (observed_crowd, %) use it instead of the draw
+    path_loads = path_loads or {}
+    df_live = base_df.copy()
+    base_random = rng.randint(*BASE_CROWD_RANGE, size=len(df_live))
+    if observed_crowd:
+        observed = [observed_crowd.get(path) for path in df_live["Path"]]
+        base_random = np.array([r if o is None else o for r, o in zip(base_random, observed)])
+    loads = [path_loads.get(path, 0.0) for path in df_live["Path"]]
+    crowd = live_crowd(base_random, loads)
+    df_live["Live Crowd (%)"] = [f"{c}%" for c in crowd]
+    df_live["Live Estimated Time (mins)"] = live_time(df_live["Base Time (mins)"], crowd)
+    return df_live
+
+
+# =====================================================
+# PATH CHOICE POLICY (dashboard results stage and /assign)
+# =====================================================
+# A path is scored by its expected time over the walk – today's crowd fading
+# into the learned profile (crowd_forecast.py) – or by its live time when
+# there is no forecaster, and the lowest score wins. One row per request;
+# padded columns have an infinite base time and never win.
+def expected_times(pair_keys, path_names, base_time, crowd, forecaster=None):
+    base_time = np.asarray(base_time, dtype=float)
+    if forecaster is not None:
+        # every request and path of the round in one forecaster pass
+        crowd = forecaster.expected_crowd_many(pair_keys, path_names, base_time, crowd)
+    return live_time(base_time, crowd)
+
+
+def crowd_patterns(paths, crowd, num_slots, rng=np.random):
+    # per-path crowd pattern over the day, all paths in one draw
+    crowd = np.asarray(crowd, dtype=int)
+    jitter = rng.randint(-PATTERN_JITTER, PATTERN_JITTER + 1, size=(len(crowd), num_slots))
+    patterns = np.clip(crowd[:, None] + jitter, 0, 100)
+    return dict(zip(paths, patterns))
+
+
+# =====================================================
+# BATCH ASSIGNMENT (many requests at once)
+# =====================================================
+def assign_batch(requests, route_lookup, engine=None, record=True, rng=None,
+                 observed=None, forecaster=None):
+    # requests: iterable of (station, start, end)
+    # route_lookup: (station, start, end) -> frame with "Path" / "Base Time (mins)",
+    #     e.g. RouteEngine.routes_df
+    # engine: optional AssignmentEngine or SegmentCongestion – seeds the
+    #     decayed per-path load and receives the new assignments as one group
+    #     commit; a SegmentCongestion also says how much routes of a pair
+    #     overlap, so an assignment raises the load of the routes it shares
+    #     segments with
+    # observed: optional (station, start, end) -> {path: crowd %} from sensor
+    #     footfall, e.g. FootfallIngestor.path_crowd; replaces the random draw
+    # forecaster: optional CrowdForecaster for expected_times()
+    #
+    # Requests for the same (station, start, end) must see each other's load,
+    # so the batch is processed in rounds: round r assigns the r-th request of
+    # every distinct pair at once as a single (pairs × paths) NumPy step.
+    rng = np.random.default_rng() if rng is None else rng
+    requests = [tuple(r) for r in requests]
+    n = len(requests)
+    columns = ["Station", "Start", "End", "Path", "Live Crowd (%)", "Live Estimated Time (mins)",
+               "Expected Time (mins)"]
+    if n == 0:
+        return pd.DataFrame(columns=columns)
+
+    # ---------- columnar route arrays, padded to (pairs × max paths) ----------
+    pairs, pair_of = {}, np.empty(n, dtype=np.int64)
+    for i, req in enumerate(requests):
+        pair_of[i] = pairs.setdefault(req, len(pairs))
+    pair_keys = list(pairs)
+    frames = [route_lookup(*key) for key in pair_keys]
+    counts = np.array([0 if f is None else len(f) for f in frames], dtype=np.int64)
+    width = max(1, int(counts.max()))
+
+    base_time = np.full((len(pair_keys), width), np.inf)
+    load = np.zeros((len(pair_keys), width))
+    seen = np.full((len(pair_keys), width), -1)     # observed crowd %, -1 = none
+    share = np.broadcast_to(np.eye(width), (len(pair_keys), width, width)).copy()
+    overlap = getattr(engine, "overlap", None)
+    path_names = np.full((len(pair_keys), width), None, dtype=object)
+    for k, (key, frame) in enumerate(zip(pair_keys, frames)):
+        if not counts[k]:
+            continue
+        base_time[k, :counts[k]] = frame["Base Time (mins)"].to_numpy(dtype=float)
+        path_names[k, :counts[k]] = frame["Path"].to_numpy()
+        if observed is not None:
+            crowd_of = observed(*key)
+            seen[k, :counts[k]] = [crowd_of.get(p, -1) for p in path_names[k, :counts[k]]]
+        if engine is not None:
+            loads = engine.loads(*key)
+            load[k, :counts[k]] = [loads.get(p, 0.0) for p in path_names[k, :counts[k]]]
+            if overlap is not None:
+                share[k, :counts[k], :counts[k]] = overlap(*key, list(path_names[k, :counts[k]]))
+
+    # ---------- rank of each request within its pair ----------
+    order = np.argsort(pair_of, kind="stable")
+    sorted_pairs = pair_of[order]
+    group_start = np.r_[0, np.flatnonzero(np.diff(sorted_pairs)) + 1]
+    group_len = np.diff(np.r_[group_start, n])
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n) - np.repeat(group_start, group_len)
+
+    best = np.full(n, -1, dtype=np.int64)
+    crowd_out = np.zeros(n, dtype=int)
+    time_out = np.full(n, np.nan)
+    expected_out = np.full(n, np.nan)
+    routed = np.flatnonzero(counts[pair_of] > 0)
+    by_rank = routed[np.argsort(rank[routed], kind="stable")]
+    bounds = np.r_[0, np.cumsum(np.bincount(rank[routed], minlength=1))]
+    for r in range(len(bounds) - 1):
+        idx = by_rank[bounds[r]:bounds[r + 1]]
+        if idx.size == 0:
+            continue
+        k = pair_of[idx]
+        base_random = rng.integers(*BASE_CROWD_RANGE, size=(idx.size, width))
+        base_random = np.where(seen[k] >= 0, seen[k], base_random)
+        crowd = live_crowd(base_random, load[k])
+        times = live_time(base_time[k], crowd)
+        expected = expected_times([pair_keys[i] for i in k], path_names[k], base_time[k],
+                                  crowd, forecaster)
+        choice = np.argmin(expected, axis=1)
+        rows = np.arange(idx.size)
+        best[idx] = choice
+        crowd_out[idx] = crowd[rows, choice]
+        time_out[idx] = times[rows, choice]
+        expected_out[idx] = expected[rows, choice]
+        # congestion feedback for the next round (pairs are unique per round)
+        load[k] += share[k, choice]
+
+    assigned = np.flatnonzero(best >= 0)
+    paths = np.full(n, None, dtype=object)
+    paths[assigned] = path_names[pair_of[assigned], best[assigned]]
+    if engine is not None and record and assigned.size:
+        engine.record_many(requests[i] + (paths[i],) for i in assigned)
+
+    return pd.DataFrame({
+        "Station": [r[0] for r in requests],
+        "Start": [r[1] for r in requests],
+        "End": [r[2] for r in requests],
+        "Path": pd.Series(paths, dtype=object),     # None stays None, not NaN
+        "Live Crowd (%)": np.where(best >= 0, crowd_out, 0),
+        "Live Estimated Time (mins)": time_out,
+        "Expected Time (mins)": expected_out,
+    }, columns=columns)
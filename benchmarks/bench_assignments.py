@@ -0,0 +1,104 @@
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assignment_engine import AssignmentEngine
+
+# Multi-process stress test for the shared assignment engine: every worker
+# hammers the same small set of paths, then the final counts are checked
+# against the exact number of increments each path received.
+
+STATION = "Majestic (Kempegowda Interchange)"
+
+
+def path_key(i, num_paths):
+    p = i % num_paths
+    return (STATION, "Entry A", f"Platform {p % 4 + 1}", f"Route {p + 1}")
+
+
+def worker(db_path, worker_id, per_worker, num_paths, batch, start_event, results):
+    engine = AssignmentEngine(db_path)
+    start_event.wait()
+    t0 = time.perf_counter()
+    if batch > 1:
+        for lo in range(0, per_worker, batch):
+            hi = min(lo + batch, per_worker)
+            engine.record_many(path_key(worker_id + i, num_paths) for i in range(lo, hi))
+    else:
+        for i in range(per_worker):
+            engine.record(*path_key(worker_id + i, num_paths))
+    results.put(time.perf_counter() - t0)
+    engine.close()
+
+
+def expected_counts(workers, per_worker, num_paths):
+    expected = {}
+    for w in range(workers):
+        for i in range(per_worker):
+            key = path_key(w + i, num_paths)
+            expected[key] = expected.get(key, 0) + 1
+    return expected
+
+
+def run(workers, per_worker, num_paths, batch):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "state.db")
+        AssignmentEngine(db_path).close()
+
+        start_event = mp.Event()
+        results = mp.Queue()
+        procs = [
+            mp.Process(target=worker,
+                       args=(db_path, w, per_worker, num_paths, batch, start_event, results))
+            for w in range(workers)
+        ]
+        for p in procs:
+            p.start()
+        t0 = time.perf_counter()
+        start_event.set()
+        for p in procs:
+            p.join()
+        wall = time.perf_counter() - t0
+        per_proc = [results.get() for _ in procs]
+
+        engine = AssignmentEngine(db_path)
+        expected = expected_counts(workers, per_worker, num_paths)
+        wrong = []
+        for key, count in expected.items():
+            got = engine.get(*key)
+            if got != count:
+                wrong.append((key, count, got))
+        total = engine.total()
+        engine.close()
+
+    n = workers * per_worker
+    print(f"workers={workers} assignments={n} paths={num_paths} batch={batch}")
+    print(f"  wall time      : {wall:.2f} s")
+    print(f"  throughput     : {n / wall:,.0f} assignments/s")
+    print(f"  slowest worker : {max(per_proc):.2f} s")
+    print(f"  total counted  : {total} (expected {n})")
+    if wrong or total != n:
+        for key, count, got in wrong[:10]:
+            print(f"  ❌ {key}: expected {count}, got {got}")
+        sys.exit(1)
+    print("  ✅ counts are exact under contention")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress the shared path assignment engine.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--per-worker", type=int, default=5000)
+    parser.add_argument("--paths", type=int, default=16)
+    parser.add_argument("--batch", type=int, default=1,
+                        help="assignments per transaction (1 = one commit per assignment)")
+    args = parser.parse_args()
+    run(args.workers, args.per_worker, args.paths, args.batch)
+
+
+if __name__ == "__main__":
+    main()
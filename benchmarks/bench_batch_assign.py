@@ -0,0 +1,91 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import footpath_db
+import station_graph
+from batch_assign import assign_batch
+
+# Throughput of batch_assign.assign_batch against the per-row results-stage
+# code it replaces (iterrows + np.random.randint + a counts dict).
+
+
+def per_row_assign(requests, route_lookup):
+    path_assign_count = {}
+    assigned = []
+    for station_name, start_loc, end_loc in requests:
+        base_df = route_lookup(station_name, start_loc, end_loc)
+        if base_df is None or base_df.empty:
+            assigned.append(None)
+            continue
+        df_live = base_df.copy()
+        live_crowd_list = []
+        for _, row in df_live.iterrows():
+            key = (station_name, start_loc, end_loc, row["Path"])
+            crowd = np.random.randint(30, 70) + path_assign_count.get(key, 0) * 8
+            live_crowd_list.append(int(np.clip(crowd, 5, 95)))
+        df_live["Live Crowd (%)"] = [f"{c}%" for c in live_crowd_list]
+        df_live["Live Estimated Time (mins)"] = (
+            df_live["Base Time (mins)"] * (1 + (np.array(live_crowd_list) / 100))
+        ).round(1)
+        best = df_live.loc[df_live["Live Estimated Time (mins)"].astype(float).idxmin()]
+        key = (station_name, start_loc, end_loc, best["Path"])
+        path_assign_count[key] = path_assign_count.get(key, 0) + 1
+        assigned.append(best["Path"])
+    return assigned
+
+
+def sample_requests(db, n, hot_pairs, seed=0):
+    rows = db.query_rows("""
+        SELECT s.station_name, a.location_name, b.location_name
+        FROM station_index s
+        JOIN station_locations a ON a.station_id = s.station_id
+        JOIN station_locations b ON b.station_id = s.station_id
+        WHERE a.location_id != b.location_id;
+    """)
+    rnd = random.Random(seed)
+    pool = rnd.sample(rows, min(hot_pairs, len(rows)))
+    return [rnd.choice(pool) for _ in range(n)]
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch assignment throughput benchmark.")
+    parser.add_argument("--db", default=footpath_db.DB_PATH)
+    parser.add_argument("--requests", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--hot-pairs", type=int, default=200,
+                        help="distinct (station, start, end) pairs the requests draw from")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    db = footpath_db.DataAccess(args.db)
+    engine = station_graph.RouteEngine(db)
+    rng = np.random.default_rng(0)
+
+    print(f"{'requests':>9} {'per-row req/s':>15} {'batch req/s':>13} {'speed-up':>9}")
+    for n in args.requests:
+        requests = sample_requests(db, n, args.hot_pairs)
+        # warm the route cache so both sides measure assignment, not routing
+        for req in set(requests):
+            engine.routes_df(*req)
+        per_row = timed(lambda: per_row_assign(requests, engine.routes_df), args.repeat)
+        batch = timed(lambda: assign_batch(requests, engine.routes_df, rng=rng), args.repeat)
+        print(f"{n:>9} {n / per_row:>15,.0f} {n / batch:>13,.0f} {per_row / batch:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
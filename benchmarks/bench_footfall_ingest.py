@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import footfall_ingest
+
+# Appends synthetic gate and path-sensor events to a JSONL file, ingests them,
+# then "restarts" (a fresh ingestor on the same state DB), appends a second
+# batch and checks that every event was counted exactly once.
+
+STATIONS = [f"Station {i}" for i in range(60)]
+LOCATIONS = ["Entry A", "Entry B", "Exit A", "Exit B", "Platform - Up", "Platform - Down"]
+
+
+def write_events(path, n, t0, seed):
+    rng = random.Random(seed)
+    people = 0
+    with open(path, "a", encoding="utf-8") as f:
+        for i in range(n):
+            station = rng.choice(STATIONS)
+            count = rng.randint(1, 4)
+            people += count
+            if i % 3:
+                start, end = rng.sample(LOCATIONS, 2)
+                event = {"ts": t0 + i * 0.01, "station": station, "start": start, "end": end,
+                         "path": f"Route {rng.randint(1, 4)}: {start} → {end}", "count": count}
+            else:
+                event = {"ts": t0 + i * 0.01, "station": station,
+                         "gate": rng.choice(LOCATIONS[:4]), "count": count}
+            f.write(json.dumps(event) + "\n")
+        f.write("not json\n")   # malformed lines are skipped, never fatal
+    return people
+
+
+def ingest(log_path, db_path):
+    ingestor = footfall_ingest.FootfallIngestor(log_path, db_path)
+    t0 = time.perf_counter()
+    n = ingestor.poll()
+    elapsed = time.perf_counter() - t0
+    ingestor.close()
+    return n, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Footfall ingestion throughput and restart safety.")
+    parser.add_argument("--events", type=int, default=500_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    log_path = os.path.join(workdir, "events.jsonl")
+    db_path = os.path.join(workdir, "state.db")
+    t0 = time.time() - 3600
+
+    expected = write_events(log_path, args.events, t0, 1)
+    n1, e1 = ingest(log_path, db_path)
+    print(f"first run: {n1:,} events in {e1:.2f} s ({n1 / e1:,.0f} events/s)")
+
+    expected += write_events(log_path, args.events // 2, t0 + 1800, 2)
+    n2, e2 = ingest(log_path, db_path)
+    print(f"after restart: {n2:,} new events in {e2:.2f} s ({n2 / e2:,.0f} events/s)")
+
+    n3, e3 = ingest(log_path, db_path)
+    print(f"idle poll: {n3} events in {e3 * 1000:.2f} ms")
+
+    ingestor = footfall_ingest.FootfallIngestor(log_path, db_path)
+    counted = ingestor.conn.execute("SELECT SUM(people) FROM station_footfall;").fetchone()[0]
+    ingestor.close()
+    status = "OK" if counted == expected else "MISMATCH"
+    print(f"people counted {counted:,} / appended {expected:,}: {status}")
+
+
+if __name__ == "__main__":
+    main()
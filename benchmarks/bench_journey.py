@@ -0,0 +1,64 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import journey_planner
+
+# Network-level journey search on synthetic metro grids: east-west lines
+# crossed by north-south lines every few stops, so most journeys need one
+# or two interchanges. Compares ALT (landmark A*) with plain Dijkstra
+# (no landmarks) on the same random origin/destination platforms.
+
+
+def grid_network(num_stations, stations_per_line=100, crossing_every=10):
+    rows = max(1, num_stations // stations_per_line)
+    lines = {}
+    for r in range(rows):
+        lines[f"EW {r}"] = [f"S{r}-{c}" for c in range(stations_per_line)]
+    for c in range(0, stations_per_line, crossing_every):
+        lines[f"NS {c}"] = [f"S{r}-{c}" for r in range(rows)]
+    return lines
+
+
+def run(network, queries):
+    samples, settled = [], []
+    for source, target in queries:
+        t0 = time.perf_counter()
+        found = network.search({source: 0.0}, {target: 0.0})
+        samples.append((time.perf_counter() - t0) * 1000)
+        settled.append(found[2] if found else 0)
+    return np.array(samples), np.array(settled)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ALT vs Dijkstra journey search.")
+    parser.add_argument("--scales", default="1000,10000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--landmarks", type=int, default=journey_planner.NUM_LANDMARKS)
+    args = parser.parse_args()
+
+    for scale in (int(s) for s in args.scales.split(",")):
+        lines = grid_network(scale)
+        rng = random.Random(0)
+        print(f"--- {scale} stations, {len(lines)} lines ---")
+        for label, landmarks in (("dijkstra", 0), ("alt", args.landmarks)):
+            t0 = time.perf_counter()
+            network = journey_planner.MetroNetwork(lines, num_landmarks=landmarks)
+            build_s = time.perf_counter() - t0
+            queries = [(rng.randrange(len(network)), rng.randrange(len(network)))
+                       for _ in range(args.queries)]
+            rng = random.Random(0)
+            ms, settled = run(network, queries)
+            print(f"{label:<9} build {build_s:6.2f} s   p50 {np.percentile(ms, 50):7.3f} ms   "
+                  f"p99 {np.percentile(ms, 99):7.3f} ms   settled {settled.mean():8.0f} / {len(network)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import live_charts
+
+# Measures the server-side CPU time and the bytes sent per 3-second refresh of
+# the results page, for the old full-script autorefresh (styled table + three
+# matplotlib PNGs) against the live fragment (two Vega-Lite specs + Arrow data).
+
+TIME_INTERVALS = ["6-8 AM", "8-10 AM", "10-12 PM", "12-2 PM",
+                  "2-4 PM", "4-6 PM", "6-8 PM", "8-10 PM"]
+HOURS = ["6-7", "7-8", "8-9", "9-10", "10-11", "11-12", "12-13", "13-14",
+         "14-15", "15-16", "16-17", "17-18", "18-19", "19-20", "20-21"]
+
+
+def arrow_bytes(df):
+    sink = io.BytesIO()
+    table = pa.Table.from_pandas(df)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def png_bytes(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight", dpi=200)
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def make_session(num_paths):
+    rng = np.random.default_rng(0)
+    df_live = pd.DataFrame({
+        "Path": [f"Route {i+1}: Entry A → Platform" for i in range(num_paths)],
+        "Base Distance (m)": rng.integers(90, 480, num_paths),
+        "Base Time (mins)": rng.integers(2, 7, num_paths),
+    })
+    crowd = rng.integers(30, 95, num_paths)
+    df_live["Live Crowd (%)"] = [f"{c}%" for c in crowd]
+    df_live["Live Estimated Time (mins)"] = (df_live["Base Time (mins)"] * (1 + crowd / 100)).round(1)
+    crowd_base = {p: np.clip(c + rng.integers(-15, 16, len(TIME_INTERVALS)), 0, 100)
+                  for p, c in zip(df_live["Path"], crowd)}
+    load_base = pd.DataFrame({"Time": HOURS, "Passengers": rng.integers(200, 1100, len(HOURS))})
+    return df_live, crowd_base, load_base
+
+
+def mild_update(crowd_base, load_base):
+    crowd_matrix = {}
+    for path, base_arr in crowd_base.items():
+        arr = base_arr.copy()
+        arr[-1] = int(np.clip(arr[-1] + np.random.randint(-5, 6), 0, 100))
+        crowd_matrix[path] = arr
+    df_load = load_base.copy()
+    df_load.loc[df_load.index[-1], "Passengers"] = max(
+        50, df_load.loc[df_load.index[-1], "Passengers"] + np.random.randint(-25, 26))
+    return crowd_matrix, df_load
+
+
+def full_rerun(df_live, crowd_base, load_base):
+    # what one st_autorefresh tick used to send
+    sent = 0
+    best = df_live["Live Estimated Time (mins)"].idxmin()
+    styled = df_live.style.apply(
+        lambda row: ["font-weight: bold;" if row.name == best else "" for _ in row], axis=1)
+    styled.to_html()
+    sent += len(arrow_bytes(df_live))
+
+    fig, ax = plt.subplots(figsize=(6, 4))
+    for x, y, w, h in [(0.05, 0.65, 0.35, 0.12), (0.6, 0.65, 0.35, 0.12), (0.1, 0.4, 0.8, 0.15)]:
+        ax.add_patch(plt.Rectangle((x, y), w, h, fill=False))
+        ax.text(x + w / 2, y + h / 2, "Zone", ha="center", va="center", fontsize=8)
+    ax.axis("off")
+    sent += len(png_bytes(fig))
+
+    crowd_matrix, df_load = mild_update(crowd_base, load_base)
+    fig1, ax1 = plt.subplots(figsize=(10, 5))
+    pd.DataFrame(crowd_matrix, index=TIME_INTERVALS).plot(kind="bar", ax=ax1)
+    sent += len(png_bytes(fig1))
+
+    fig2, ax2 = plt.subplots(figsize=(10, 3))
+    ax2.plot(df_load["Time"], df_load["Passengers"], marker="o")
+    ax2.grid(True)
+    sent += len(png_bytes(fig2))
+    return sent
+
+
+def fragment_rerun(df_live, crowd_base, load_base):
+    # what one live_charts_fragment tick sends now
+    crowd_matrix, df_load = mild_update(crowd_base, load_base)
+    sent = len(arrow_bytes(live_charts.crowd_frame(crowd_matrix, TIME_INTERVALS)))
+    sent += len(json.dumps(live_charts.crowd_chart_spec("Entry A", "Platform")))
+    sent += len(arrow_bytes(df_load))
+    sent += len(json.dumps(live_charts.load_chart_spec("Station")))
+    return sent
+
+
+def measure(fn, args, refreshes):
+    cpu0 = time.process_time()
+    sent = sum(fn(*args) for _ in range(refreshes))
+    cpu = time.process_time() - cpu0
+    return cpu / refreshes * 1000, sent / refreshes / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-refresh cost of the results page.")
+    parser.add_argument("--refreshes", type=int, default=20)
+    parser.add_argument("--paths", type=int, default=4)
+    args = parser.parse_args()
+
+    session = make_session(args.paths)
+    full_cpu, full_kb = measure(full_rerun, session, args.refreshes)
+    frag_cpu, frag_kb = measure(fragment_rerun, session, args.refreshes)
+
+    print(f"{'mode':<22} {'CPU ms/refresh':>15} {'KB/refresh':>11}")
+    print(f"{'full-script rerun':<22} {full_cpu:>15.1f} {full_kb:>11.1f}")
+    print(f"{'live fragment':<22} {frag_cpu:>15.1f} {frag_kb:>11.1f}")
+    print(f"reduction: {full_cpu / frag_cpu:.0f}x CPU, {full_kb / frag_kb:.0f}x bandwidth per connected user")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import footpath_db
+import metrics
+
+# Cost of the instrumentation on the hottest call in the dashboard – a cached
+# DataAccess.query_df hit – with FOOTPATH_METRICS off and on.
+
+
+def per_call_us(fn, calls):
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - t0) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Instrumentation overhead per call.")
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    db = footpath_db.DataAccess(os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), "metro_footpath.db"))
+    params = (db.query_df(footpath_db.LINES_SQL)["line_name"].iloc[0],)
+    db.query_df(footpath_db.STATIONS_SQL, params)
+
+    def cached_query():
+        db.query_df(footpath_db.STATIONS_SQL, params)
+
+    def empty_timer():
+        with metrics.timer("bench_seconds", stage="x"):
+            pass
+
+    rows = []
+    for enabled in (False, True):
+        metrics.ENABLED = enabled
+        rows.append((enabled, per_call_us(cached_query, args.calls),
+                     per_call_us(empty_timer, args.calls)))
+    metrics.ENABLED = False
+
+    print(f"{'metrics':<9} {'cached query_df us':>19} {'timer() us':>11}")
+    for enabled, query_us, timer_us in rows:
+        print(f"{'on' if enabled else 'off':<9} {query_us:>19.3f} {timer_us:>11.3f}")
+    print(f"overhead when off: {rows[0][2]:.3f} us per timer; "
+          f"when on: {rows[1][1] - rows[0][1]:.3f} us per cached query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import footpath_cluster
+import load_test_api
+
+# Throughput of footpath_cluster.py (JSON API workers behind the local load
+# balancer) for 1, 2, 4, ... workers up to the number of cores. Load comes
+# from several client processes so the generator is not the bottleneck;
+# note it runs on the same machine and takes its share of the cores.
+
+
+def worker_counts(max_workers):
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+
+def start_cluster(args, workers, scratch):
+    cluster = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "footpath_cluster.py"), "--app", "api",
+         "--workers", str(workers), "--port", str(args.port), "--balancer", args.balancer,
+         "--db", args.db, "--state-db", os.path.join(scratch, f"state-{workers}.db"),
+         "--log-dir", os.path.join(scratch, f"log-{workers}")],
+        stdout=subprocess.PIPE, text=True
+    )
+    for line in cluster.stdout:         # "Prepared ...", then "Footpath cluster: ..."
+        if line.startswith("Footpath cluster"):
+            return cluster
+    cluster.wait()
+    raise RuntimeError("cluster did not start")
+
+
+def client_process(job):
+    port, requests, concurrency, duration = job
+    latencies, errors, elapsed = asyncio.run(
+        load_test_api.run_load("127.0.0.1", port, requests, concurrency, duration))
+    return [v for values in latencies.values() for v in values], sum(errors.values()), elapsed
+
+
+def measure(args, requests, pool):
+    per_client = max(1, args.concurrency // args.clients)
+    jobs = [(args.port, requests[c::args.clients], per_client, args.duration)
+            for c in range(args.clients)]
+    results = pool.map(client_process, jobs)
+    latencies = np.array([v for values, _, _ in results for v in values]) * 1000
+    elapsed = max(e for _, _, e in results)
+    errors = sum(e for _, e, _ in results)
+    return len(latencies) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API throughput from 1 to N workers.")
+    parser.add_argument("--db", default=os.path.join(ROOT, "metro_footpath.db"))
+    parser.add_argument("--max-workers", type=int, default=footpath_cluster.WORKERS)
+    parser.add_argument("--balancer", choices=("proxy", "kernel"), default="proxy")
+    parser.add_argument("--port", type=int, default=8870)
+    parser.add_argument("--clients", type=int, default=max(1, footpath_cluster.WORKERS // 2),
+                        help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=64, help="connections in total")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--mix", default="routes=6,locations=2,assign=2")
+    args = parser.parse_args()
+    args.db = os.path.abspath(args.db)
+
+    mix = {k: float(v) for k, v in (item.split("=") for item in args.mix.split(","))}
+    requests = load_test_api.build_requests(load_test_api.sample_pairs(args.db, 500), mix)
+    scratch = tempfile.mkdtemp()
+
+    print(f"{os.cpu_count()} cores, {args.clients} client processes, {args.concurrency} connections, "
+          f"{args.balancer} balancing")
+    print(f"{'workers':>7} {'req/s':>9} {'speedup':>8} {'efficiency':>10} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    baseline = None
+    with mp.Pool(args.clients) as pool:
+        for workers in worker_counts(args.max_workers):
+            cluster = start_cluster(args, workers, scratch)
+            try:
+                rate, p50, p99, errors = measure(args, requests, pool)
+            finally:
+                cluster.terminate()
+                cluster.wait()
+            baseline = baseline or rate
+            print(f"{workers:>7} {rate:>9,.0f} {rate / baseline:>7.2f}x "
+                  f"{rate / baseline / workers:>9.0%} {p50:>8.2f} {p99:>8.2f} {errors:>7}")
+            time.sleep(0.5)     # let the port and the workers go away
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import station_graph
+from segment_congestion import SegmentIndex
+
+# Cost of one assignment's congestion update in stations of growing size:
+# the incremental update (only routes sharing a segment of the chosen route,
+# via the inverted index) against recomputing every route of the station.
+# Every location pair's routes are registered, as in a busy station.
+
+
+def synthetic_station(num_locations, seed=0):
+    # entrances, platforms, concourses and links in the dashboard's proportions
+    rng = random.Random(seed)
+    kinds = ["Entry", "Exit", "Platform", "Platform", "Concourse", "Foot Overbridge"]
+    locations = [f"{rng.choice(kinds)} {i}" for i in range(num_locations)]
+    nodes, edges = station_graph.synthesize_station_graph(f"Bench {num_locations}", "big", locations)
+    return station_graph.graph_from_layout(f"Bench {num_locations}", nodes, edges), locations
+
+
+def build_index(graph, locations):
+    index = SegmentIndex(graph)
+    for start in locations:
+        for end in locations:
+            if start != end:
+                index.add_routes(start, end, station_graph.plan_routes(graph, start, end))
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental per-segment congestion.")
+    parser.add_argument("--sizes", default="13,40,80", help="locations per station")
+    parser.add_argument("--updates", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'locations':>9} {'routes':>7} {'segments':>8} {'touched':>8} "
+          f"{'incremental us':>15} {'full us':>10} {'max error':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        graph, locations = synthetic_station(size)
+        index = build_index(graph, locations)
+        rng = random.Random(1)
+        rows = [rng.randrange(len(index.route_edges)) for _ in range(args.updates)]
+
+        touched = 0
+        t0 = time.perf_counter()
+        for row in rows:
+            touched += index.add_load(index.route_edges[row], 1.0)
+        incremental = (time.perf_counter() - t0) / len(rows)
+
+        incremental_weighted = index.weighted[:len(index.route_edges)].copy()
+        t0 = time.perf_counter()
+        for _ in range(max(1, len(rows) // 100)):
+            index.recompute()
+        full = (time.perf_counter() - t0) / max(1, len(rows) // 100)
+        error = np.abs(incremental_weighted - index.weighted[:len(index.route_edges)]).max()
+
+        print(f"{size:>9} {len(index.route_edges):>7} {len(graph.edges):>8} "
+              f"{touched / len(rows):>8.0f} {incremental * 1e6:>15.1f} {full * 1e6:>10.0f} "
+              f"{error:>10.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import assignment_engine
+import batch_assign
+import crowd_forecast
+import footpath_db
+import generate_routes
+import render_cache
+import route_store
+import station_graph
+import station_layout
+import station_search
+
+# End-to-end timings of the dashboard's hot paths on synthetic networks of
+# increasing size. Every result is written as JSON (one record per scale and
+# benchmark, times in ms) so runs from two commits can be diffed:
+#
+#   python benchmarks/bench_suite.py --out before.json
+#   git checkout <other commit>
+#   python benchmarks/bench_suite.py --out after.json --compare before.json
+
+DEFAULT_SCALES = "57,1000,10000"
+DEFAULT_OUT = os.path.join(ROOT, "benchmarks", "results", "suite-{commit}.json")
+REGRESSION_RATIO = 1.25   # p50 this much slower than the baseline is flagged...
+MIN_DELTA_MS = 0.05       # ...unless the difference is below timer noise
+
+
+# =====================================================
+# MEASUREMENT HELPERS
+# =====================================================
+def stats(name, scale, samples_ms):
+    ms = np.asarray(samples_ms, dtype=float)
+    return {
+        "scale": scale, "name": name, "unit": "ms", "n": int(ms.size),
+        "mean": round(float(ms.mean()), 4),
+        "p50": round(float(np.percentile(ms, 50)), 4),
+        "p99": round(float(np.percentile(ms, 99)), 4),
+    }
+
+
+def timed_calls(fn, args_list):
+    samples = []
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def sample_pairs(db, n, seed=0):
+    rows = db.query_rows("""
+        SELECT s.station_name, a.location_name, b.location_name
+        FROM station_index s
+        JOIN station_locations a ON a.station_id = s.station_id
+        JOIN station_locations b ON b.station_id = s.station_id
+        WHERE a.location_id != b.location_id;
+    """)
+    return random.Random(seed).sample(rows, min(n, len(rows)))
+
+
+# =====================================================
+# BENCHMARKS
+# =====================================================
+def bench_generate(db_path, scale, workers):
+    t0 = time.perf_counter()
+    generate_routes.main(db_path, full=True, workers=workers, verbose=False)
+    full_ms = (time.perf_counter() - t0) * 1000
+    noop = timed_calls(lambda: generate_routes.main(db_path, workers=workers, verbose=False),
+                       [()] * 5)
+    return [stats("generate_routes.full", scale, [full_ms]),
+            stats("generate_routes.incremental_noop", scale, noop)]
+
+
+def bench_get_routes(db_path, scale, pairs):
+    # same lookup as footpath_dashboard_simple.get_routes
+    db = footpath_db.DataAccess(db_path)
+    engine = station_graph.RouteEngine(db)
+    cold = timed_calls(engine.route_table, pairs)
+    warm = timed_calls(engine.route_table, pairs * 5)
+    db.close()
+    snapshot = route_store.snapshot_path(db_path)
+    load = timed_calls(route_store.RouteStore.load, [(snapshot,)] * 5)
+    store = route_store.RouteStore.load(snapshot)
+    views = timed_calls(store.routes, pairs * 5)
+    return [stats("get_routes.cold", scale, cold), stats("get_routes.warm", scale, warm),
+            stats("route_store.load", scale, load), stats("route_store.slice", scale, views)]
+
+
+def bench_route_summary(db_path, scale, pairs):
+    # stage 2 shortest path: the route table + idxmin against the
+    # materialised route_summaries row (first lookup of each pair)
+    db = footpath_db.DataAccess(db_path)
+    engine = station_graph.RouteEngine(db)
+
+    def shortest(station, start, end):
+        base_df = engine.route_table(station, start, end)
+        return base_df.loc[base_df["Base Distance (m)"].idxmin()]
+
+    def summary(station, start, end):
+        return db.query_rows(footpath_db.ROUTE_SUMMARY_SQL, (start, end, station))
+
+    engine.store()
+    idxmin = timed_calls(shortest, pairs)
+    lookup = timed_calls(summary, pairs)
+    db.close()
+    return [stats("route_summary.idxmin", scale, idxmin),
+            stats("route_summary.lookup", scale, lookup)]
+
+
+def bench_live_crowd(db_path, scale, pairs, workdir):
+    # results stage: decayed assignment load + live crowd/time for every path
+    db = footpath_db.DataAccess(db_path)
+    engine = station_graph.RouteEngine(db)
+    assignments = assignment_engine.AssignmentEngine(os.path.join(workdir, "state.db"))
+    batch_assign.assign_batch(pairs * 4, engine.route_table, engine=assignments)
+    frames = [(engine.route_table(*pair), pair) for pair in pairs]
+
+    def live(base_df, pair):
+        batch_assign.live_routes(base_df, assignments.loads(*pair))
+
+    samples = timed_calls(live, frames)
+    t0 = time.perf_counter()
+    batch_assign.assign_batch(pairs * 10, engine.route_table, engine=assignments)
+    batch_ms = (time.perf_counter() - t0) * 1000
+    assignments.close()
+    db.close()
+    return [stats("live_crowd.single", scale, samples),
+            stats("live_crowd.batch_per_request", scale, [batch_ms / (len(pairs) * 10)])]
+
+
+def bench_forecast(db_path, scale, pairs, workdir):
+    # results stage: expected time over the walk from the cached station forecast
+    db = footpath_db.DataAccess(db_path)
+    engine = station_graph.RouteEngine(db)
+    forecaster = crowd_forecast.CrowdForecaster(os.path.join(workdir, "state.db"))
+    rng = np.random.default_rng(0)
+    now = time.time()
+    frames = []
+    for pair in pairs:
+        df = engine.route_table(*pair)
+        paths = df["Path"].tolist()
+        for day in range(1, 8):     # a week of history around this time of day
+            forecaster.observe(*pair, paths, rng.integers(5, 95, len(paths)), now=now - day * 86400)
+        frames.append((pair, paths, df["Base Time (mins)"].to_numpy(),
+                       rng.integers(5, 95, len(paths))))
+
+    def rebuild(station):
+        forecaster.invalidate(station)
+        forecaster.station_forecast(station, now)
+
+    cold = timed_calls(rebuild, [(pair[0],) for pair, *_ in frames])
+    warm = timed_calls(lambda pair, paths, base, crowd:
+                       forecaster.expected_times(*pair, paths, base, crowd, now), frames * 5)
+    forecaster.close()
+    db.close()
+    return [stats("forecast.station_build", scale, cold),
+            stats("forecast.expected_times", scale, warm)]
+
+
+def bench_layout(scale, repeat=5):
+    renders = render_cache.RenderCache()
+    cold, cached = [], []
+    for i in range(repeat):
+        for size in ("big", "medium", "small"):
+            name = f"Station {i}"
+            t0 = time.perf_counter()
+            renders.get_or_render(("layout", size, name),
+                                  lambda: station_layout.draw_station_layout(name, size))
+            cold.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            renders.get_or_render(("layout", size, name),
+                                  lambda: station_layout.draw_station_layout(name, size))
+            cached.append((time.perf_counter() - t0) * 1000)
+    return [stats("draw_station_layout.render", scale, cold),
+            stats("draw_station_layout.cached", scale, cached)]
+
+
+def bench_search(db_path, scale, pairs):
+    # stage 1 search box: fuzzy, typo'd and location-name queries over every line
+    db = footpath_db.DataAccess(db_path)
+    search = station_search.StationSearch(db)
+    t0 = time.perf_counter()
+    search.index()
+    build_ms = (time.perf_counter() - t0) * 1000
+    queries = []
+    for station, start, _ in pairs:
+        queries += [(station[:4],), (station[:-2] + "x",), (start,)]
+    samples = timed_calls(search.search_stations, queries)
+    db.close()
+    return [stats("station_search.build", scale, [build_ms]),
+            stats("station_search.query", scale, samples)]
+
+
+def bench_session(workdir, scale, sessions=3):
+    # station_selection -> route_selection -> results, as a user clicks through
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    script = os.path.join(ROOT, "footpath_dashboard_simple.py")
+    cwd = os.getcwd()
+    os.chdir(workdir)     # the dashboard opens ./metro_footpath.db and ./footpath_state.db
+    st.cache_resource.clear()
+    timings = {"session.station_selection": [], "session.route_selection": [],
+               "session.results": [], "session.results_rerun": []}
+    try:
+        for _ in range(sessions):
+            at = AppTest.from_file(script, default_timeout=600)
+            t0 = time.perf_counter()
+            at.run()
+            timings["session.station_selection"].append((time.perf_counter() - t0) * 1000)
+            at.button[0].click()
+            t0 = time.perf_counter()
+            at.run()
+            at.selectbox[1].select_index(len(at.selectbox[1].options) - 1)
+            at.run()
+            timings["session.route_selection"].append((time.perf_counter() - t0) * 1000)
+            at.button[0].click()
+            t0 = time.perf_counter()
+            at.run()
+            timings["session.results"].append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            at.run()
+            timings["session.results_rerun"].append((time.perf_counter() - t0) * 1000)
+            if at.exception or at.session_state.stage != "results":
+                raise RuntimeError(f"session did not reach the results stage: {at.exception}")
+    finally:
+        os.chdir(cwd)
+        st.cache_resource.clear()
+    return [stats(name, scale, samples) for name, samples in timings.items()]
+
+
+def run_scale(scale, args):
+    workdir = tempfile.mkdtemp(prefix=f"footpath_bench_{scale}_")
+    db_path = os.path.join(workdir, "metro_footpath.db")
+    try:
+        t0 = time.perf_counter()
+        generate_routes.make_scaled_db(db_path, scale, os.path.join(ROOT, "metro_footpath.db"))
+        results = [stats("make_scaled_db", scale, [(time.perf_counter() - t0) * 1000])]
+        results += bench_generate(db_path, scale, args.workers)
+
+        probe = footpath_db.DataAccess(db_path)
+        pairs = sample_pairs(probe, args.pairs)
+        probe.close()
+        results += bench_get_routes(db_path, scale, pairs)
+        results += bench_route_summary(db_path, scale, pairs)
+        results += bench_live_crowd(db_path, scale, pairs, workdir)
+        results += bench_forecast(db_path, scale, pairs, workdir)
+        results += bench_search(db_path, scale, pairs)
+        results += bench_layout(scale)
+        if not args.skip_session:
+            results += bench_session(workdir, scale)
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# =====================================================
+# REPORTING
+# =====================================================
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["scale"], r["name"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\nvs {baseline_path}")
+    print(f"{'scale':>6} {'benchmark':<36} {'old p50':>10} {'new p50':>10} {'ratio':>7}")
+    for r in results:
+        old = baseline.get((r["scale"], r["name"]))
+        if old is None or not old["p50"]:
+            continue
+        ratio = r["p50"] / old["p50"]
+        slower = ratio > REGRESSION_RATIO and r["p50"] - old["p50"] > MIN_DELTA_MS
+        flag = "  REGRESSION" if slower else ""
+        regressions += bool(flag)
+        print(f"{r['scale']:>6} {r['name']:<36} {old['p50']:>10.3f} {r['p50']:>10.3f} "
+              f"{ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's hot paths at several network sizes.")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="comma-separated station counts")
+    parser.add_argument("--pairs", type=int, default=200, help="(station, start, end) samples per scale")
+    parser.add_argument("--workers", type=int, default=None, help="route generation processes")
+    parser.add_argument("--skip-session", action="store_true", help="skip the Streamlit session walk")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--compare", default=None, metavar="BASELINE_JSON")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    scales = [int(s) for s in args.scales.split(",")]
+    results = []
+    for scale in scales:
+        print(f"--- {scale} stations ---")
+        for r in run_scale(scale, args):
+            print(f"{r['name']:<36} n={r['n']:<5} p50 {r['p50']:>10.3f} ms   p99 {r['p99']:>10.3f} ms")
+            results.append(r)
+
+    out_path = args.out.format(commit=commit)
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {
+                "commit": commit,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "scales": scales,
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"\nWrote {len(results)} results to {out_path}")
+
+    if args.compare and compare(results, args.compare):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
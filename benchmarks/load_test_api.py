@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Starts footpath_api.py in its own process (with a throwaway state DB and
+# assignment log) and
+# drives it with keep-alive connections for a fixed duration, then reports
+# throughput and p50/p99 latency per endpoint.
+
+
+def sample_pairs(db_path, n, seed=0):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    pairs = conn.execute("""
+        SELECT DISTINCT s.station_name, a.location_name, b.location_name
+        FROM route_paths r
+        JOIN station_index s ON s.station_id = r.station_id
+        JOIN station_locations a ON a.location_id = r.start_location_id
+        JOIN station_locations b ON b.location_id = r.end_location_id;
+    """).fetchall()
+    conn.close()
+    random.Random(seed).shuffle(pairs)
+    return pairs[:n]
+
+
+def build_requests(pairs, mix, seed=0):
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(4096):
+        station, start, end = rng.choice(pairs)
+        kind = rng.choices(list(mix), weights=list(mix.values()))[0]
+        if kind == "routes":
+            target = "/routes?" + urlencode({"station": station, "start": start, "end": end})
+            raw = f"GET {target} HTTP/1.1\r\nHost: bench\r\n\r\n".encode("utf-8")
+        elif kind == "locations":
+            target = "/locations?" + urlencode({"station": station})
+            raw = f"GET {target} HTTP/1.1\r\nHost: bench\r\n\r\n".encode("utf-8")
+        else:
+            body = json.dumps({"station": station, "start": start, "end": end}).encode("utf-8")
+            raw = (f"POST /assign HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                   f"Content-Length: {len(body)}\r\n\r\n").encode("utf-8") + body
+        requests.append((kind, raw))
+    return requests
+
+
+async def client(host, port, requests, deadline, latencies, errors, offset):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = offset
+    try:
+        while time.perf_counter() < deadline:
+            kind, raw = requests[i % len(requests)]
+            i += 1
+            t0 = time.perf_counter()
+            writer.write(raw)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+            await reader.readexactly(length)
+            latencies[kind].append(time.perf_counter() - t0)
+            if not head.startswith(b"HTTP/1.1 200"):
+                errors[kind] = errors.get(kind, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, requests, concurrency, duration):
+    latencies = {kind: [] for kind, _ in requests}
+    errors = {}
+    # warm-up: fill the route caches before timing
+    await client(host, port, requests, time.perf_counter() + 1.0, {k: [] for k in latencies}, {}, 0)
+    deadline = time.perf_counter() + duration
+    t0 = time.perf_counter()
+    await asyncio.gather(*[
+        client(host, port, requests, deadline, latencies, errors, c * 97)
+        for c in range(concurrency)
+    ])
+    return latencies, errors, time.perf_counter() - t0
+
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            asyncio.run(asyncio.wait_for(asyncio.open_connection(host, port), 1))
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("API server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the footpath JSON API.")
+    parser.add_argument("--db", default=os.path.join(ROOT, "metro_footpath.db"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--mix", default="routes=6,locations=2,assign=2",
+                        help="endpoint weights, e.g. routes=1 or assign=1")
+    parser.add_argument("--external", action="store_true",
+                        help="test an already running server instead of starting one")
+    args = parser.parse_args()
+
+    mix = {k: float(v) for k, v in (item.split("=") for item in args.mix.split(","))}
+    requests = build_requests(sample_pairs(os.path.abspath(args.db), 500), mix)
+
+    server = None
+    if not args.external:
+        scratch = tempfile.mkdtemp()
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "footpath_api.py"), "--db", args.db,
+             "--state-db", os.path.join(scratch, "state.db"),
+             "--log-dir", os.path.join(scratch, "assignment_log"),
+             "--host", args.host, "--port", str(args.port)],
+            stdout=subprocess.DEVNULL
+        )
+    try:
+        wait_for_port(args.host, args.port)
+        latencies, errors, elapsed = asyncio.run(
+            run_load(args.host, args.port, requests, args.concurrency, args.duration))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"{total:,} requests in {elapsed:.1f} s with {args.concurrency} connections: "
+          f"{total / elapsed:,.0f} req/s")
+    print(f"{'endpoint':<12} {'requests':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for kind, values in latencies.items():
+        if values:
+            ms = np.array(values) * 1000
+            print(f"{kind:<12} {len(values):>9,} {np.percentile(ms, 50):>8.2f} "
+                  f"{np.percentile(ms, 99):>8.2f} {errors.get(kind, 0):>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+# =====================================================
+# CONFIG
+# =====================================================
+HALF_LIFE_SECS = 15 * 60    # an assignment counts half as much after 15 minutes
+MAX_KEYS = 100_000          # memory budget: keys kept before the coldest is evicted
+COLD_AFTER_HALF_LIVES = 24  # untouched this long, any load under ~167k has decayed below 0.01
+
+
+def decay_factor(elapsed, half_life=HALF_LIFE_SECS):
+    if elapsed <= 0:
+        return 1.0
+    return 0.5 ** (elapsed / half_life)
+
+
+def decayed(value, updated_at, now, half_life=HALF_LIFE_SECS):
+    return value * decay_factor(now - updated_at, half_life)
+
+
+def cold_cutoff(now, half_life=HALF_LIFE_SECS):
+    # keys last updated before this are cold whatever their load was, so a
+    # sweep is a range delete on updated_at instead of decaying every row
+    return now - COLD_AFTER_HALF_LIVES * half_life
+
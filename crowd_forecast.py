@@ -0,0 +1,348 @@
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import batch_assign
+from assignment_engine import STATE_DB_PATH
+from crowd_counters import HALF_LIFE_SECS
+from footfall_ingest import PATH_BUCKET_SECS, PATH_CAPACITY_PER_MIN, PATH_RETENTION_SECS
+
+# =====================================================
+# CONFIG
+# =====================================================
+SLOT_SECS = 15 * 60                 # profiles are learned per 15-minute slot of the day
+SLOTS_PER_DAY = 24 * 60 * 60 // SLOT_SECS
+MAX_WEIGHT = 50                     # running mean until here, then an EWMA that keeps adapting
+PRIOR_WEIGHT = 3.0                  # samples' worth of trust in the path/station average
+SMOOTHING = np.array([0.25, 0.5, 0.25])   # neighbouring slots share evidence
+DEFAULT_CROWD = sum(batch_assign.BASE_CROWD_RANGE) / 2
+WINDOW_STEPS = 4                    # points sampled along a walk for its expected crowd
+LEARN_EVERY_SECS = 60               # footfall history is folded in at most this often
+
+# per station, built in one vectorised pass and reused until the slot changes:
+# keys[i] = (start, end, path); crowd/samples are (keys × SLOTS_PER_DAY)
+StationForecast = namedtuple("StationForecast", "slot keys row_of crowd samples")
+
+
+def slot_of(ts):
+    # local time of day, so "8-9 AM" means the same thing every day
+    t = time.localtime(ts)
+    return (t.tm_hour * 3600 + t.tm_min * 60 + t.tm_sec) // SLOT_SECS
+
+
+def seconds_into_day(ts):
+    t = time.localtime(ts)
+    return t.tm_hour * 3600 + t.tm_min * 60 + t.tm_sec + (ts % 1)
+
+
+def smooth(values):
+    # circular convolution along the slot axis (midnight wraps round)
+    out = np.zeros_like(values)
+    half = len(SMOOTHING) // 2
+    for shift, weight in enumerate(SMOOTHING):
+        out += weight * np.roll(values, shift - half, axis=1)
+    return out
+
+
+# =====================================================
+# PER-PATH, PER-SLOT CROWD PROFILES
+# =====================================================
+# Lives in the shared WAL state DB next to path_assignments and the
+# footfall counts it learns from; every worker process sees the same profiles.
+class CrowdForecaster:
+    UPSERT_SQL = """
+        INSERT INTO crowd_profiles
+            (station_name, start_location, end_location, path_name, slot, samples, mean)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (station_name, start_location, end_location, path_name, slot)
+        DO UPDATE SET
+            mean = mean + (excluded.mean - mean) * excluded.samples
+                          / MIN(samples + excluded.samples, ?),
+            samples = MIN(samples + excluded.samples, ?)
+    """
+    # a minute learned again (late events) swaps its old crowd for the new
+    # one: the mean moves by the difference over the slot's samples
+    CORRECT_SQL = """
+        UPDATE crowd_profiles SET mean = mean + ? / samples
+        WHERE station_name = ? AND start_location = ? AND end_location = ?
+          AND path_name = ? AND slot = ?
+    """
+
+    def __init__(self, db_path=STATE_DB_PATH, clock=time.time):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._cache = {}            # station -> StationForecast
+        self._last_learn = 0.0
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS crowd_profiles (
+                station_name   TEXT    NOT NULL,
+                start_location TEXT    NOT NULL,
+                end_location   TEXT    NOT NULL,
+                path_name      TEXT    NOT NULL,
+                slot           INTEGER NOT NULL,
+                samples        REAL    NOT NULL,
+                mean           REAL    NOT NULL,
+                PRIMARY KEY (station_name, start_location, end_location, path_name, slot)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS forecast_watermarks (
+                source    TEXT    PRIMARY KEY,
+                watermark INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS learned_footfall (
+                bucket         INTEGER NOT NULL,
+                station_name   TEXT    NOT NULL,
+                start_location TEXT    NOT NULL,
+                end_location   TEXT    NOT NULL,
+                path_name      TEXT    NOT NULL,
+                crowd          REAL    NOT NULL,
+                PRIMARY KEY (bucket, station_name, start_location, end_location, path_name)
+            ) WITHOUT ROWID;
+        """)
+
+    # ---------------- learning ----------------
+    def _upsert(self, rows):
+        # rows: (station, start, end, path, slot, samples, mean)
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE;")
+            try:
+                self._apply(rows)
+                self.conn.execute("COMMIT;")
+            except Exception:
+                self.conn.execute("ROLLBACK;")
+                raise
+
+    def _apply(self, rows):
+        self.conn.executemany(self.UPSERT_SQL, [row + (MAX_WEIGHT, MAX_WEIGHT) for row in rows])
+
+    def observe(self, station_name, start_location, end_location, paths, crowd, now=None):
+        # crowd (%) seen on each path right now, e.g. at assignment time
+        now = self.clock() if now is None else now
+        slot = slot_of(now)
+        self._upsert([(station_name, start_location, end_location, path, slot, 1.0, float(c))
+                      for path, c in zip(paths, crowd)])
+        self.invalidate(station_name)
+
+    def learn_footfall(self, now=None):
+        # fold completed per-minute path footfall buckets (footfall_ingest)
+        # into the profiles: one sample per path and minute. Buckets are
+        # followed in ingestion order (their seq), so late events are learned
+        # too; a minute that gets late events replaces the crowd it was first
+        # learned with (learned_footfall) instead of adding a sample. The
+        # watermark read, the bucket read and the profile upsert share one
+        # write transaction, so concurrent learners never fold the same
+        # ingest twice.
+        now = self.clock() if now is None else now
+        until = int(now // PATH_BUCKET_SECS) * PATH_BUCKET_SECS   # current bucket still filling
+        conn = self.conn
+        with self._lock:
+            has_footfall = conn.execute(
+                "SELECT 1 FROM pragma_table_info('path_footfall') WHERE name = 'seq';").fetchone()
+            if not has_footfall:
+                return 0
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                row = conn.execute(
+                    "SELECT watermark FROM forecast_watermarks WHERE source = 'path_footfall_seq';"
+                ).fetchone()
+                since = row[0] if row else 0
+                # stop short of the first ingest that still has a bucket filling
+                pending, latest = conn.execute(
+                    "SELECT MIN(CASE WHEN bucket = ? THEN seq END), MAX(seq) "
+                    "FROM path_footfall WHERE seq > ?;", (until, since)
+                ).fetchone()
+                cutoff = pending - 1 if pending is not None else latest
+                buckets = []
+                if cutoff is not None and cutoff > since:
+                    buckets = conn.execute(
+                        """
+                        SELECT f.station_name, f.start_location, f.end_location, f.path_name,
+                               f.bucket, f.people, l.crowd
+                        FROM path_footfall f
+                        LEFT JOIN learned_footfall l
+                            USING (bucket, station_name, start_location, end_location, path_name)
+                        WHERE f.seq > ? AND f.seq <= ?;
+                        """,
+                        (since, cutoff)
+                    ).fetchall()
+                    per_slot, corrections, learned = {}, {}, []
+                    for station, start, end, path, bucket, people, before in buckets:
+                        key = (station, start, end, path, slot_of(bucket))
+                        crowd = min(100.0, 100.0 * people / PATH_CAPACITY_PER_MIN)
+                        learned.append((bucket, station, start, end, path, crowd))
+                        if before is None:
+                            n, total = per_slot.get(key, (0, 0.0))
+                            per_slot[key] = (n + 1, total + crowd)
+                        else:
+                            corrections[key] = corrections.get(key, 0.0) + crowd - before
+                    # corrections first: they apply to the samples already in the profile
+                    conn.executemany(self.CORRECT_SQL, [(delta,) + key for key, delta
+                                                        in corrections.items() if delta])
+                    self._apply([key + (float(n), total / n) for key, (n, total) in per_slot.items()])
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO learned_footfall "
+                        "(bucket, station_name, start_location, end_location, path_name, crowd) "
+                        "VALUES (?, ?, ?, ?, ?, ?);", learned)
+                    # path_footfall keeps no older minutes, so none can be learned again
+                    conn.execute("DELETE FROM learned_footfall WHERE bucket < ?;",
+                                 (now - PATH_RETENTION_SECS,))
+                    conn.execute(
+                        "INSERT OR REPLACE INTO forecast_watermarks (source, watermark) "
+                        "VALUES ('path_footfall_seq', ?);", (cutoff,))
+                conn.execute("COMMIT;")
+            except Exception:
+                conn.execute("ROLLBACK;")
+                raise
+        for station in {b[0] for b in buckets}:
+            self.invalidate(station)
+        return len(buckets)
+
+    def refresh(self, now=None):
+        # cheap enough to call on every rerun
+        now = self.clock() if now is None else now
+        with self._lock:
+            if now - self._last_learn < LEARN_EVERY_SECS:
+                return
+            self._last_learn = now
+        self.learn_footfall(now)
+
+    # ---------------- forecasting ----------------
+    def invalidate(self, station_name=None):
+        if station_name is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(station_name, None)
+
+    def station_forecast(self, station_name, now=None):
+        # every path of the station at once: one query, a few array ops;
+        # reused until the slot changes or this process learns something new
+        now = self.clock() if now is None else now
+        slot = slot_of(now)
+        cached = self._cache.get(station_name)
+        if cached is not None and cached.slot == slot:
+            return cached
+        with self._lock:
+            rows = self.conn.execute(
+                """
+                SELECT start_location, end_location, path_name, slot, samples, mean
+                FROM crowd_profiles WHERE station_name = ?;
+                """,
+                (station_name,)
+            ).fetchall()
+        row_of, keys = {}, []
+        idx = np.empty(len(rows), dtype=np.int64)
+        for i, (start, end, path, _, _, _) in enumerate(rows):
+            key = (start, end, path)
+            if key not in row_of:
+                row_of[key] = len(keys)
+                keys.append(key)
+            idx[i] = row_of[key]
+        weight = np.zeros((len(keys), SLOTS_PER_DAY))
+        total = np.zeros((len(keys), SLOTS_PER_DAY))
+        if rows:
+            slots = np.array([r[3] for r in rows], dtype=np.int64)
+            samples = np.array([r[4] for r in rows], dtype=float)
+            means = np.array([r[5] for r in rows], dtype=float)
+            weight[idx, slots] = samples
+            total[idx, slots] = samples * means
+
+        # shrink each smoothed slot towards the path's own average, then the
+        # station's average for that slot, then the default crowd
+        w = smooth(weight)
+        m = smooth(total)
+        path_prior = np.where(weight.sum(axis=1) > 0,
+                              total.sum(axis=1) / np.maximum(weight.sum(axis=1), 1e-9),
+                              DEFAULT_CROWD)
+        station_slot = np.where(w.sum(axis=0) > 0, m.sum(axis=0) / np.maximum(w.sum(axis=0), 1e-9),
+                                DEFAULT_CROWD)
+        prior = 0.5 * path_prior[:, None] + 0.5 * station_slot[None, :]
+        crowd = (m + PRIOR_WEIGHT * prior) / (w + PRIOR_WEIGHT)
+
+        forecast = StationForecast(slot, keys, row_of, crowd, weight)
+        self._cache[station_name] = forecast
+        return forecast
+
+    def expected_crowd(self, station_name, start_location, end_location, paths,
+                       base_time, crowd_now, now=None):
+        # mean crowd (%) each path will have over the user's walk [now, now +
+        # base time]: the slot profile, plus today's deviation from it decaying
+        # with the assignment half-life
+        return self.expected_crowd_many([(station_name, start_location, end_location)], [paths],
+                                        [base_time], [crowd_now], now)[0]
+
+    def expected_crowd_many(self, pair_keys, path_names, base_time, crowd_now, now=None):
+        # expected_crowd() for a (requests × paths) block in one pass: the
+        # profiles of every station involved are stacked, so all cells share
+        # one gather and one interpolation. Cells without a path (None, an
+        # infinite base time) or without history keep crowd_now.
+        now = self.clock() if now is None else now
+        crowd_now = np.asarray(crowd_now, dtype=float)
+        base_time = np.asarray(base_time, dtype=float)
+        stations, stacked = {}, 0     # station -> (forecast, its first stacked row)
+        for station_name in dict.fromkeys(key[0] for key in pair_keys):
+            forecast = self.station_forecast(station_name, now)
+            stations[station_name] = (forecast, stacked)
+            stacked += len(forecast.keys)
+        rows = np.full(crowd_now.shape, -1, dtype=np.int64)
+        for i, (station_name, start_location, end_location) in enumerate(pair_keys):
+            forecast, first = stations[station_name]
+            for j, path in enumerate(path_names[i]):
+                row = forecast.row_of.get((start_location, end_location, path))
+                if row is not None:
+                    rows[i, j] = first + row
+        if not rows.size or (rows < 0).all():
+            return crowd_now
+        crowd = np.vstack([forecast.crowd for forecast, _ in stations.values()])
+        base_secs = np.where(np.isfinite(base_time), base_time, 0.0) * 60
+        offsets = base_secs[..., None] * (np.arange(WINDOW_STEPS) + 0.5) / WINDOW_STEPS
+        start = seconds_into_day(now)
+        profile_now = self._profile_at(crowd, rows, np.full(rows.shape + (1,), start))[..., 0]
+        profile = self._profile_at(crowd, rows, start + offsets)
+        deviation = (crowd_now - profile_now)[..., None] * 0.5 ** (offsets / HALF_LIFE_SECS)
+        expected = np.clip(profile + deviation, *batch_assign.CROWD_CLIP).mean(axis=-1)
+        # paths never seen before: all we know is the crowd right now
+        return np.where(rows >= 0, expected, crowd_now)
+
+    def _profile_at(self, crowd, rows, secs):
+        # linear interpolation between slot centres, wrapping at midnight;
+        # secs has one more (trailing) axis than rows
+        pos = secs / SLOT_SECS - 0.5
+        lo = np.floor(pos).astype(np.int64)
+        frac = pos - lo
+        safe = np.maximum(rows, 0)[..., None]
+        a = crowd[safe, lo % SLOTS_PER_DAY]
+        b = crowd[safe, (lo + 1) % SLOTS_PER_DAY]
+        return a + (b - a) * frac
+
+    def expected_times(self, station_name, start_location, end_location, paths,
+                       base_time, crowd_now, now=None):
+        crowd = self.expected_crowd(station_name, start_location, end_location, paths,
+                                    base_time, crowd_now, now)
+        return batch_assign.live_time(base_time, crowd)
+
+    def day_pattern(self, station_name, start_location, end_location, paths, intervals):
+        # forecast crowd (%) per path for each (from_hour, to_hour) interval,
+        # or None when none of these paths has any history yet
+        forecast = self.station_forecast(station_name)
+        rows = [forecast.row_of.get((start_location, end_location, p)) for p in paths]
+        if all(r is None or not forecast.samples[r].any() for r in rows):
+            return None
+        per_hour = SLOTS_PER_DAY // 24
+        pattern = {}
+        for path, r in zip(paths, rows):
+            if r is None:
+                values = [int(round(DEFAULT_CROWD))] * len(intervals)
+            else:
+                values = [int(round(forecast.crowd[r, h0 * per_hour:h1 * per_hour].mean()))
+                          for h0, h1 in intervals]
+            pattern[path] = np.array(values)
+        return pattern
+
+    def close(self):
+        self.conn.close()
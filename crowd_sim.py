@@ -0,0 +1,379 @@
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import batch_assign
+import footpath_db
+import station_graph
+from crowd_counters import HALF_LIFE_SECS
+from footpath_db import DB_PATH
+
+# =====================================================
+# CONFIG
+# =====================================================
+HOURS = list(range(6, 21))                  # 6-7 ... 20-21, as on the dashboard
+PEAK_HOURS = {8, 9, 10, 17, 18, 19}         # 8–11 AM and 5–8 PM
+SIZE_BASE = {"big": 700, "medium": 450, "small": 250}   # passengers per hour
+PEAK_EXTRA = (300, 450)
+OFF_PEAK_DROP = (80, 220)
+MIN_HOURLY = 60
+
+# who walks where: mostly street <-> platform, some interchange traffic
+PAIR_WEIGHT = {("street", "platform"): 1.0, ("platform", "street"): 1.0,
+               ("platform", "platform"): 0.3}
+OTHER_PAIR_WEIGHT = 0.02
+
+# pedestrians per minute a segment lets through; a path queues at its
+# narrowest segment (fare gate array, one escalator, ...), shared with every
+# other path through that segment
+SEGMENT_CAPACITY = {"corridor": 100, "gate": 45, "stairs": 50, "escalator": 70}
+DEFAULT_CAPACITY = 40
+
+# walking slowdown with the path's flow/capacity ratio (BPR curve)
+BPR_ALPHA = 0.15
+BPR_BETA = 4
+
+TICK_SECS = 10          # policies see the station state as of the last tick
+
+SimResult = namedtuple("SimResult", "policy summary paths arrivals")
+
+
+def hourly_demand(station_size, rng=None):
+    # passengers per hour for HOURS; expected values, or one random day like
+    # the dashboard's station load chart when rng is given
+    base = SIZE_BASE.get(station_size, SIZE_BASE["small"])
+    load = []
+    for hour in HOURS:
+        if hour in PEAK_HOURS:
+            extra = sum(PEAK_EXTRA) / 2 if rng is None else rng.randint(*PEAK_EXTRA)
+            val = base + extra
+        else:
+            drop = sum(OFF_PEAK_DROP) / 2 if rng is None else rng.randint(*OFF_PEAK_DROP)
+            val = base - drop
+        load.append(max(MIN_HOURLY, val))
+    return load
+
+
+# =====================================================
+# STATION MODEL (paths, base times and capacities as arrays)
+# =====================================================
+# Every (start, end) pair is a row, its paths are columns padded with inf
+# base time, like batch_assign's (pairs × max paths) layout; bottleneck maps
+# each path to the segment it queues at.
+class StationModel:
+    def __init__(self, station_name, station_size, pairs, pair_weights, paths,
+                 base_minutes, bottlenecks, segments, segment_capacity):
+        self.station_name = station_name
+        self.station_size = station_size
+        self.pairs = pairs                          # [(start, end)]
+        self.pair_weights = np.asarray(pair_weights, dtype=float)
+        self.pair_weights /= self.pair_weights.sum()
+        self.paths = paths                          # [[path_name, ...]] per pair
+        self.segments = segments                    # [segment name]
+        self.segment_capacity = np.asarray(segment_capacity, dtype=float)
+        width = max(len(p) for p in paths)
+        self.base_minutes = np.full((len(pairs), width), np.inf)
+        self.bottleneck = np.zeros((len(pairs), width), dtype=np.int64)
+        for k, (minutes, segs) in enumerate(zip(base_minutes, bottlenecks)):
+            self.base_minutes[k, :len(minutes)] = minutes
+            self.bottleneck[k, :len(segs)] = segs
+        self.capacity = self.segment_capacity[self.bottleneck]
+
+    @property
+    def width(self):
+        return self.base_minutes.shape[1]
+
+
+def bottleneck_edge(graph, route):
+    # first of the route's lowest-capacity segments
+    return min(route.edges, key=lambda e: SEGMENT_CAPACITY.get(graph.edges[e].kind, DEFAULT_CAPACITY))
+
+
+def segment_name(graph, edge_id):
+    edge = graph.edges[edge_id]
+    return f"{edge.kind}: {graph.nodes[edge.from_node][0]} – {graph.nodes[edge.to_node][0]}"
+
+
+def load_station(route_engine, station_name):
+    db = route_engine.db
+    locations = db.query_df(footpath_db.LOCATIONS_SQL, (station_name,))["location_name"].tolist()
+    size_rows = db.query_rows(footpath_db.STATION_SIZE_SQL, (station_name,))
+    station_size = size_rows[0][0] if size_rows else "small"
+    graph = route_engine.graph(station_name)
+    pairs, weights, paths, base_minutes, bottlenecks = [], [], [], [], []
+    segments, segment_capacity, segment_of = [], [], {}
+
+    def segment(key, name, capacity):
+        if key not in segment_of:
+            segment_of[key] = len(segments)
+            segments.append(name)
+            segment_capacity.append(capacity)
+        return segment_of[key]
+
+    for start in locations:
+        for end in locations:
+            if start == end:
+                continue
+            routes = route_engine.routes(station_name, start, end)
+            if routes:
+                names = [r.path_name for r in routes]
+                minutes = [r.minutes for r in routes]
+                segs = []
+                for r in routes:
+                    e = bottleneck_edge(graph, r)
+                    segs.append(segment(e, segment_name(graph, e),
+                                        SEGMENT_CAPACITY.get(graph.edges[e].kind, DEFAULT_CAPACITY)))
+            else:
+                # no walkway graph: materialised routes, each its own segment
+                df = route_engine.route_table(station_name, start, end)
+                if df is None or df.empty:
+                    continue
+                names = df["Path"].tolist()
+                minutes = df["Base Time (mins)"].astype(float).tolist()
+                segs = [segment((start, end, name), name, DEFAULT_CAPACITY) for name in names]
+            kinds = (station_graph.classify_location(start), station_graph.classify_location(end))
+            pairs.append((start, end))
+            weights.append(PAIR_WEIGHT.get(kinds, OTHER_PAIR_WEIGHT))
+            paths.append(names)
+            base_minutes.append(minutes)
+            bottlenecks.append(segs)
+    if not pairs:
+        return None
+    return StationModel(station_name, station_size, pairs, weights, paths, base_minutes,
+                        bottlenecks, segments, segment_capacity)
+
+
+def generate_arrivals(model, pedestrians=None, rng=None):
+    # Poisson arrivals per hour from the station_size profile, scaled to
+    # `pedestrians` a day if given; (minutes since the first hour, pair index)
+    rng = np.random.default_rng() if rng is None else rng
+    demand = np.asarray(hourly_demand(model.station_size), dtype=float)
+    if pedestrians:
+        demand *= pedestrians / demand.sum()
+    counts = rng.poisson(demand)
+    t = np.repeat(np.arange(len(HOURS)) * 60.0, counts) + rng.random(counts.sum()) * 60.0
+    t.sort()
+    pair = rng.choice(len(model.pairs), size=t.size, p=model.pair_weights)
+    return t, pair
+
+
+# =====================================================
+# ASSIGNMENT POLICIES
+# =====================================================
+# policy(view, rng) -> chosen path column per arrival in the view. A view
+# holds one row per arrival: base minutes, decayed assignment load, queue
+# backlog at the bottleneck (minutes) and its capacity for each path of the
+# arrival's pair, as of the last tick – plus, in load and backlog, what the
+# earlier assignments of this tick add.
+PolicyView = namedtuple("PolicyView", "base_minutes load backlog capacity")
+
+
+def shortest_policy(view, rng):
+    return np.argmin(view.base_minutes, axis=1)
+
+
+def live_crowd_policy(view, rng):
+    # the results stage today: random background crowd + 8% per recent
+    # assignment, then the lowest "Live Estimated Time"
+    base_random = rng.integers(*batch_assign.BASE_CROWD_RANGE, size=view.load.shape)
+    crowd = batch_assign.live_crowd(base_random, view.load)
+    return np.argmin(batch_assign.live_time(view.base_minutes, crowd), axis=1)
+
+
+def queue_aware_policy(view, rng):
+    # what the path would actually cost: walking time plus the queue ahead
+    return np.argmin(view.base_minutes + view.backlog, axis=1)
+
+
+def random_policy(view, rng):
+    valid = np.isfinite(view.base_minutes)
+    scores = np.where(valid, rng.random(valid.shape), -1.0)
+    return np.argmax(scores, axis=1)
+
+
+POLICIES = {
+    "shortest": shortest_policy,
+    "live_crowd": live_crowd_policy,
+    "queue_aware": queue_aware_policy,
+    "random": random_policy,
+}
+
+
+# =====================================================
+# SIMULATION (vectorised per tick)
+# =====================================================
+# Each bottleneck segment is a FIFO server letting `capacity` pedestrians a
+# minute through. Departures follow Lindley's recursion, which for arrivals
+# a_0..a_m sorted in time with service time s and the segment free at F is
+#     d_i = (i + 1) s + max(F, max_{j <= i} (a_j - j s))
+# so a tick's arrivals at every segment are served in one segmented cummax.
+# Within a tick, arrivals for the same pair are assigned in rounds so each
+# sees the load of the ones before it, like batch_assign.assign_batch.
+def simulate(model, arrival_times, arrival_pairs, policy, tick_secs=TICK_SECS, rng=None):
+    rng = np.random.default_rng() if rng is None else rng
+    policy_fn = POLICIES[policy] if isinstance(policy, str) else policy
+    n = arrival_times.size
+    num_pairs, width = model.base_minutes.shape
+    num_segments = len(model.segments)
+    service = 1.0 / model.segment_capacity          # minutes per pedestrian
+    load = np.zeros((num_pairs, width))
+    free_at = np.zeros(num_segments)
+    choice = np.zeros(n, dtype=np.int64)
+    wait = np.zeros(n)
+    walk = np.zeros(n)
+
+    tick = tick_secs / 60.0
+    tick_of = (arrival_times // tick).astype(np.int64)
+    starts = np.r_[0, np.flatnonzero(np.diff(tick_of)) + 1] if n else np.empty(0, dtype=np.int64)
+    ends = np.r_[starts[1:], n]
+    decay_per_tick = 0.5 ** (tick_secs / HALF_LIFE_SECS)
+    last_tick = 0
+    group_offset = 2.0 * (arrival_times[-1] + 1.0) if n else 0.0
+
+    for lo, hi in zip(starts.tolist(), ends.tolist()):
+        now_tick = int(tick_of[lo])
+        load *= decay_per_tick ** (now_tick - last_tick)
+        last_tick = now_tick
+        now = now_tick * tick
+        a = arrival_times[lo:hi]
+        k = arrival_pairs[lo:hi]
+        backlog = np.maximum(free_at - now, 0.0)[model.bottleneck]
+
+        # ---------- assignment, in rounds of one arrival per pair ----------
+        order = np.argsort(k, kind="stable")
+        group_start = np.r_[0, np.flatnonzero(np.diff(k[order])) + 1]
+        rank = np.empty(k.size, dtype=np.int64)
+        rank[order] = np.arange(k.size) - np.repeat(group_start, np.diff(np.r_[group_start, k.size]))
+        picked = np.empty(k.size, dtype=np.int64)
+        queued = np.zeros(num_segments)     # minutes of queue this tick's picks add
+        for r in range(int(rank.max()) + 1):
+            idx = np.flatnonzero(rank == r)
+            kr = k[idx]
+            view = PolicyView(model.base_minutes[kr], load[kr],
+                              backlog[kr] + queued[model.bottleneck[kr]], model.capacity[kr])
+            c = policy_fn(view, rng)
+            picked[idx] = c
+            load[kr, c] += 1
+            chosen = model.bottleneck[kr, c]
+            np.add.at(queued, chosen, service[chosen])
+
+        # ---------- FIFO queue per bottleneck segment (segmented cummax) ----------
+        seg = model.bottleneck[k, picked]
+        order = np.lexsort((a, seg))
+        seg_sorted = seg[order]
+        a_sorted = a[order]
+        s = service[seg_sorted]
+        group_start = np.r_[0, np.flatnonzero(np.diff(seg_sorted)) + 1]
+        group_len = np.diff(np.r_[group_start, seg_sorted.size])
+        group = np.repeat(np.arange(group_start.size), group_len)
+        pos = np.arange(seg_sorted.size) - np.repeat(group_start, group_len)
+        prior = np.maximum.accumulate(a_sorted - pos * s + group * group_offset) - group * group_offset
+        depart = (pos + 1) * s + np.maximum(free_at[seg_sorted], prior)
+        last = group_start + group_len - 1
+        free_at[seg_sorted[last]] = depart[last]
+
+        # ---------- walking time, slowed by this tick's flow through the segment ----------
+        flow = np.bincount(seg, minlength=num_segments) / tick
+        slowdown = 1 + BPR_ALPHA * (flow / model.segment_capacity) ** BPR_BETA
+        out = lo + order
+        choice[out] = picked[order]
+        wait[out] = depart - s - a_sorted
+        walk[out] = model.base_minutes[k[order], picked[order]] * slowdown[seg_sorted]
+
+    return summarize(model, policy if isinstance(policy, str) else policy_fn.__name__,
+                     arrival_times, arrival_pairs, choice, wait, walk)
+
+
+def summarize(model, policy, arrival_times, arrival_pairs, choice, wait, walk):
+    arrivals = pd.DataFrame({
+        "Minute": arrival_times, "Pair": arrival_pairs, "Path Index": choice,
+        "Queue Delay (mins)": wait, "Walk (mins)": walk,
+    })
+    # per path: how many took it and how long they queued; per bottleneck
+    # segment: busy share over the day and in its busiest hour
+    width = model.width
+    flat = arrival_pairs * width + choice
+    assigned = np.bincount(flat, minlength=model.base_minutes.size)
+    used = np.flatnonzero(assigned)
+    seg = model.bottleneck.ravel()
+    hour = np.minimum((arrival_times // 60).astype(np.int64), len(HOURS) - 1)
+    per_hour = np.zeros((len(model.segments), len(HOURS)))
+    np.add.at(per_hour, (seg[flat], hour), 1)
+    utilisation = 100 * per_hour.sum(axis=1) / (model.segment_capacity * 60 * len(HOURS))
+    peak = 100 * per_hour.max(axis=1) / (model.segment_capacity * 60)
+    paths = pd.DataFrame({
+        "Start": [model.pairs[f // width][0] for f in used],
+        "End": [model.pairs[f // width][1] for f in used],
+        "Path": [model.paths[f // width][f % width] for f in used],
+        "Bottleneck": [model.segments[seg[f]] for f in used],
+        "Assigned": assigned[used],
+        "Share (%)": np.round(100 * assigned[used] / np.bincount(arrival_pairs)[used // width], 1),
+        "Mean Queue (mins)": np.round(np.bincount(flat, weights=wait)[used] / assigned[used], 2),
+        "Bottleneck Utilisation (%)": np.round(utilisation[seg[used]], 1),
+        "Peak Hour Utilisation (%)": np.round(peak[seg[used]], 1),
+    })
+    total = wait + walk
+
+    def stat(fn, values):
+        # no arrivals (zero demand): zeros rather than statistics of nothing
+        return round(float(fn(values)), 3) if values.size else 0.0
+
+    summary = {
+        "policy": policy,
+        "pedestrians": int(arrival_times.size),
+        "mean queue (mins)": stat(np.mean, wait),
+        "p95 queue (mins)": stat(lambda v: np.percentile(v, 95), wait),
+        "max queue (mins)": stat(np.max, wait),
+        "mean total (mins)": stat(np.mean, total),
+        "p95 total (mins)": stat(lambda v: np.percentile(v, 95), total),
+        "max peak utilisation (%)": round(float(peak.max()), 1),
+    }
+    return SimResult(policy, summary, paths, arrivals)
+
+
+def compare_policies(model, policies, pedestrians=None, seed=0, tick_secs=TICK_SECS):
+    # same arrivals for every policy, so differences are the policy's alone
+    arrival_times, arrival_pairs = generate_arrivals(model, pedestrians,
+                                                     np.random.default_rng(seed))
+    return [simulate(model, arrival_times, arrival_pairs, policy, tick_secs,
+                     np.random.default_rng(seed + 1))
+            for policy in policies]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a day of pedestrians under assignment policies.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--station", default="Majestic (Kempegowda Interchange)")
+    parser.add_argument("--pedestrians", type=int, default=100_000,
+                        help="pedestrians over the day (0 = the station_size profile as is)")
+    parser.add_argument("--policies", default=",".join(POLICIES))
+    parser.add_argument("--tick", type=float, default=TICK_SECS, help="seconds between state refreshes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--paths", action="store_true", help="print per-path utilisation too")
+    args = parser.parse_args()
+
+    route_engine = station_graph.RouteEngine(footpath_db.DataAccess(args.db))
+    model = load_station(route_engine, args.station)
+    if model is None:
+        print(f"❌ No routes for {args.station}.")
+        return
+    t0 = time.perf_counter()
+    results = compare_policies(model, args.policies.split(","), args.pedestrians or None,
+                               args.seed, args.tick)
+    elapsed = time.perf_counter() - t0
+    print(f"🚶 {args.station}: {len(model.pairs)} location pairs, "
+          f"{results[0].summary['pedestrians']:,} pedestrians, {len(results)} policies "
+          f"in {elapsed:.2f} s")
+    print(pd.DataFrame([r.summary for r in results]).to_string(index=False))
+    if args.paths:
+        for r in results:
+            print(f"\n--- {r.policy} ---")
+            print(r.paths.sort_values("Peak Hour Utilisation (%)", ascending=False)
+                  .head(15).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from assignment_engine import STATE_DB_PATH
+
+# =====================================================
+# CONFIG
+# =====================================================
+FOOTFALL_LOG = os.environ.get("FOOTFALL_LOG", "footfall_events.jsonl")
+CHUNK_BYTES = 8 * 1024 * 1024      # read at most this much per transaction
+STEP_BYTES = 1024 * 1024           # poll_step(): backlog read per dashboard rerun / API request
+SKIP_BLOCK_BYTES = 1024 * 1024     # read size while skipping a line longer than a chunk
+MAX_EVENT_COUNT = 10_000           # people in one event; anything above is a bad line
+MAX_TS = 1e11                      # seconds since the epoch (year ~5138)
+PRUNE_EVERY_SECS = 5 * 60          # poll() drops expired buckets at most this often
+PATH_BUCKET_SECS = 60              # per-path counts in 1-minute buckets...
+PATH_WINDOW_SECS = 15 * 60         # ...summed over the last 15 minutes for live crowd
+PATH_RETENTION_SECS = 2 * 60 * 60
+STATION_RETENTION_SECS = 3 * 24 * 60 * 60
+PATH_CAPACITY_PER_MIN = 40         # pedestrians per minute that make a path 100% crowded
+
+# Event lines (one JSON object per line, appended by gates and sensors):
+#   {"ts": 1760600000.0, "station": "Trinity", "gate": "Entry A", "count": 1}
+#   {"ts": 1760600000.0, "station": "Trinity", "start": "Entry A",
+#    "end": "Platform - Kengeri Direction", "path": "Route 2: Entry A → Platform", "count": 3}
+# Every event counts towards its station; events naming a path also count
+# towards that path. Malformed lines (no station, a count outside
+# 0..MAX_EVENT_COUNT, a bad timestamp) are skipped and counted, never retried.
+# Station buckets start on local-time hours, matching station_hourly().
+
+
+# =====================================================
+# INGESTION (offset checkpoints, exactly-once)
+# =====================================================
+class FootfallIngestor:
+    def __init__(self, log_path=FOOTFALL_LOG, db_path=STATE_DB_PATH, clock=time.time):
+        self.log_path = os.path.abspath(log_path)
+        self.db_path = os.path.abspath(db_path)
+        self.clock = clock
+        self.skipped = 0
+        self._last_prune = 0.0
+        self._lock = threading.Lock()   # one connection shared by the dashboard's threads
+        self.conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS ingest_offsets (
+                source      TEXT    PRIMARY KEY,
+                inode       INTEGER NOT NULL,
+                byte_offset INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS path_footfall (
+                station_name   TEXT    NOT NULL,
+                start_location TEXT    NOT NULL,
+                end_location   TEXT    NOT NULL,
+                path_name      TEXT    NOT NULL,
+                bucket         INTEGER NOT NULL,
+                people         INTEGER NOT NULL,
+                seq            INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (station_name, start_location, end_location, path_name, bucket)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS station_footfall (
+                station_name TEXT    NOT NULL,
+                bucket       INTEGER NOT NULL,
+                people       INTEGER NOT NULL,
+                PRIMARY KEY (station_name, bucket)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS ingest_sequence (
+                id  INTEGER PRIMARY KEY CHECK (id = 0),
+                seq INTEGER NOT NULL
+            );
+        """)
+        # seq: the ingest transaction that last touched a path bucket, so
+        # readers (crowd_forecast) can follow ingestion order, late events included
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(path_footfall);")}
+        if "seq" not in columns:
+            self.conn.execute("ALTER TABLE path_footfall ADD COLUMN seq INTEGER NOT NULL DEFAULT 0;")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_path_footfall_seq ON path_footfall (seq);")
+
+    def _checkpoint(self):
+        row = self.conn.execute(
+            "SELECT inode, byte_offset FROM ingest_offsets WHERE source = ?;",
+            (self.log_path,)
+        ).fetchone()
+        return row or (None, 0)
+
+    def poll(self, max_bytes=CHUNK_BYTES, max_chunks=None):
+        # ingest what was appended since the last checkpoint, at most
+        # max_chunks transactions (None: until caught up); safe to call from
+        # several processes – the write lock serialises them and each one
+        # resumes from the offset the previous one committed
+        total = self._poll(max_bytes, max_chunks)
+        now = self.clock()
+        if now - self._last_prune >= PRUNE_EVERY_SECS:
+            self._last_prune = now
+            self.prune(now)
+        return total
+
+    def poll_step(self):
+        # bounded work for request paths: a large backlog is worked off over
+        # later calls (or by footfall_ingest.py --follow) instead of stalling one
+        return self.poll(STEP_BYTES, max_chunks=1)
+
+    def _poll(self, max_bytes, max_chunks):
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            return 0
+        total = 0
+        with self._lock:
+            inode, offset = self._checkpoint()
+            if inode == st.st_ino and offset == st.st_size:
+                return 0    # nothing new: one stat() and one indexed read
+            chunks = 0
+            while True:
+                ingested, more = self._ingest_chunk(max_bytes)
+                total += ingested
+                chunks += 1
+                if not more or (max_chunks is not None and chunks >= max_chunks):
+                    return total
+
+    def _ingest_chunk(self, max_bytes):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            inode, offset = self._checkpoint()
+            with open(self.log_path, "rb") as f:
+                st = os.fstat(f.fileno())
+                if inode != st.st_ino or offset > st.st_size:
+                    offset = 0      # rotated or truncated: start the new file from the top
+                f.seek(offset)
+                data = f.read(max_bytes)
+                # only complete lines; a half-written last line waits for the next poll
+                end = data.rfind(b"\n") + 1
+                if end == 0 and len(data) == max_bytes:
+                    # one line longer than a whole chunk: drop it, resume after it
+                    line_end = self._skip_line(f)
+                    if line_end is not None:
+                        end = line_end - offset
+                        self.skipped += 1
+                    data = b""
+            path_counts, station_counts, events = self.aggregate(data[:end])
+            self._apply(path_counts, station_counts)
+            conn.execute(
+                "INSERT OR REPLACE INTO ingest_offsets (source, inode, byte_offset) "
+                "VALUES (?, ?, ?);",
+                (self.log_path, st.st_ino, offset + end)
+            )
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+        more = end > 0 and offset + end < st.st_size
+        return events, more
+
+    def _skip_line(self, f):
+        # file position just past the next newline, or None while the line is unfinished
+        while True:
+            block = f.read(SKIP_BLOCK_BYTES)
+            if not block:
+                return None
+            i = block.find(b"\n")
+            if i >= 0:
+                return f.tell() - len(block) + i + 1
+
+    def aggregate(self, data):
+        # tight loop: decode, validate, bucket and count in plain dicts
+        path_counts, station_counts = {}, {}
+        hour_of = {}                # minute bucket -> start of its local hour
+        events = 0
+        now = self.clock()
+        loads = json.loads
+        for line in data.splitlines():
+            if not line:
+                continue
+            try:
+                event = loads(line)
+                station = event["station"]
+                count = event.get("count", 1)
+                ts = event.get("ts")
+                if ts is None:
+                    ts = now
+            except (ValueError, KeyError, TypeError, AttributeError):
+                self.skipped += 1
+                continue
+            if (not isinstance(station, str) or not station
+                    or type(count) is not int or not 0 <= count <= MAX_EVENT_COUNT
+                    or type(ts) not in (int, float) or not 0 <= ts < MAX_TS):
+                self.skipped += 1
+                continue
+            bucket = int(ts // PATH_BUCKET_SECS) * PATH_BUCKET_SECS
+            hour = hour_of.get(bucket)
+            if hour is None:
+                hour = hour_of[bucket] = bucket - time.localtime(bucket).tm_min * 60
+            path = (event.get("start"), event.get("end"), event.get("path"))
+            if all(isinstance(part, str) and part for part in path):
+                path_key = (station,) + path + (bucket,)
+                path_counts[path_key] = path_counts.get(path_key, 0) + count
+            station_key = (station, hour)
+            station_counts[station_key] = station_counts.get(station_key, 0) + count
+            events += 1
+        return path_counts, station_counts, events
+
+    def _next_seq(self):
+        self.conn.execute(
+            "INSERT INTO ingest_sequence (id, seq) VALUES (0, 1) "
+            "ON CONFLICT (id) DO UPDATE SET seq = seq + 1;")
+        return self.conn.execute("SELECT seq FROM ingest_sequence WHERE id = 0;").fetchone()[0]
+
+    def _apply(self, path_counts, station_counts):
+        if path_counts:
+            seq = self._next_seq()
+            self.conn.executemany(
+                """
+                INSERT INTO path_footfall
+                    (station_name, start_location, end_location, path_name, bucket, people, seq)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (station_name, start_location, end_location, path_name, bucket)
+                DO UPDATE SET people = people + excluded.people, seq = excluded.seq;
+                """,
+                [key + (count, seq) for key, count in path_counts.items()]
+            )
+        self.conn.executemany(
+            """
+            INSERT INTO station_footfall (station_name, bucket, people) VALUES (?, ?, ?)
+            ON CONFLICT (station_name, bucket) DO UPDATE SET people = people + excluded.people;
+            """,
+            [key + (count,) for key, count in station_counts.items()]
+        )
+
+    def prune(self, now=None):
+        now = self.clock() if now is None else now
+        with self._lock:
+            self.conn.execute("DELETE FROM path_footfall WHERE bucket < ?;",
+                              (now - PATH_RETENTION_SECS,))
+            self.conn.execute("DELETE FROM station_footfall WHERE bucket < ?;",
+                              (now - STATION_RETENTION_SECS,))
+
+    # ---------------- windowed reads ----------------
+    def _query(self, sql, params):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def path_counts(self, station_name, start_location, end_location,
+                    now=None, window_secs=PATH_WINDOW_SECS):
+        now = self.clock() if now is None else now
+        rows = self._query(
+            """
+            SELECT path_name, SUM(people)
+            FROM path_footfall
+            WHERE station_name = ? AND start_location = ? AND end_location = ?
+              AND bucket > ?
+            GROUP BY path_name;
+            """,
+            (station_name, start_location, end_location, now - window_secs)
+        )
+        return dict(rows)
+
+    def path_crowd(self, station_name, start_location, end_location,
+                   now=None, window_secs=PATH_WINDOW_SECS):
+        # observed crowd (%) per path, for paths with sensor data in the window
+        counts = self.path_counts(station_name, start_location, end_location, now, window_secs)
+        capacity = PATH_CAPACITY_PER_MIN * window_secs / 60     # people per window at 100%
+        return {path: min(100, int(round(100 * people / capacity))) for path, people in counts.items()}
+
+    def station_hourly(self, station_name, day_start):
+        # {hour of day: people} for the day starting at day_start (epoch secs)
+        rows = self._query(
+            """
+            SELECT bucket, people FROM station_footfall
+            WHERE station_name = ? AND bucket >= ? AND bucket < ?;
+            """,
+            (station_name, day_start, day_start + 24 * 60 * 60)
+        )
+        return {int((bucket - day_start) // 3600): people for bucket, people in rows}
+
+    def close(self):
+        self.conn.close()
+
+
+def local_day_start(now=None):
+    now = time.time() if now is None else now
+    t = time.localtime(now)
+    return int(now - (t.tm_hour * 3600 + t.tm_min * 60 + t.tm_sec))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tail a footfall JSONL stream into windowed counts.")
+    parser.add_argument("--log", default=FOOTFALL_LOG)
+    parser.add_argument("--db", default=STATE_DB_PATH)
+    parser.add_argument("--follow", action="store_true", help="keep tailing the file")
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    ingestor = FootfallIngestor(args.log, args.db)
+    while True:
+        t0 = time.perf_counter()
+        n = ingestor.poll()
+        if n:
+            elapsed = time.perf_counter() - t0
+            print(f"Ingested {n} events in {elapsed:.2f} s ({n / elapsed:,.0f}/s)")
+            ingestor.prune()
+        if not args.follow:
+            break
+        time.sleep(args.interval)
+    ingestor.close()
+
+
+if __name__ == "__main__":
+    main()
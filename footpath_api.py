@@ -0,0 +1,372 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import assignment_engine
+import assignment_log
+import batch_assign
+import crowd_forecast
+import footfall_ingest
+import footpath_db
+import journey_planner
+import metrics
+import migrate_db
+import segment_congestion
+import station_graph
+import station_search
+import warm_cache
+
+# =====================================================
+# CONFIG
+# =====================================================
+DB_PATH = "metro_footpath.db"
+HOST = "127.0.0.1"
+PORT = 8080
+DB_WORKERS = footpath_db.POOL_SIZE    # executor threads == pooled read connections
+MAX_BATCH = 256                       # assign requests coalesced into one batch...
+BATCH_WINDOW_SECS = 0.002             # ...or whatever arrived within this window
+MAX_BODY_BYTES = 1024 * 1024
+ENDPOINTS = {"/lines", "/stations", "/locations", "/routes", "/search", "/journey", "/assign", "/health", "/metrics"}
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 413: "Payload Too Large",
+               500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# =====================================================
+# BLOCKING SERVICE LAYER (runs on the executor threads)
+# =====================================================
+# Same queries, caches and engines as the dashboard: pooled read-only
+# connections for the route data, the shared WAL state DB for assignments.
+class FootpathService:
+    def __init__(self, db_path=DB_PATH, state_db_path=assignment_engine.STATE_DB_PATH,
+                 log_dir=assignment_log.LOG_DIR):
+        migrate_db.ensure_current(db_path)
+        self.db = footpath_db.get_data_access(db_path)
+        self.route_engine = station_graph.RouteEngine(self.db)
+        self.assignments = assignment_engine.AssignmentEngine(state_db_path)
+        # per-segment load, so routes sharing a corridor slow down together
+        self.congestion = segment_congestion.SegmentCongestion(self.route_engine, self.assignments,
+                                                               state_db_path)
+        self.history = assignment_log.AssignmentLog(log_dir)
+        # sensor footfall and learned crowd profiles: /assign picks paths with
+        # the same policy as the dashboard (batch_assign.expected_times)
+        self.footfall = footfall_ingest.FootfallIngestor(footfall_ingest.FOOTFALL_LOG,
+                                                         state_db_path)
+        self.forecaster = crowd_forecast.CrowdForecaster(state_db_path)
+        self.search_index = station_search.StationSearch(self.db)
+        self.journeys = journey_planner.JourneyPlanner(self.db, self.route_engine, self.congestion)
+        # search index + journey network from the prebuilt artefact, if current
+        self.warm = warm_cache.warm(self.db, self.route_engine, self.search_index, self.journeys)
+        self._records = footpath_db.QueryCache(footpath_db.CACHE_SIZE * 8)
+        self._version = None
+
+    def lines(self):
+        return self.db.query_df(footpath_db.LINES_SQL)["line_name"].tolist()
+
+    def stations(self, line_name):
+        return self.db.query_df(footpath_db.STATIONS_SQL, (line_name,))["station_name"].tolist()
+
+    def locations(self, station_name):
+        return self.db.query_df(footpath_db.LOCATIONS_SQL, (station_name,))["location_name"].tolist()
+
+    def routes(self, station_name, start_location, end_location):
+        # JSON-ready rows, cached per pair until the route data changes
+        # (DataFrame.to_dict was most of the cost of a /routes request)
+        version = self.db.check_for_changes()
+        if version != self._version:
+            self._records.clear()
+            self._version = version
+        key = (station_name, start_location, end_location)
+        records = self._records.get(key)
+        if records is None:
+            df = self.route_engine.route_table(station_name, start_location, end_location)
+            columns = list(df.columns)
+            records = [dict(zip(columns, row))
+                       for row in zip(*(df[c].tolist() for c in columns))]
+            self._records.put(key, records)
+        return records
+
+    def search(self, query, limit, kind):
+        return [match._asdict() for match in self.search_index.search(query, limit, kind)]
+
+    def journey(self, origin_station, origin_location, dest_station, dest_location):
+        if not self.journeys.available():
+            raise ApiError(503, "journey planning needs the line stop order "
+                                "(journey_planner.py --import-stops)")
+        journey = self.journeys.plan(origin_station, origin_location, dest_station, dest_location)
+        if journey is None:
+            raise ApiError(404, "no journey between these locations")
+        return {"minutes": journey.minutes, "legs": [leg._asdict() for leg in journey.legs]}
+
+    def assign(self, requests):
+        # one vectorised batch, one group commit of the chosen paths
+        self.footfall.poll_step()
+        self.forecaster.refresh()
+        df = batch_assign.assign_batch(requests, self.route_engine.route_table,
+                                       engine=self.congestion,
+                                       observed=self.footfall.path_crowd,
+                                       forecaster=self.forecaster)
+        results = [
+            {
+                "station": row[0], "start": row[1], "end": row[2], "path": row[3],
+                "live_crowd": int(row[4]),
+                "live_time": None if math.isnan(row[5]) else float(row[5]),
+                "expected_time": None if math.isnan(row[6]) else float(row[6]),
+            }
+            for row in df.itertuples(index=False, name=None)
+        ]
+        self.history.append_many(
+            (r["station"], r["start"], r["end"], r["path"], r["live_crowd"], r["live_time"])
+            for r in results if r["path"] is not None
+        )
+        return results
+
+
+# =====================================================
+# REQUEST BATCHING (concurrent /assign calls -> one assign_batch)
+# =====================================================
+class AssignBatcher:
+    def __init__(self, run_batch, executor, max_batch=MAX_BATCH, window=BATCH_WINDOW_SECS):
+        self.run_batch = run_batch
+        self.executor = executor
+        self.max_batch = max_batch
+        self.window = window
+        self._pending = []
+        self._size = 0
+        self._timer = None
+
+    async def submit(self, requests):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((requests, future))
+        self._size += len(requests)
+        if self._size >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._size = self._pending, [], 0
+        if batch:
+            asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch):
+        flat = [request for requests, _ in batch for request in requests]
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, self.run_batch, flat)
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        offset = 0
+        for requests, future in batch:
+            if not future.done():
+                future.set_result(results[offset:offset + len(requests)])
+            offset += len(requests)
+
+
+# =====================================================
+# HTTP/1.1 JSON API (asyncio streams, keep-alive)
+# =====================================================
+def parse_assign_body(body):
+    # {"station", "start", "end"} or {"requests": [{...}, ...]}; every value
+    # a non-empty string, checked here so one bad item can't fail a whole
+    # coalesced batch in the AssignBatcher
+    try:
+        payload = json.loads(body or b"{}")
+        is_batch = isinstance(payload, dict) and "requests" in payload
+        items = payload["requests"] if is_batch else [payload]
+        keys = [(item["station"], item["start"], item["end"]) for item in items]
+    except (ValueError, KeyError, TypeError):
+        keys = None
+    if keys is None or not all(isinstance(value, str) and value for key in keys for value in key):
+        raise ApiError(400, "expected {station, start, end} or {requests: [...]} with string values")
+    return keys, is_batch
+
+
+def content_length(value):
+    if not value:
+        return 0
+    if not (value.isascii() and value.isdigit()):
+        raise ApiError(400, "invalid Content-Length")
+    return int(value)
+
+
+def require(query, *names):
+    missing = [name for name in names if not query.get(name)]
+    if missing:
+        raise ApiError(400, f"missing query parameter(s): {', '.join(missing)}")
+    return [query[name] for name in names]
+
+
+class FootpathAPI:
+    def __init__(self, service, workers=DB_WORKERS):
+        self.service = service
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="footpath-db")
+        self.batcher = AssignBatcher(service.assign, self.executor)
+
+    async def _call(self, fn, *args):
+        # keep SQLite and pandas off the event loop
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        path = url.path.rstrip("/") or "/"
+
+        if path == "/assign":
+            if method != "POST":
+                raise ApiError(405, "use POST")
+            requests, is_batch = parse_assign_body(body)
+            results = await self.batcher.submit(requests)
+            return {"assignments": results} if is_batch else results[0]
+
+        if method != "GET":
+            raise ApiError(405, "use GET")
+        if path == "/lines":
+            return {"lines": await self._call(self.service.lines)}
+        if path == "/stations":
+            line_name, = require(query, "line")
+            return {"stations": await self._call(self.service.stations, line_name)}
+        if path == "/locations":
+            station_name, = require(query, "station")
+            return {"locations": await self._call(self.service.locations, station_name)}
+        if path == "/routes":
+            station_name, start, end = require(query, "station", "start", "end")
+            return {"routes": await self._call(self.service.routes, station_name, start, end)}
+        if path == "/search":
+            text, = require(query, "q")
+            kind = query.get("kind")
+            if kind not in (None, "station", "location"):
+                raise ApiError(400, "kind must be station or location")
+            try:
+                limit = max(1, min(int(query.get("limit", 10)), 100))
+            except ValueError:
+                raise ApiError(400, "limit must be an integer")
+            return {"matches": await self._call(self.service.search, text, limit, kind)}
+        if path == "/journey":
+            args = require(query, "from_station", "from", "to_station", "to")
+            return await self._call(self.service.journey, *args)
+        if path == "/health":
+            return {"status": "ok", "pid": os.getpid(), "warm": self.service.warm}
+        if path == "/metrics":
+            return metrics.prometheus_text()   # plain text, not JSON
+        raise ApiError(404, f"no such endpoint: {path}")
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                body_read = False
+                try:
+                    length = content_length(headers.get("content-length"))
+                    if length > MAX_BODY_BYTES:
+                        raise ApiError(413, "request body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    body_read = True
+                    endpoint = urlsplit(target).path.rstrip("/")
+                    endpoint = endpoint if endpoint in ENDPOINTS else "other"   # bounded labels
+                    with metrics.timer("api_request_seconds", endpoint=endpoint):
+                        status, payload = 200, await self.dispatch(method, target, body)
+                except ApiError as exc:
+                    status, payload = exc.status, {"error": str(exc)}
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception as exc:
+                    status, payload = 500, {"error": f"{type(exc).__name__}: {exc}"}
+
+                # an unread body would be parsed as the next request: close instead
+                keep_alive = (version == "HTTP/1.1"
+                              and headers.get("connection", "").lower() != "close"
+                              and body_read)
+                metrics.inc("api_requests_total", status=status)
+                if isinstance(payload, str):
+                    content_type = "text/plain; version=0.0.4"
+                    data = payload.encode("utf-8")
+                else:
+                    content_type = "application/json"
+                    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                    f"Content-Type: {content_type}; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    .encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT, ready=None, reuse_port=False):
+        # reuse_port: several worker processes share one port and the kernel
+        # spreads connections over them (footpath_cluster.py --balancer kernel)
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024,
+                                            reuse_port=reuse_port)
+        if ready is not None:
+            ready(server)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.service.history.close()    # drain the assignment log
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON API for lines, stations, routes and path assignment.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--state-db", default=assignment_engine.STATE_DB_PATH)
+    parser.add_argument("--log-dir", default=assignment_log.LOG_DIR)
+    parser.add_argument("--workers", type=int, default=DB_WORKERS)
+    parser.add_argument("--reuse-port", action="store_true",
+                        help="share the port with other worker processes (SO_REUSEPORT)")
+    args = parser.parse_args()
+
+    api = FootpathAPI(FootpathService(args.db, args.state_db, args.log_dir), args.workers)
+    print(f"Footpath API listening on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(api.serve(args.host, args.port, reuse_port=args.reuse_port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import argparse
+import asyncio
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+
+import assignment_engine
+import assignment_log
+import footpath_api
+import migrate_db
+import route_store
+import warm_cache
+
+# =====================================================
+# CONFIG
+# =====================================================
+ROOT = os.path.dirname(os.path.abspath(__file__))
+HOST = "127.0.0.1"
+PORTS = {"api": footpath_api.PORT, "dashboard": 8501}
+WORKERS = os.cpu_count() or 1
+STARTUP_TIMEOUT_SECS = 60
+BACKEND_RETRY_SECS = 2.0        # a worker that refused a connection is skipped this long
+RESTART_DELAY_SECS = 1.0
+PIPE_CHUNK_BYTES = 64 * 1024
+STICKY_COOKIE = "footpath_worker"
+
+STICKY_RE = re.compile(rb"(?im)^cookie:[^\r\n]*\b" + STICKY_COOKIE.encode() + rb"=(\d+)")
+UNAVAILABLE = (b"HTTP/1.1 503 Service Unavailable\r\nContent-Type: text/plain\r\n"
+               b"Content-Length: 20\r\nConnection: close\r\n\r\nno worker available\n")
+
+# Deployment: one supervisor process prepares the shared read-only data,
+# starts N worker processes (the JSON API or the Streamlit dashboard) on
+# their own ports and balances client connections over them.
+#   - metro_footpath.db is migrated once here, then only ever opened
+#     read-only; the route store snapshot (.routes) is mmap'ed by every
+#     worker, so they share one page-cache copy
+#   - workers start warm from the .warm artefact (warm_cache.py)
+#   - congestion state is already cross-process: every worker uses the same
+#     WAL state DB (assignments, footfall, crowd profiles)
+
+
+# =====================================================
+# SHARED READ-ONLY ARTEFACTS (built once, before any worker starts)
+# =====================================================
+def prepare(db_path, state_db_path):
+    t0 = time.perf_counter()
+    migrate_db.ensure_current(db_path)
+    route_store.open_store(db_path)         # (re)writes the .routes snapshot if stale
+    path = warm_cache.build(db_path)
+    # create the state DB (and switch it to WAL) before N workers race to do it
+    assignment_engine.AssignmentEngine(state_db_path)
+    print(f"Prepared {route_store.snapshot_path(db_path)} and {path} "
+          f"in {time.perf_counter() - t0:.2f} s")
+
+
+# =====================================================
+# WORKER PROCESSES (restarted if they exit)
+# =====================================================
+def worker_command(args, port):
+    if args.app == "dashboard":
+        # the dashboard reads metro_footpath.db / footpath_state.db from ROOT
+        return [sys.executable, "-m", "streamlit", "run",
+                os.path.join(ROOT, "footpath_dashboard_simple.py"),
+                "--server.address", HOST, "--server.port", str(port),
+                "--server.headless", "true", "--browser.gatherUsageStats", "false"]
+    command = [sys.executable, os.path.join(ROOT, "footpath_api.py"),
+               "--db", args.db, "--state-db", args.state_db, "--log-dir", args.log_dir,
+               "--host", HOST if args.balancer == "proxy" else args.host, "--port", str(port)]
+    if args.balancer == "kernel":
+        command.append("--reuse-port")
+    return command
+
+
+class WorkerPool:
+    def __init__(self, commands):
+        self.commands = commands
+        self.procs = [None] * len(commands)
+        self._stopping = False
+
+    def _spawn(self, i):
+        self.procs[i] = subprocess.Popen(self.commands[i], cwd=ROOT,
+                                         stdout=subprocess.DEVNULL)
+
+    def start(self):
+        for i in range(len(self.commands)):
+            self._spawn(i)
+
+    async def supervise(self):
+        while not self._stopping:
+            await asyncio.sleep(RESTART_DELAY_SECS)
+            for i, proc in enumerate(self.procs):
+                if not self._stopping and proc.poll() is not None:
+                    print(f"worker {i} (pid {proc.pid}) exited with {proc.returncode}; restarting",
+                          file=sys.stderr)
+                    self._spawn(i)
+
+    def stop(self):
+        self._stopping = True
+        for proc in self.procs:
+            if proc is not None and proc.poll() is None:
+                proc.terminate()
+        for proc in self.procs:
+            if proc is not None:
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+
+
+async def wait_until_listening(host, port, timeout=STARTUP_TIMEOUT_SECS):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return True
+        except OSError:
+            await asyncio.sleep(0.1)
+    return False
+
+
+# =====================================================
+# LOAD BALANCER (asyncio TCP proxy, least connections)
+# =====================================================
+# Connections go to the worker with the fewest open ones (round-robin on
+# ties); bytes are piped both ways untouched, so keep-alive and WebSockets
+# just work. Streamlit keeps each session in the process that served its
+# page, so with sticky=True the first response carries a cookie naming the
+# worker and later connections from that browser go back to it.
+class LoadBalancer:
+    def __init__(self, backends, sticky=False):
+        self.backends = backends            # [(host, port)]
+        self.sticky = sticky
+        self.active = [0] * len(backends)
+        self.down_until = [0.0] * len(backends)
+        self._next = 0
+
+    def pick(self, preferred=None):
+        now = time.monotonic()
+        n = len(self.backends)
+        if preferred is not None and 0 <= preferred < n and self.down_until[preferred] <= now:
+            return preferred
+        candidates = [i for i in range(n) if self.down_until[i] <= now] or list(range(n))
+        start = self._next
+        self._next = (self._next + 1) % n
+        return min(candidates, key=lambda i: (self.active[i], (i - start) % n))
+
+    async def connect(self, preferred=None):
+        for _ in range(len(self.backends)):
+            i = self.pick(preferred)
+            try:
+                reader, writer = await asyncio.open_connection(*self.backends[i])
+                return i, reader, writer
+            except OSError:
+                self.down_until[i] = time.monotonic() + BACKEND_RETRY_SECS
+                preferred = None
+        raise ConnectionError("no worker available")
+
+    async def _pipe(self, reader, writer):
+        try:
+            while True:
+                data = await reader.read(PIPE_CHUNK_BYTES)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+            if writer.can_write_eof():
+                writer.write_eof()          # half-close: let the response finish
+            else:
+                writer.close()
+        except (ConnectionError, RuntimeError, asyncio.IncompleteReadError):
+            writer.close()
+
+    async def _pipe_with_cookie(self, reader, writer, worker):
+        # add Set-Cookie to the first response head, then pipe as usual
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        cookie = f"Set-Cookie: {STICKY_COOKIE}={worker}; Path=/; HttpOnly; SameSite=Lax\r\n"
+        writer.write(head[:-2] + cookie.encode("latin-1") + b"\r\n")
+        await self._pipe(reader, writer)
+
+    async def handle(self, client_reader, client_writer):
+        head, preferred = b"", None
+        if self.sticky:
+            try:
+                head = await client_reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                client_writer.close()
+                return
+            match = STICKY_RE.search(head)
+            preferred = int(match.group(1)) if match else None
+        try:
+            i, reader, writer = await self.connect(preferred)
+        except ConnectionError:
+            client_writer.write(UNAVAILABLE)
+            client_writer.close()
+            return
+        self.active[i] += 1
+        try:
+            writer.write(head)
+            downstream = (self._pipe_with_cookie(reader, client_writer, i)
+                          if self.sticky and preferred != i
+                          else self._pipe(reader, client_writer))
+            await asyncio.gather(self._pipe(client_reader, writer), downstream)
+        except asyncio.CancelledError:
+            pass                            # balancer shutting down with the connection open
+        finally:
+            self.active[i] -= 1
+            writer.close()
+            client_writer.close()
+
+
+# =====================================================
+# SUPERVISOR
+# =====================================================
+async def run_cluster(args):
+    port_base = args.port + 1
+    if args.balancer == "kernel":
+        ports = [args.port] * args.workers      # one shared port, no proxy hop
+    else:
+        ports = [port_base + i for i in range(args.workers)]
+    pool = WorkerPool([worker_command(args, port) for port in ports])
+    pool.start()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    supervisor = asyncio.create_task(pool.supervise())
+    server = None
+    try:
+        started = await asyncio.gather(*[wait_until_listening(HOST, port) for port in set(ports)])
+        if not all(started):
+            raise RuntimeError("workers did not start listening in time")
+        if args.balancer == "proxy":
+            balancer = LoadBalancer([(HOST, port) for port in ports],
+                                    sticky=args.app == "dashboard")
+            server = await asyncio.start_server(balancer.handle, args.host, args.port,
+                                                backlog=1024)
+        print(f"Footpath cluster: {args.workers} {args.app} workers behind "
+              f"http://{args.host}:{args.port} ({args.balancer} balancing)", flush=True)
+        await stop.wait()
+    finally:
+        supervisor.cancel()
+        if server is not None:
+            server.close()
+        pool.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run N footpath workers behind a local load balancer.")
+    parser.add_argument("--app", choices=sorted(PORTS), default="api")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=None,
+                        help="public port; workers listen on the ports right after it")
+    parser.add_argument("--balancer", choices=("proxy", "kernel"), default="proxy",
+                        help="kernel: API workers share the port via SO_REUSEPORT")
+    parser.add_argument("--db", default=footpath_api.DB_PATH, help="API only")
+    parser.add_argument("--state-db", default=assignment_engine.STATE_DB_PATH, help="API only")
+    parser.add_argument("--log-dir", default=assignment_log.LOG_DIR, help="API only")
+    parser.add_argument("--skip-prepare", action="store_true",
+                        help="reuse the existing .routes/.warm artefacts as they are")
+    args = parser.parse_args()
+
+    if args.balancer == "kernel" and args.app != "api":
+        parser.error("--balancer kernel needs sticky-free workers: use it with --app api")
+    if args.port is None:
+        args.port = PORTS[args.app]
+    if args.app == "dashboard":
+        args.db = os.path.join(ROOT, footpath_api.DB_PATH)
+        args.state_db = os.path.join(ROOT, assignment_engine.STATE_DB_PATH)
+    if not args.skip_prepare:
+        prepare(args.db, args.state_db)
+    asyncio.run(run_cluster(args))
+
+
+if __name__ == "__main__":
+    main()
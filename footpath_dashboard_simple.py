@@ -1,9 +1,23 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
-import sqlite3
-from streamlit_autorefresh import st_autorefresh
+
+import assignment_engine
+import assignment_log
+import batch_assign
+import crowd_forecast
+import crowd_sim
+import footfall_ingest
+import footpath_db
+import live_charts
+import metrics
+import migrate_db
+import render_cache
+import segment_congestion
+import station_graph
+import station_layout
+import station_search
+import warm_cache
 
 # =====================================================
 # CONFIG
@@ -16,139 +30,174 @@ st.markdown("### Real-Time Smart Path Finder for Bengaluru Metro Stations (DB Dr
 # =====================================================
 # DB HELPER FUNCTIONS
 # =====================================================
-def get_connection():
-    return sqlite3.connect(DB_PATH)
+@st.cache_resource
+def get_db():
+    # bring an older metro_footpath.db up to the indexed schema once per process
+    migrate_db.ensure_current(DB_PATH)
+    # pooled read-only connections + cached results, shared by every session
+    return footpath_db.get_data_access(DB_PATH)
+
+db = get_db()
+
+@st.cache_resource
+def get_assignment_engine():
+    # one engine per process; counts persist in footpath_state.db (WAL)
+    return assignment_engine.AssignmentEngine(assignment_engine.STATE_DB_PATH)
+
+assignments = get_assignment_engine()
+
+@st.cache_resource
+def get_assignment_log():
+    # durable append-only record of every assignment, written off the request path
+    return assignment_log.AssignmentLog(assignment_log.LOG_DIR)
+
+assignment_history = get_assignment_log()
+
+@st.cache_resource
+def get_footfall():
+    # tails the gate/sensor event stream (FOOTFALL_LOG) into windowed counts
+    return footfall_ingest.FootfallIngestor(footfall_ingest.FOOTFALL_LOG,
+                                            assignment_engine.STATE_DB_PATH)
+
+footfall = get_footfall()
 
+@st.cache_resource
+def get_forecaster():
+    # per-path, per-slot crowd profiles learned from assignments + footfall
+    return crowd_forecast.CrowdForecaster(assignment_engine.STATE_DB_PATH)
+
+forecaster = get_forecaster()
+
+@metrics.timed("db_helper_seconds")
 def get_lines():
-    conn = get_connection()
-    df = pd.read_sql(
-        "SELECT DISTINCT TRIM(line_name) AS line_name FROM stations ORDER BY line_name;",
-        conn
-    )
-    conn.close()
+    df = db.query_df(footpath_db.LINES_SQL)
     return df["line_name"].tolist()
 
+@metrics.timed("db_helper_seconds")
 def get_stations(line_name):
-    conn = get_connection()
-    df = pd.read_sql(
-        "SELECT DISTINCT station_name FROM stations WHERE TRIM(line_name) = ? ORDER BY station_name;",
-        conn,
-        params=(line_name,)
-    )
-    conn.close()
+    df = db.query_df(footpath_db.STATIONS_SQL, params=(line_name,))
     return df["station_name"].tolist()
 
+@metrics.timed("db_helper_seconds")
 def get_station_size(station_name):
-    conn = get_connection()
-    df = pd.read_sql(
-        "SELECT station_size FROM stations WHERE station_name = ? LIMIT 1;",
-        conn,
-        params=(station_name,)
-    )
-    conn.close()
+    df = db.query_df(footpath_db.STATION_SIZE_SQL, params=(station_name,))
     if df.empty:
         return "small"
     return df["station_size"].iloc[0]
 
+@metrics.timed("db_helper_seconds")
 def get_locations(station_name):
-    conn = get_connection()
-    df = pd.read_sql(
-        """
-        SELECT location_name 
-        FROM station_locations 
-        WHERE station_name = ? 
-        ORDER BY location_name;
-        """,
-        conn,
-        params=(station_name,)
-    )
-    conn.close()
+    df = db.query_df(footpath_db.LOCATIONS_SQL, params=(station_name,))
     return df["location_name"].tolist()
 
+@st.cache_resource
+def get_route_engine():
+    # walkway graphs + Dijkstra/Yen, cached per (station, start, end)
+    engine = station_graph.RouteEngine(db)
+    warm_cache.warm(db, route_engine=engine)    # map the shared route snapshot now
+    return engine
+
+route_engine = get_route_engine()
+
+@st.cache_resource
+def get_congestion():
+    # load per walkway segment: routes sharing a corridor or stairs slow down together
+    return segment_congestion.SegmentCongestion(route_engine, assignments,
+                                                assignment_engine.STATE_DB_PATH)
+
+congestion = get_congestion()
+
+@metrics.timed("db_helper_seconds")
 def get_routes(station_name, start_location, end_location):
-    conn = get_connection()
-    df = pd.read_sql(
-        """
-        SELECT 
-            path_name AS "Path",
-            base_distance AS "Base Distance (m)",
-            base_time AS "Base Time (mins)"
-        FROM routes
-        WHERE station_name = ?
-          AND start_location = ?
-          AND end_location = ?
-        """,
-        conn,
-        params=(station_name, start_location, end_location)
-    )
-    conn.close()
-    return df
+    # cached frame is shared – callers copy before adding columns
+    return route_engine.route_table(station_name, start_location, end_location)
+
+@metrics.timed("db_helper_seconds")
+def get_route_summary(station_name, start_location, end_location):
+    # route count, shortest path and time range of a pair: one primary-key
+    # lookup in the materialised route_summaries; pairs only the walkway
+    # graph knows are summarised from their route table instead
+    rows = db.query_rows(footpath_db.ROUTE_SUMMARY_SQL,
+                         params=(start_location, end_location, station_name))
+    if rows:
+        count, _, path, distance, minutes, min_time, max_time = rows[0]
+    else:
+        base_df = get_routes(station_name, start_location, end_location)
+        if base_df.empty:
+            return None
+        shortest = base_df.loc[base_df["Base Distance (m)"].idxmin()]
+        count, path = len(base_df), shortest["Path"]
+        distance, minutes = int(shortest["Base Distance (m)"]), int(shortest["Base Time (mins)"])
+        min_time = int(base_df["Base Time (mins)"].min())
+        max_time = int(base_df["Base Time (mins)"].max())
+    return {"Routes": count, "Path": path,
+            "Base Distance (m)": distance, "Base Time (mins)": minutes,
+            "Min Time (mins)": min_time, "Max Time (mins)": max_time}
+
+def freeze_live_routes(df_live):
+    # all a session keeps of its frozen results table: the path names (the
+    # rows' keys in the shared route frame), the crowd drawn for each and the
+    # expected times – about 100 bytes a path instead of a DataFrame
+    return {
+        "paths": df_live["Path"].tolist(),
+        "crowd": df_live["Live Crowd (%)"].str.rstrip("%").astype(int).tolist(),
+        "expected": df_live["Expected Time (mins)"].astype(float).tolist(),
+    }
+
+def thaw_live_routes(base_df, frozen):
+    # the results table again, from the shared route frame + the session's draw
+    live = pd.DataFrame({"Path": frozen["paths"], "crowd": frozen["crowd"],
+                         "expected": frozen["expected"]})
+    df_live = base_df.merge(live, on="Path")
+    crowd = df_live.pop("crowd").to_numpy()
+    expected = df_live.pop("expected")
+    df_live["Live Crowd (%)"] = [f"{c}%" for c in crowd]
+    df_live["Live Estimated Time (mins)"] = batch_assign.live_time(df_live["Base Time (mins)"], crowd)
+    df_live["Expected Time (mins)"] = expected
+    return df_live
+
+@st.cache_resource
+def get_station_search():
+    # trigram index over every station + location name, rebuilt on DB change;
+    # starts from the prebuilt warm-cache artefact when there is a current one
+    index = station_search.StationSearch(db)
+    warm_cache.warm(db, search=index)
+    return index
+
+search = get_station_search()
 
 # =====================================================
 # VISUAL HELPERS
 # =====================================================
-def draw_station_layout(station_name):
+@st.cache_resource
+def get_render_cache():
+    # PNG bytes shared by every session; figures are closed right after saving
+    return render_cache.RenderCache()
+
+renders = get_render_cache()
+
+def show_station_layout(station_name):
     size = get_station_size(station_name)
-    fig, ax = plt.subplots(figsize=(6, 4))
-    ax.set_title(f"Schematic Layout – {station_name}", fontsize=11)
-
-    if size == "big":
-        ax.add_patch(plt.Rectangle((0.05, 0.65), 0.35, 0.12, fill=False))
-        ax.text(0.225, 0.71, "Main Platforms", ha="center", va="center", fontsize=8)
-        ax.add_patch(plt.Rectangle((0.6, 0.65), 0.35, 0.12, fill=False))
-        ax.text(0.775, 0.71, "Branch Platforms", ha="center", va="center", fontsize=8)
-        ax.add_patch(plt.Rectangle((0.1, 0.4), 0.8, 0.15, fill=False))
-        ax.text(0.5, 0.475, "Large Concourse", ha="center", va="center", fontsize=8)
-        ax.text(0.05, 0.45, "Entry Side", fontsize=7)
-        ax.text(0.95, 0.45, "Exit Side", fontsize=7, ha="right")
-    elif size == "medium":
-        ax.add_patch(plt.Rectangle((0.2, 0.65), 0.6, 0.12, fill=False))
-        ax.text(0.5, 0.71, "Platform Zone", ha="center", va="center", fontsize=8)
-        ax.add_patch(plt.Rectangle((0.25, 0.4), 0.5, 0.15, fill=False))
-        ax.text(0.5, 0.475, "Concourse", ha="center", va="center", fontsize=8)
-        ax.text(0.1, 0.45, "Entry A", fontsize=7)
-        ax.text(0.9, 0.45, "Exit C", fontsize=7, ha="right")
-    else:
-        ax.add_patch(plt.Rectangle((0.25, 0.6), 0.5, 0.12, fill=False))
-        ax.text(0.5, 0.66, "Platform", ha="center", va="center", fontsize=8)
-        ax.add_patch(plt.Rectangle((0.3, 0.4), 0.4, 0.12, fill=False))
-        ax.text(0.5, 0.46, "Concourse", ha="center", va="center", fontsize=8)
-        ax.text(0.2, 0.42, "Entry", fontsize=7)
-        ax.text(0.8, 0.42, "Exit", fontsize=7, ha="right")
-
-    ax.set_xticks([])
-    ax.set_yticks([])
-    ax.set_xlim(0, 1)
-    ax.set_ylim(0, 1)
-    ax.axis("off")
-    return fig
+    png = renders.get_or_render(
+        ("layout", size, station_name),
+        lambda: station_layout.draw_station_layout(station_name, size)
+    )
+    st.image(png, width="stretch")
 
 def simulate_station_load(station_name):
-    hours = [
-        "6-7", "7-8", "8-9", "9-10",
-        "10-11", "11-12", "12-13", "13-14",
-        "14-15", "15-16", "16-17", "17-18",
-        "18-19", "19-20", "20-21"
-    ]
-    size = get_station_size(station_name)
-    if size == "big":
-        base = 700
-    elif size == "medium":
-        base = 450
-    else:
-        base = 250
-
-    load = []
-    for idx in range(len(hours)):
-        if 2 <= idx <= 4:      # 8–11 AM peak
-            val = base + np.random.randint(300, 450)
-        elif 11 <= idx <= 13:  # 5–8 PM peak
-            val = base + np.random.randint(300, 450)
-        else:
-            val = base - np.random.randint(80, 220)
-        load.append(max(60, val))
+    # one random day of the station_size profile the crowd simulator uses
+    hours = [f"{h}-{h + 1}" for h in crowd_sim.HOURS]
+    load = crowd_sim.hourly_demand(get_station_size(station_name), rng=np.random)
     return pd.DataFrame({"Time": hours, "Passengers": load})
 
+def observed_station_load(station_name, df_load):
+    # replace simulated hours with today's counted footfall where we have it
+    observed = footfall.station_hourly(station_name, footfall_ingest.local_day_start())
+    hours = df_load["Time"].str.split("-").str[0].astype(int)
+    counted = hours.map(observed)
+    df_load["Passengers"] = counted.fillna(df_load["Passengers"]).astype(int)
+    return df_load, counted.notna()
+
 # =====================================================
 # SESSION STATE
 # =====================================================
@@ -162,8 +211,6 @@ if "selected_start" not in st.session_state:
     st.session_state.selected_start = None
 if "selected_end" not in st.session_state:
     st.session_state.selected_end = None
-if "base_routes" not in st.session_state:
-    st.session_state.base_routes = None
 if "locked_shortest_path" not in st.session_state:
     st.session_state.locked_shortest_path = None
 if "locked_best_path" not in st.session_state:
@@ -174,9 +221,94 @@ if "crowd_time_base" not in st.session_state:
     st.session_state.crowd_time_base = None
 if "station_load_base" not in st.session_state:
     st.session_state.station_load_base = {}
-# NEW: path assignment count (per station + start + end + path)
-if "path_assign_count" not in st.session_state:
-    st.session_state.path_assign_count = {}
+
+# =====================================================
+# DEBUG METRICS (only with FOOTPATH_METRICS=1)
+# =====================================================
+if metrics.ENABLED:
+    metrics.export()
+    # a rerun can end in st.stop()/st.rerun(), so the panel shows the
+    # previous, completed rerun of this session
+    last_rerun = st.session_state.get("rerun_metrics")
+    st.session_state.rerun_metrics = metrics.begin_rerun()
+    with st.sidebar:
+        if st.checkbox("🛠️ Debug metrics"):
+            st.markdown("**Previous rerun** – queries, cache hits and timings")
+            if last_rerun is not None:
+                st.dataframe(pd.DataFrame(last_rerun.rows()), hide_index=True)
+            with st.expander("Process totals (Prometheus text)"):
+                st.code(metrics.prometheus_text(), language="text")
+
+# =====================================================
+# LIVE UPDATES (partial fragment reruns)
+# =====================================================
+@st.fragment(run_every=live_charts.LIVE_REFRESH_SECS)
+def live_charts_fragment(station_name, start_loc, end_loc):
+    with metrics.timer("results_stage_seconds", stage="live_charts"):
+        draw_live_charts(station_name, start_loc, end_loc)
+
+def draw_live_charts(station_name, start_loc, end_loc):
+    frozen = st.session_state.live_routes
+
+    # ============ CROWD VARIATION PER PATH (BAR CHART) ============
+    st.markdown("### 📊 Crowd Variation Over the Day (Per Path – Mild Live Update on Last Slot)")
+
+    time_intervals = [
+        "6-8 AM", "8-10 AM", "10-12 PM", "12-2 PM",
+        "2-4 PM", "4-6 PM", "6-8 PM", "8-10 PM"
+    ]
+    interval_hours = [(h, h + 2) for h in range(6, 22, 2)]
+
+    if st.session_state.crowd_time_base is None:
+        # learned profile per path; random spread around the current crowd
+        # until this pair has any history
+        pattern = forecaster.day_pattern(station_name, start_loc, end_loc,
+                                         frozen["paths"], interval_hours)
+        if pattern is None:
+            pattern = batch_assign.crowd_patterns(
+                frozen["paths"], frozen["crowd"], len(time_intervals)
+            )
+        st.session_state.crowd_time_base = pattern
+
+    footfall.poll_step()
+    observed_crowd = footfall.path_crowd(station_name, start_loc, end_loc)
+    crowd_matrix = {}
+    for path, base_arr in st.session_state.crowd_time_base.items():
+        arr = base_arr.copy()
+        if path in observed_crowd:
+            arr[-1] = observed_crowd[path]
+        else:
+            arr[-1] = int(np.clip(arr[-1] + np.random.randint(-5, 6), 0, 100))
+        crowd_matrix[path] = arr
+
+    # rendered in the browser: each refresh sends only the data
+    with metrics.timer("chart_render_seconds", chart="crowd"):
+        st.vega_lite_chart(
+            live_charts.crowd_frame(crowd_matrix, time_intervals),
+            live_charts.crowd_chart_spec(start_loc, end_loc),
+            width="stretch"
+        )
+
+    # ============ STATION-LEVEL PASSENGER LOAD (LINE CHART) ============
+    st.markdown("### 🚦 Station-Level Passenger Load (Last Point Mildly Updating)")
+
+    if station_name not in st.session_state.station_load_base:
+        st.session_state.station_load_base[station_name] = simulate_station_load(station_name)
+
+    df_load_base, counted = observed_station_load(
+        station_name, st.session_state.station_load_base[station_name].copy()
+    )
+    last_idx = df_load_base.index[-1]
+    if not counted[last_idx]:
+        df_load_base.loc[last_idx, "Passengers"] = max(
+            50,
+            df_load_base.loc[last_idx, "Passengers"] + np.random.randint(-25, 26)
+        )
+
+    with metrics.timer("chart_render_seconds", chart="load"):
+        st.vega_lite_chart(
+            df_load_base, live_charts.load_chart_spec(station_name), width="stretch"
+        )
 
 # =====================================================
 # STAGE 1 – Line & Station selection
@@ -213,21 +345,27 @@ if st.session_state.stage == "station_selection":
     selected_line = label_map[selected_label]
     st.session_state.selected_line = selected_line
 
-    search_text = st.text_input("🔎 Search station in this line:", value="")
+    search_text = st.text_input("🔎 Search any station or place (typos are fine):", value="")
     full_station_list = get_stations(selected_line)
     if not full_station_list:
         st.error(f"No stations found for line: {selected_line}")
         st.stop()
 
     if search_text.strip():
-        station_list = [s for s in full_station_list if search_text.lower() in s.lower()]
+        # ranked matches across every line, incl. stations owning a matching location
+        station_list = search.search_stations(search_text, limit=15)
         if not station_list:
             st.warning("No station matches your search. Showing all stations in this line.")
             station_list = full_station_list
     else:
         station_list = full_station_list
 
-    station = st.selectbox("🚏 Choose a station on this line:", station_list)
+    def station_label(name):
+        if name in full_station_list:
+            return name
+        return f"{name} ({', '.join(search.lines_of(name))})"
+
+    station = st.selectbox("🚏 Choose a station:", station_list, format_func=station_label)
 
     col1, col2 = st.columns([1, 1])
     with col1:
@@ -240,7 +378,7 @@ if st.session_state.stage == "station_selection":
             st.rerun()
     with col2:
         st.markdown("#### Station Layout Preview")
-        st.pyplot(draw_station_layout(station))
+        show_station_layout(station)
 
 # =====================================================
 # STAGE 2 – Source & Destination inside station
@@ -266,20 +404,26 @@ elif st.session_state.stage == "route_selection":
     if start_loc == end_loc:
         st.warning("⚠️ Source and destination cannot be the same.")
     else:
+        summary = get_route_summary(station_name, start_loc, end_loc)
+        if summary is not None:
+            st.caption(
+                f"{summary['Routes']} paths · shortest {summary['Path']} "
+                f"({summary['Base Distance (m)']} m) · "
+                f"{summary['Min Time (mins)']}–{summary['Max Time (mins)']} mins"
+            )
         if st.button("Show Available Paths 🛤️"):
             st.session_state.selected_start = start_loc
             st.session_state.selected_end = end_loc
 
-            base_df = get_routes(station_name, start_loc, end_loc)
-            if base_df.empty:
+            if summary is None:
                 st.error("No predefined walking paths found for this source-destination pair in 'routes' table.")
             else:
-                st.session_state.base_routes = base_df
-
-                # shortest by distance (fixed)
-                shortest_idx = base_df["Base Distance (m)"].idxmin()
-                shortest = base_df.loc[shortest_idx]
-                st.session_state.locked_shortest_path = shortest.to_dict()
+                # shortest by distance (fixed); the session keeps only this
+                # small dict – the route rows stay in the shared cache
+                st.session_state.locked_shortest_path = {
+                    key: summary[key]
+                    for key in ("Path", "Base Distance (m)", "Base Time (mins)")
+                }
 
                 # best path initially unknown – will be set using live time
                 st.session_state.locked_best_path = None
@@ -300,12 +444,10 @@ elif st.session_state.stage == "route_selection":
 # STAGE 3 – Results (real-time graphs, frozen table)
 # =====================================================
 elif st.session_state.stage == "results":
-    st_autorefresh(interval=3000, key="auto_refresh_results")
-
     station_name = st.session_state.selected_station
     start_loc = st.session_state.selected_start
     end_loc = st.session_state.selected_end
-    base_df = st.session_state.base_routes
+    base_df = get_routes(station_name, start_loc, end_loc)
     st.subheader(f"Step 3: Paths from '{start_loc}' → '{end_loc}' at {station_name}")
 
     if base_df is None or base_df.empty:
@@ -313,36 +455,46 @@ elif st.session_state.stage == "results":
     else:
         # ---------- FROZEN TABLE + BEST PATH (MIN LIVE TIME) ----------
         if st.session_state.live_routes is None:
-            df_live = base_df.copy()
-
-            live_crowd_list = []
-            for _, row in df_live.iterrows():
-                path_name = row["Path"]
-                base_random = np.random.randint(30, 70)
-                key = (station_name, start_loc, end_loc, path_name)
-                past_assignments = st.session_state.path_assign_count.get(key, 0)
-                crowd = base_random + past_assignments * 8   # +8% per previous assignment
-                crowd = int(np.clip(crowd, 5, 95))
-                live_crowd_list.append(crowd)
-
-            df_live["Live Crowd (%)"] = [f"{c}%" for c in live_crowd_list]
-            df_live["Live Estimated Time (mins)"] = (
-                df_live["Base Time (mins)"] * (1 + (np.array(live_crowd_list) / 100))
-            ).round(1)
-
-            st.session_state.live_routes = df_live
-
-            # choose best path based on minimum live estimated time
-            best_idx = df_live["Live Estimated Time (mins)"].astype(float).idxmin()
-            locked_best = df_live.loc[best_idx].to_dict()
-            st.session_state.locked_best_path = locked_best
-
-            # increment assignment count for this chosen path
-            best_key = (station_name, start_loc, end_loc, locked_best["Path"])
-            st.session_state.path_assign_count[best_key] = \
-                st.session_state.path_assign_count.get(best_key, 0) + 1
+            with metrics.timer("results_stage_seconds", stage="assign"):
+                # time-decayed load of the segments each path walks, shared by
+                # every session and worker process
+                past_loads = congestion.loads(station_name, start_loc, end_loc)
+                # counted footfall over the last window replaces the random base crowd
+                footfall.poll_step()
+                observed_crowd = footfall.path_crowd(station_name, start_loc, end_loc)
+                # +8% crowd per recent assignment, computed for all paths at once
+                df_live = batch_assign.live_routes(base_df, past_loads,
+                                                   observed_crowd=observed_crowd)
+
+                # expected time over the walk itself: today's crowd fading into
+                # the learned profile for the next few minutes. The profiles
+                # learn only from counted footfall (refresh), never from this
+                # table's crowd, which has a random draw for unmeasured paths.
+                forecaster.refresh()
+                paths = df_live["Path"].tolist()
+                crowd_now = df_live["Live Crowd (%)"].str.rstrip("%").astype(int).to_numpy()
+                expected = batch_assign.expected_times(
+                    [(station_name, start_loc, end_loc)], [paths],
+                    [df_live["Base Time (mins)"].to_numpy()], [crowd_now], forecaster
+                )[0]
+                df_live["Expected Time (mins)"] = expected
+
+                st.session_state.live_routes = freeze_live_routes(df_live)
+
+                # same policy as /assign: minimum expected time over the walk
+                best_idx = df_live.index[int(np.argmin(expected))]
+                locked_best = df_live.loc[best_idx].to_dict()
+                st.session_state.locked_best_path = locked_best
+
+                # count the chosen path and load every segment along it
+                congestion.record(station_name, start_loc, end_loc, locked_best["Path"])
+                assignment_history.append(
+                    station_name, start_loc, end_loc, locked_best["Path"],
+                    int(str(locked_best["Live Crowd (%)"]).rstrip("%")),
+                    locked_best["Live Estimated Time (mins)"]
+                )
         else:
-            df_live = st.session_state.live_routes.copy()
+            df_live = thaw_live_routes(base_df, st.session_state.live_routes)
             locked_best = st.session_state.locked_best_path
         # ---------------------------------------------------------------
 
@@ -355,9 +507,10 @@ elif st.session_state.stage == "results":
             else:
                 return ['' for _ in row]
 
-        styled_df = df_live.style.apply(highlight_best, axis=1)
-        st.markdown("### 🛤️ All Possible Paths (Frozen Assignment for This User)")
-        st.dataframe(styled_df, use_container_width=True)
+        with metrics.timer("results_stage_seconds", stage="table"):
+            styled_df = df_live.style.apply(highlight_best, axis=1)
+            st.markdown("### 🛤️ All Possible Paths (Frozen Assignment for This User)")
+            st.dataframe(styled_df, width="stretch")
 
         # shortest path (fixed)
         locked_short = st.session_state.locked_shortest_path
@@ -369,10 +522,11 @@ elif st.session_state.stage == "results":
 
         # assigned best path (min live time when user came)
         st.success(
-            f"✅ ASSIGNED USER PATH (FIXED – MIN LIVE TIME): {locked_best['Path']} | "
+            f"✅ ASSIGNED USER PATH (FIXED – MIN EXPECTED TIME): {locked_best['Path']} | "
             f"Base Distance: {locked_best['Base Distance (m)']} m | "
             f"Base Time: {locked_best['Base Time (mins)']} mins | "
-            f"Initial Live Time: {locked_best['Live Estimated Time (mins)']} mins"
+            f"Initial Live Time: {locked_best['Live Estimated Time (mins)']} mins | "
+            f"Expected Over Walk: {locked_best['Expected Time (mins)']} mins"
         )
 
         # path details
@@ -387,71 +541,24 @@ elif st.session_state.stage == "results":
             f"**Base Distance:** {sel_row['Base Distance (m)']} m  \n"
             f"**Base Time:** {sel_row['Base Time (mins)']} mins  \n"
             f"**Live Crowd (at assignment):** {sel_row['Live Crowd (%)']}  \n"
-            f"**Live Estimated Time (at assignment):** {sel_row['Live Estimated Time (mins)']} mins"
+            f"**Live Estimated Time (at assignment):** {sel_row['Live Estimated Time (mins)']} mins  \n"
+            f"**Expected Time Over the Walk:** {sel_row['Expected Time (mins)']} mins"
         )
 
         # station layout
         st.markdown("### 🗺 Station Layout (Schematic View)")
-        st.pyplot(draw_station_layout(station_name))
-
-        # ============ CROWD VARIATION PER PATH (BAR CHART) ============
-        st.markdown("### 📊 Crowd Variation Over the Day (Per Path – Mild Live Update on Last Slot)")
-
-        time_intervals = [
-            "6-8 AM", "8-10 AM", "10-12 PM", "12-2 PM",
-            "2-4 PM", "4-6 PM", "6-8 PM", "8-10 PM"
-        ]
-
-        if st.session_state.crowd_time_base is None:
-            crowd_time_base = {}
-            for _, row in df_live.iterrows():
-                base_val = int(str(row["Live Crowd (%)"]).replace("%", ""))
-                pattern = base_val + np.random.randint(-15, 16, size=len(time_intervals))
-                pattern = np.clip(pattern, 0, 100)
-                crowd_time_base[row["Path"]] = pattern
-            st.session_state.crowd_time_base = crowd_time_base
-
-        crowd_matrix = {}
-        for path, base_arr in st.session_state.crowd_time_base.items():
-            arr = base_arr.copy()
-            arr[-1] = int(np.clip(arr[-1] + np.random.randint(-5, 6), 0, 100))
-            crowd_matrix[path] = arr
-
-        df_time = pd.DataFrame(crowd_matrix, index=time_intervals)
-        fig1, ax1 = plt.subplots(figsize=(10, 5))
-        df_time.plot(kind="bar", ax=ax1)
-        ax1.set_ylabel("Crowd Density (%)")
-        ax1.set_xlabel("Time Intervals")
-        ax1.set_title(f"Crowd Variation for Paths from '{start_loc}' → '{end_loc}'")
-        st.pyplot(fig1)
-
-        # ============ STATION-LEVEL PASSENGER LOAD (LINE CHART) ============
-        st.markdown("### 🚦 Station-Level Passenger Load (Last Point Mildly Updating)")
-
-        if station_name not in st.session_state.station_load_base:
-            st.session_state.station_load_base[station_name] = simulate_station_load(station_name)
-
-        df_load_base = st.session_state.station_load_base[station_name].copy()
-        last_idx = df_load_base.index[-1]
-        df_load_base.loc[last_idx, "Passengers"] = max(
-            50,
-            df_load_base.loc[last_idx, "Passengers"] + np.random.randint(-25, 26)
-        )
+        with metrics.timer("results_stage_seconds", stage="layout"):
+            show_station_layout(station_name)
 
-        fig2, ax2 = plt.subplots(figsize=(10, 3))
-        ax2.plot(df_load_base["Time"], df_load_base["Passengers"], marker="o")
-        ax2.set_xlabel("Time (Hours)")
-        ax2.set_ylabel("Passengers")
-        ax2.set_title(f"Passenger Load at {station_name}")
-        ax2.grid(True)
-        st.pyplot(fig2)
+        # only the live charts rerun every few seconds – the table, layout and
+        # buttons above are left alone until the user interacts
+        live_charts_fragment(station_name, start_loc, end_loc)
 
     # ---------- navigation buttons ----------
     c1, c2 = st.columns(2)
     with c1:
         if st.button("🔁 Choose Another Source/Destination"):
             st.session_state.stage = "route_selection"
-            st.session_state.base_routes = None
             st.session_state.live_routes = None
             st.session_state.crowd_time_base = None
             st.rerun()
@@ -459,11 +566,11 @@ elif st.session_state.stage == "results":
         if st.button("🏁 Restart from Line & Station Selection"):
             for key in [
                 "selected_station", "selected_start", "selected_end",
-                "base_routes", "locked_shortest_path", "locked_best_path",
+                "locked_shortest_path", "locked_best_path",
                 "live_routes", "crowd_time_base"
             ]:
                 st.session_state[key] = None
-            # we *keep* path_assign_count so system remembers past users
+            # assignment counts live in the shared engine, so past users are remembered
             st.session_state.station_load_base = {}
             st.session_state.stage = "station_selection"
             st.rerun()
@@ -0,0 +1,296 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+
+import metrics
+
+# =====================================================
+# CONFIG
+# =====================================================
+DB_PATH = "metro_footpath.db"
+POOL_SIZE = 8          # read-only connections shared by every session thread
+CACHE_SIZE = 512       # query results kept before LRU eviction
+
+
+# =====================================================
+# HOT QUERIES (names are stored trimmed – see migrate_db.py)
+# =====================================================
+LINES_SQL = "SELECT DISTINCT line_name FROM stations ORDER BY line_name;"
+
+STATIONS_SQL = """
+    SELECT DISTINCT station_name
+    FROM stations
+    WHERE line_name = ?
+    ORDER BY station_name;
+"""
+
+STATION_SIZE_SQL = "SELECT station_size FROM station_index WHERE station_name = ?;"
+
+LOCATIONS_SQL = """
+    SELECT location_name
+    FROM station_locations
+    WHERE station_name = ?
+    ORDER BY location_name;
+"""
+
+ROUTES_SQL = """
+    SELECT
+        r.path_name AS "Path",
+        r.base_distance AS "Base Distance (m)",
+        r.base_time AS "Base Time (mins)"
+    FROM station_index s
+    JOIN station_locations a ON a.station_id = s.station_id AND a.location_name = ?
+    JOIN station_locations b ON b.station_id = s.station_id AND b.location_name = ?
+    JOIN route_paths r ON r.station_id = s.station_id
+                      AND r.start_location_id = a.location_id
+                      AND r.end_location_id = b.location_id
+    WHERE s.station_name = ?;
+"""
+
+# materialised by migrate_db.refresh_route_summaries; same params as ROUTES_SQL
+ROUTE_SUMMARY_SQL = """
+    SELECT
+        m.route_count,
+        m.shortest_route_id,
+        r.path_name AS "Path",
+        r.base_distance AS "Base Distance (m)",
+        r.base_time AS "Base Time (mins)",
+        m.min_time,
+        m.max_time
+    FROM station_index s
+    JOIN station_locations a ON a.station_id = s.station_id AND a.location_name = ?
+    JOIN station_locations b ON b.station_id = s.station_id AND b.location_name = ?
+    JOIN route_summaries m ON m.station_id = s.station_id
+                          AND m.start_location_id = a.location_id
+                          AND m.end_location_id = b.location_id
+    JOIN route_paths r ON r.route_id = m.shortest_route_id
+    WHERE s.station_name = ?;
+"""
+
+GRAPH_NODES_SQL = """
+    SELECT n.node_id, n.node_name, n.node_kind
+    FROM station_index s
+    JOIN walkway_nodes n ON n.station_id = s.station_id
+    WHERE s.station_name = ?;
+"""
+
+GRAPH_EDGES_SQL = """
+    SELECT e.edge_id, e.from_node, e.to_node, e.edge_kind, e.length_m
+    FROM station_index s
+    JOIN walkway_edges e ON e.station_id = s.station_id
+    WHERE s.station_name = ?;
+"""
+
+# name -> (sql, sample params) for migrate_db.check_query_plans
+HOT_QUERIES = {
+    "get_lines": (LINES_SQL, ()),
+    "get_stations": (STATIONS_SQL, ("",)),
+    "get_station_size": (STATION_SIZE_SQL, ("",)),
+    "get_locations": (LOCATIONS_SQL, ("",)),
+    "get_routes": (ROUTES_SQL, ("", "", "")),
+    "get_route_summary": (ROUTE_SUMMARY_SQL, ("", "", "")),
+    "graph_nodes": (GRAPH_NODES_SQL, ("",)),
+    "graph_edges": (GRAPH_EDGES_SQL, ("",)),
+}
+QUERY_NAMES = {sql: name for name, (sql, _) in HOT_QUERIES.items()}   # metric labels
+
+
+# =====================================================
+# CONNECTION POOL (read-only, thread-safe)
+# =====================================================
+class ConnectionPool:
+    def __init__(self, db_path, size=POOL_SIZE):
+        self.db_path = os.path.abspath(db_path)
+        self.size = size
+        self._idle = []
+        self._opened = 0
+        self._generation = 0
+        self._cond = threading.Condition()
+
+    def _connect(self):
+        # mode=ro: the dashboard never writes, and a read-only handle can't
+        # accidentally take the write lock away from generate_routes.py
+        uri = f"file:{self.db_path}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON;")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        with self._cond:
+            while not self._idle and self._opened >= self.size:
+                self._cond.wait()
+            generation = self._generation
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                conn = None
+                self._opened += 1
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._opened -= 1
+                    self._cond.notify()
+                raise
+        try:
+            yield conn
+        finally:
+            with self._cond:
+                if generation == self._generation:
+                    self._idle.append(conn)
+                else:
+                    # pool was reset while this handle was checked out
+                    conn.close()
+                    self._opened -= 1
+                self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            for conn in self._idle:
+                conn.close()
+            self._opened -= len(self._idle)
+            self._idle = []
+            self._generation += 1
+
+
+# =====================================================
+# QUERY RESULT CACHE (LRU)
+# =====================================================
+class QueryCache:
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# =====================================================
+# DATA ACCESS (pool + cache + change detection)
+# =====================================================
+class DataAccess:
+    def __init__(self, db_path=DB_PATH, pool_size=POOL_SIZE, cache_size=CACHE_SIZE):
+        self.db_path = os.path.abspath(db_path)
+        self.pool = ConnectionPool(self.db_path, pool_size)
+        self.cache = QueryCache(cache_size)
+        self._probe = None
+        self._probe_lock = threading.Lock()
+        self._version = None
+        self._version_lock = threading.Lock()   # cache clears and puts vs. version changes
+
+    def _file_signature(self):
+        # inode + mtime catch the file being replaced wholesale, which
+        # PRAGMA data_version on an already-open handle cannot see
+        try:
+            st = os.stat(self.db_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def current_version(self):
+        with self._probe_lock:
+            signature = self._file_signature()
+            if self._probe is None or (self._version and self._version[1] != signature):
+                if self._probe is not None:
+                    self._probe.close()
+                    self.pool.close()
+                self._probe = self.pool._connect()
+            # data_version changes whenever another connection (or process)
+            # commits to the database
+            data_version = self._probe.execute("PRAGMA data_version;").fetchone()[0]
+            return (data_version, signature)
+
+    def check_for_changes(self):
+        version = self.current_version()
+        with self._version_lock:
+            if version != self._version:
+                self.cache.clear()
+                self._version = version
+        return version
+
+    def _cache_put(self, key, value, version):
+        # a result read under an older version is dropped: another thread may
+        # have seen a commit and cleared the cache while this query ran
+        with self._version_lock:
+            if version == self._version:
+                self.cache.put(key, value)
+
+    def query_df(self, sql, params=()):
+        # returned frames are shared between sessions – treat them as read-only
+        version = self.check_for_changes()
+        key = (sql, tuple(params))
+        query = QUERY_NAMES.get(sql, "other")
+        df = self.cache.get(key)
+        if df is not None:
+            metrics.inc("db_cache_hits_total", query=query)
+            return df
+        metrics.inc("db_queries_total", query=query)
+        with metrics.timer("db_query_seconds", query=query), self.pool.connection() as conn:
+            df = pd.read_sql(sql, conn, params=tuple(params))
+        self._cache_put(key, df, version)
+        return df
+
+    def query_rows(self, sql, params=()):
+        version = self.check_for_changes()
+        key = ("rows", sql, tuple(params))
+        query = QUERY_NAMES.get(sql, "other")
+        rows = self.cache.get(key)
+        if rows is not None:
+            metrics.inc("db_cache_hits_total", query=query)
+            return rows
+        metrics.inc("db_queries_total", query=query)
+        with metrics.timer("db_query_seconds", query=query), self.pool.connection() as conn:
+            rows = conn.execute(sql, tuple(params)).fetchall()
+        self._cache_put(key, rows, version)
+        return rows
+
+    def close(self):
+        with self._probe_lock:
+            if self._probe is not None:
+                self._probe.close()
+                self._probe = None
+        self.pool.close()
+        self.cache.clear()
+
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_data_access(db_path=DB_PATH):
+    # one DataAccess per database file per process, shared by all sessions
+    key = os.path.abspath(db_path)
+    with _instances_lock:
+        if key not in _instances:
+            _instances[key] = DataAccess(key)
+        return _instances[key]
@@ -1,85 +1,278 @@
-import sqlite3
+import argparse
+import hashlib
+import json
+import os
 import random
-import math
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import migrate_db
+import route_store
+import station_graph
 
 DB_PATH = "metro_footpath.db"
+GENERATOR_VERSION = 3   # bump to force every station to regenerate
+SYNTHETIC, FROM_GRAPHS = "synthetic", "graphs"
+# base distance range (m) of the synthetic routes by station size
+BASE_DISTANCE = {"big": (220, 480), "medium": (160, 360), "small": (90, 240)}
+
+
+# =====================================================
+# PER-STATION WORK (runs in the process pool)
+# =====================================================
+def content_hash(station_size, locations, mode=SYNTHETIC):
+    # anything that changes the generated layout must change the hash
+    payload = json.dumps([GENERATOR_VERSION, mode, station_size, sorted(locations)])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def synthetic_routes(station_name, station_size, locations):
+    # the original generator: a random base distance per pair and 2 (or 4
+    # for Entry → Platform) alternatives, each a little longer; seeded by
+    # station name so a worker process produces the same rows every time
+    rng = random.Random(station_name)
+    base_min, base_max = BASE_DISTANCE.get(station_size, BASE_DISTANCE["small"])
+    routes = []
+    for start in locations:
+        for end in locations:
+            if start == end:
+                continue
+            base_distance = rng.randint(base_min, base_max)
+            for i in range(station_graph.route_count(start, end)):
+                dist = base_distance + rng.randint(10, 50) * i
+                time = max(2, int(dist / 70))  # ~70 m/min walking speed
+                path_name = (f"Route {i+1}: {station_graph.short_name(start)} → "
+                             f"{station_graph.short_name(end)}")
+                routes.append((start, end, path_name, dist, time))
+    return routes
+
+
+def graph_routes(graph, locations):
+    # opt-in (--from-graphs): Yen's k-shortest paths over the walkway graph;
+    # may find fewer alternatives than route_count() in small stations
+    routes = []
+    for start in locations:
+        for end in locations:
+            if start == end:
+                continue
+            for route in station_graph.plan_routes(graph, start, end):
+                routes.append((start, end, route.path_name, route.distance,
+                               station_graph.base_minutes(route)))
+    return routes
+
+
+def generate_station(job):
+    # pure function of (station, size, locations, mode) so it can run in any
+    # worker; returns the walkway graph and every route row for the single
+    # writer – the graph is always rebuilt with the routes so the two agree
+    # on the station's locations
+    station_name, station_size, locations, mode = job
+    if len(locations) < 2:
+        return station_name, [], [], []  # Not enough points
+
+    nodes, edges = station_graph.synthesize_station_graph(station_name, station_size, locations)
+    if mode == FROM_GRAPHS:
+        routes = graph_routes(station_graph.graph_from_layout(station_name, nodes, edges), locations)
+    else:
+        routes = synthetic_routes(station_name, station_size, locations)
+    return station_name, nodes, edges, routes
 
-def main():
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
 
-    # 1) Clear existing routes (we already did in SQL, but safe)
-    cur.execute("DELETE FROM routes;")
-    conn.commit()
+# =====================================================
+# SINGLE WRITER
+# =====================================================
+def load_stations(cur):
+    # station_name -> (station_id, station_size, {location_name: location_id})
+    stations, by_id = {}, {}
+    for station_id, station_name, station_size in cur.execute(
+            "SELECT station_id, station_name, station_size FROM station_index ORDER BY station_id;"):
+        stations[station_name] = by_id[station_id] = (station_id, station_size, {})
+    for station_id, location_name, location_id in cur.execute(
+            "SELECT station_id, location_name, location_id FROM station_locations "
+            "ORDER BY location_id;"):
+        if station_id in by_id:
+            by_id[station_id][2][location_name] = location_id
+    return stations
 
-    # 2) Get all stations with size
-    cur.execute("SELECT DISTINCT TRIM(station_name), TRIM(station_size) FROM stations;")
-    stations = cur.fetchall()
 
+def changed_stations(cur, stations, full=False, mode=SYNTHETIC, only=None):
+    # only: station names to consider (default: all)
+    previous = dict(cur.execute("SELECT station_id, content_hash FROM route_generation;"))
+    jobs, hashes = [], {}
+    for station_name, (station_id, station_size, locations) in stations.items():
+        if only is not None and station_name not in only:
+            continue
+        digest = content_hash(station_size, list(locations), mode)
+        if full or previous.get(station_id) != digest:
+            jobs.append((station_name, station_size, list(locations), mode))
+            hashes[station_name] = digest
+    return jobs, hashes
+
+
+def write_station(cur, station_id, locations, nodes, edges, routes, digest):
+    station_graph.write_station_graph(cur, station_id, nodes, edges, locations)
+    cur.execute("DELETE FROM route_paths WHERE station_id = ?;", (station_id,))
+    cur.executemany(
+        """
+        INSERT INTO route_paths
+        (station_id, start_location_id, end_location_id, path_name, base_distance, base_time)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        [(station_id, locations[start], locations[end], path_name, dist, minutes)
+         for start, end, path_name, dist, minutes in routes]
+    )
+    migrate_db.refresh_route_summaries(cur, [station_id])
+    cur.execute(
+        "INSERT OR REPLACE INTO route_generation (station_id, content_hash, route_count) "
+        "VALUES (?, ?, ?);",
+        (station_id, digest, len(routes))
+    )
+
+
+def main(db_path=DB_PATH, full=False, workers=None, verbose=True, mode=SYNTHETIC,
+         station_names=None):
+    # station_names: limit the run to these stations (default: all)
+    migrate_db.ensure_current(db_path)
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+
+    # 1) Find stations whose size or locations changed since the last run
+    stations = load_stations(cur)
+    unknown = sorted(set(station_names or ()) - set(stations))
+    if unknown:
+        conn.close()
+        raise ValueError(f"unknown stations: {', '.join(unknown)}")
+    jobs, hashes = changed_stations(cur, stations, full, mode,
+                                    set(station_names) if station_names else None)
+    if not jobs:
+        conn.close()
+        if verbose:
+            print("✅ Routes are up to date – nothing to regenerate.")
+        return 0
+
+    # 2) Plan routes in parallel; one writer applies everything in a single transaction
+    workers = workers or os.cpu_count() or 1
     total_routes = 0
+    t0 = time.perf_counter()
+    pool = None
+    try:
+        cur.execute("BEGIN IMMEDIATE;")
+        if workers == 1 or len(jobs) == 1:
+            results = map(generate_station, jobs)
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            results = pool.map(generate_station, jobs, chunksize=max(1, len(jobs) // (workers * 8)))
+        for station_name, nodes, edges, routes in results:
+            station_id, _, locations = stations[station_name]
+            write_station(cur, station_id, locations, nodes, edges, routes, hashes[station_name])
+            total_routes += len(routes)
+            if verbose and len(jobs) <= 100:
+                print(f"Generated routes for station: {station_name}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        conn.close()
 
-    for station_name, size in stations:
-        # Get locations for this station
-        cur.execute(
-            "SELECT location_name FROM station_locations WHERE station_name = ?;",
-            (station_name,)
-        )
-        locations = [row[0] for row in cur.fetchall()]
-
-        if len(locations) < 2:
-            continue  # Not enough points
-
-        # Base distance ranges by station size
-        if size == "big":
-            base_min, base_max = 220, 480
-        elif size == "medium":
-            base_min, base_max = 160, 360
-        else:  # small
-            base_min, base_max = 90, 240
-
-        # Directed pairs: from each location to every other location
-        for start in locations:
-            for end in locations:
-                if start == end:
-                    continue
-
-                # Decide how many alternative routes to create
-                # More routes if going from Entry → Platform (like your BTM Layout example)
-                is_entry = "Entry" in start
-                is_platform = "Platform" in end
-                if is_entry and is_platform:
-                    num_routes = 4   # more choices
-                else:
-                    num_routes = 2   # normal
-
-                # Generate multiple variations
-                base_distance = random.randint(base_min, base_max)
-                for i in range(num_routes):
-                    # Slight distance variation for each alternative
-                    extra = random.randint(10, 50) * i
-                    dist = base_distance + extra
-                    time = max(2, int(dist / 70))  # ~70 m/min walking speed
-
-                    # Short labels for path name
-                    short_start = start.split('-')[0].strip()
-                    short_end = end.split('-')[0].strip()
-                    path_name = f"Route {i+1}: {short_start} → {short_end}"
-
-                    cur.execute(
-                        """
-                        INSERT INTO routes
-                        (station_name, start_location, end_location, path_name, base_distance, base_time)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                        """,
-                        (station_name, start, end, path_name, dist, time)
-                    )
-                    total_routes += 1
-
-        print(f"Generated routes for station: {station_name}")
-
-    conn.commit()
+    # refresh the memory-mapped snapshot now rather than on the first lookup
+    route_store.open_store(db_path)
+
+    if verbose:
+        print(f"✅ Finished: inserted {total_routes} routes for {len(jobs)} stations "
+              f"in {time.perf_counter() - t0:.2f} s.")
+    return total_routes
+
+
+# =====================================================
+# NETWORK-SCALE BENCHMARK DATABASE
+# =====================================================
+def make_scaled_db(out_path, num_stations, source_db=DB_PATH):
+    # synthesise a network of num_stations by cycling through the real
+    # station layouts; never touches the source database
+    if os.path.exists(out_path):
+        os.remove(out_path)
+    src = sqlite3.connect(f"file:{os.path.abspath(source_db)}?mode=ro", uri=True)
+    templates = src.execute("""
+        SELECT s.station_name, s.station_size, MIN(l.line_name)
+        FROM station_index s JOIN stations l ON l.station_name = s.station_name
+        WHERE EXISTS (SELECT 1 FROM station_locations x WHERE x.station_id = s.station_id)
+        GROUP BY s.station_id ORDER BY s.station_id;
+    """).fetchall()
+    layouts = {
+        name: [row[0] for row in src.execute(
+            "SELECT location_name FROM station_locations WHERE station_name = ? "
+            "ORDER BY location_id;", (name,))]
+        for name, _, _ in templates
+    }
+    src.close()
+
+    conn = sqlite3.connect(out_path)
+    conn.executescript("""
+        CREATE TABLE stations (
+            station_id   INTEGER PRIMARY KEY AUTOINCREMENT,
+            station_name TEXT NOT NULL,
+            line_name    TEXT NOT NULL,
+            station_size TEXT NOT NULL
+        );
+        CREATE TABLE station_locations (
+            location_id   INTEGER PRIMARY KEY AUTOINCREMENT,
+            station_name  TEXT NOT NULL,
+            location_name TEXT NOT NULL
+        );
+        CREATE TABLE routes (
+            route_id       INTEGER PRIMARY KEY AUTOINCREMENT,
+            station_name   TEXT    NOT NULL,
+            start_location TEXT    NOT NULL,
+            end_location   TEXT    NOT NULL,
+            path_name      TEXT    NOT NULL,
+            base_distance  INTEGER NOT NULL,
+            base_time      INTEGER NOT NULL
+        );
+    """)
+    with conn:
+        for i in range(num_stations):
+            name, size, line = templates[i % len(templates)]
+            scaled_name = name if i < len(templates) else f"{name} #{i // len(templates)}"
+            conn.execute(
+                "INSERT INTO stations (station_name, line_name, station_size) VALUES (?, ?, ?);",
+                (scaled_name, line, size)
+            )
+            conn.executemany(
+                "INSERT INTO station_locations (station_name, location_name) VALUES (?, ?);",
+                [(scaled_name, location) for location in layouts[name]]
+            )
     conn.close()
-    print(f"✅ Finished: inserted {total_routes} routes into 'routes' table.")
+    migrate_db.migrate(out_path)
+    return out_path
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate walkway graphs and routes.")
+    parser.add_argument("stations", nargs="*", help="station names (default: all)")
+    parser.add_argument("--db", default=None)
+    parser.add_argument("--full", action="store_true",
+                        help="regenerate every station, not just the changed ones")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="route-planning processes (default: all cores, 1 = inline)")
+    parser.add_argument("--scale", type=int, default=None, metavar="N",
+                        help="build a synthetic N-station network database and time generation on it")
+    parser.add_argument("--from-graphs", action="store_true",
+                        help="plan routes on the walkway graphs (Yen) instead of the synthetic "
+                             "generator; replaces the route data of every station it touches")
+    args = parser.parse_args()
+    mode = FROM_GRAPHS if args.from_graphs else SYNTHETIC
+
+    if args.scale:
+        out_path = args.db or f"metro_footpath_x{args.scale}.db"
+        t0 = time.perf_counter()
+        make_scaled_db(out_path, args.scale)
+        print(f"Built {args.scale}-station network in {out_path} "
+              f"({time.perf_counter() - t0:.2f} s)")
+        main(out_path, full=True, workers=args.workers, mode=mode)
+    else:
+        main(args.db or DB_PATH, full=args.full, workers=args.workers, mode=mode,
+             station_names=args.stations or None)
@@ -0,0 +1,490 @@
+import argparse
+import csv
+import heapq
+import sqlite3
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+import batch_assign
+import footpath_db
+import migrate_db
+import station_graph
+from footpath_db import DB_PATH
+
+# =====================================================
+# CONFIG
+# =====================================================
+RIDE_MINUTES_PER_STOP = 2.5     # synthetic networks (benchmarks) without per-hop times
+HEADWAY_MINUTES = 6.0           # every boarding waits half a headway on average
+NUM_LANDMARKS = 8
+LINE_STOPS_CSV = "line_stops.csv"   # the shipped stop order, loaded by --import-stops
+EXPECTED_CROWD = sum(batch_assign.BASE_CROWD_RANGE) / 2   # background crowd (%) for planning
+
+# stop order and ride times along each line (migration 9, --import-stops)
+NETWORK_SQL = """
+    SELECT line_name, station_name, minutes_to_next
+    FROM line_stops
+    ORDER BY line_name, stop_seq;
+"""
+PLATFORMS_SQL = """
+    SELECT s.station_name, l.location_name
+    FROM station_locations l
+    JOIN station_index s ON s.station_id = l.station_id
+    WHERE l.location_name LIKE '%Platform%'
+    ORDER BY l.location_id;
+"""
+
+# kind: walk / ride / transfer; stops only for rides (start/end are stations),
+# path only for walks and transfers (start/end are station locations)
+Leg = namedtuple("Leg", "kind station line start end minutes path stops")
+Journey = namedtuple("Journey", "minutes legs settled")
+
+INF = float("inf")
+
+
+def line_sequences(rows):
+    # (line_name, station_name, minutes_to_next) rows in stop order ->
+    # {line: [stations]}, {line: [ride minutes between consecutive stops]}
+    lines, hops = {}, {}
+    for line_name, station_name, minutes in rows:
+        lines.setdefault(line_name, []).append(station_name)
+        hops.setdefault(line_name, []).append(minutes)
+    return lines, {line_name: minutes[:-1] for line_name, minutes in hops.items()}
+
+
+def import_line_stops(db_path, csv_path):
+    # CSV rows "line_name,station_name,minutes_to_next" in stop order; each
+    # line in the file replaces that line's stops. Returns {line: stops}.
+    lines = {}
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for n, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                line_name, station_name = row["line_name"].strip(), row["station_name"].strip()
+                minutes = (row.get("minutes_to_next") or "").strip()
+                minutes = float(minutes) if minutes else None
+            except (KeyError, AttributeError, ValueError):
+                raise ValueError(f"{csv_path}:{n}: expected line_name,station_name,minutes_to_next")
+            if not line_name or not station_name or (minutes is not None and minutes <= 0):
+                raise ValueError(f"{csv_path}:{n}: bad stop {row}")
+            lines.setdefault(line_name, []).append((station_name, minutes))
+    for line_name, stops in lines.items():
+        if any(minutes is None for _, minutes in stops[:-1]):
+            raise ValueError(f"{line_name}: every stop but the last needs minutes_to_next")
+
+    migrate_db.ensure_current(db_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        known = {name for (name,) in conn.execute("SELECT station_name FROM station_index;")}
+        unknown = sorted({s for stops in lines.values() for s, _ in stops} - known)
+        if unknown:
+            raise ValueError(f"unknown stations: {', '.join(unknown)}")
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            for line_name, stops in lines.items():
+                conn.execute("DELETE FROM line_stops WHERE line_name = ?;", (line_name,))
+                conn.executemany(
+                    "INSERT INTO line_stops (line_name, stop_seq, station_name, minutes_to_next) "
+                    "VALUES (?, ?, ?, ?);",
+                    [(line_name, seq, station_name, minutes)
+                     for seq, (station_name, minutes) in enumerate(stops, start=1)]
+                )
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+    finally:
+        conn.close()
+    return {line_name: len(stops) for line_name, stops in lines.items()}
+
+
+def line_platforms(station_platforms, line_name, all_lines):
+    # "Green Line Platform 1" belongs to the Green Line; a bare "Platform 1"
+    # belongs to whichever line(s) stop at the station
+    own = [p for p in station_platforms if line_name in p]
+    if own:
+        return own
+    return [p for p in station_platforms if not any(ln in p for ln in all_lines)] or station_platforms
+
+
+# =====================================================
+# METRO NETWORK (platform per station and line, ALT landmarks)
+# =====================================================
+# One node per (station, line). Consecutive stations on a line are joined by
+# ride edges; the lines meeting at an interchange are joined by transfer
+# edges whose free-flow cost (base walking time + waiting) is a lower bound
+# of the live cost, so landmark distances stay valid heuristics however
+# congested the interchange footpaths get. The ALT bound |d(L,t) - d(L,v)|
+# assumes symmetric costs, so every free-flow edge has the same cost both
+# ways: rides are added in both directions and a transfer costs the cheaper
+# of its two directions.
+class MetroNetwork:
+    def __init__(self, lines, transfer_minutes=None, num_landmarks=NUM_LANDMARKS,
+                 ride_minutes=None):
+        # lines: {line: [station, ...]}; transfer_minutes: {(station, from_line,
+        # to_line): free-flow minutes}, default half a headway; ride_minutes:
+        # {line: [minutes between consecutive stops]} (None = no known hop),
+        # default RIDE_MINUTES_PER_STOP
+        transfer_minutes = transfer_minutes or {}
+        ride_minutes = ride_minutes or {}
+        self.nodes = []
+        self.node_of = {}
+        self.lines_at = {}
+        for line_name, stations in lines.items():
+            for station_name in stations:
+                self.node_of[(station_name, line_name)] = len(self.nodes)
+                self.nodes.append((station_name, line_name))
+                self.lines_at.setdefault(station_name, []).append(line_name)
+        self.adjacency = [[] for _ in self.nodes]
+        for line_name, stations in lines.items():
+            hops = ride_minutes.get(line_name) or [RIDE_MINUTES_PER_STOP] * (len(stations) - 1)
+            for a, b, minutes in zip(stations, stations[1:], hops):
+                if minutes is None:
+                    continue
+                u, v = self.node_of[(a, line_name)], self.node_of[(b, line_name)]
+                self.adjacency[u].append((v, minutes, False))
+                self.adjacency[v].append((u, minutes, False))
+        for station_name, station_lines in self.lines_at.items():
+            for a in station_lines:
+                for b in station_lines:
+                    if a != b:
+                        minutes = min(
+                            transfer_minutes.get((station_name, a, b), HEADWAY_MINUTES / 2),
+                            transfer_minutes.get((station_name, b, a), HEADWAY_MINUTES / 2))
+                        self.adjacency[self.node_of[(station_name, a)]].append(
+                            (self.node_of[(station_name, b)], minutes, True))
+        self.landmarks = self.select_landmarks(min(num_landmarks, len(self.nodes)))
+        # per node: free-flow minutes from every landmark (inf if unreachable)
+        if self.landmarks:
+            by_landmark = [self.distances(landmark) for landmark in self.landmarks]
+            self.landmark_dist = list(zip(*by_landmark))
+        else:
+            self.landmark_dist = [()] * len(self.nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def distances(self, source):
+        # free-flow Dijkstra from one node to every node
+        dist = [INF] * len(self.nodes)
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+            for nxt, minutes, _ in self.adjacency[node]:
+                nd = d + minutes
+                if nd < dist[nxt]:
+                    dist[nxt] = nd
+                    heapq.heappush(heap, (nd, nxt))
+        return dist
+
+    def select_landmarks(self, k):
+        # farthest-point selection: each new landmark is the node farthest
+        # from the ones chosen so far (unreachable nodes seed new components)
+        if k <= 0:
+            return []
+        first = np.asarray(self.distances(0))
+        first[np.isinf(first)] = -1.0
+        closest = np.full(len(self.nodes), np.inf)
+        landmarks = []
+        candidate = int(np.argmax(first))
+        while len(landmarks) < k:
+            landmarks.append(candidate)
+            closest = np.minimum(closest, self.distances(candidate))
+            closest[landmarks] = -1.0
+            candidate = int(np.argmax(np.where(np.isinf(closest), 1e18, closest)))
+            if closest[candidate] <= 0:
+                break
+        return landmarks
+
+    def heuristic(self, node, targets):
+        # ALT lower bound: |d(L, t) - d(L, v)| for the best landmark L, taken
+        # against the nearest target platform
+        here = self.landmark_dist[node]
+        best = INF
+        for target in targets:
+            bound = 0.0
+            for a, b in zip(here, self.landmark_dist[target]):
+                if a != INF and b != INF:
+                    gap = abs(a - b)
+                    if gap > bound:
+                        bound = gap
+                elif a != b:
+                    return INF          # different components
+            if bound < best:
+                best = bound
+        return best
+
+    def search(self, sources, targets, transfer_cost=None):
+        # A* from several start platforms (node -> initial cost) to several
+        # end platforms (node -> egress cost); transfer_cost(u, v) may return
+        # the live cost of a transfer edge (never below the free-flow one).
+        # Returns (minutes, nodes, settled) or None. Ties on f go to the
+        # larger g (nearer the target), which matters on grid-like networks.
+        sink = -1
+        targets_list = list(targets)
+        g = {}
+        prev = {}
+        heap = []
+        for node, cost in sources.items():
+            if cost < g.get(node, INF):
+                g[node] = cost
+                prev[node] = None
+                heapq.heappush(heap, (cost + self.heuristic(node, targets_list), -cost, node))
+        closed = set()
+        while heap:
+            _, neg_d, node = heapq.heappop(heap)
+            d = -neg_d
+            if node == sink:
+                path = [prev[sink]]
+                while prev[path[-1]] is not None:
+                    path.append(prev[path[-1]])
+                path.reverse()
+                return d, path, len(closed)
+            if node in closed:
+                continue
+            closed.add(node)
+            if node in targets:
+                total = d + targets[node]
+                if total < g.get(sink, INF):
+                    g[sink] = total
+                    prev[sink] = node
+                    heapq.heappush(heap, (total, -total, sink))
+            for nxt, minutes, is_transfer in self.adjacency[node]:
+                if nxt in closed:
+                    continue
+                if is_transfer and transfer_cost is not None:
+                    minutes = transfer_cost(node, nxt)
+                nd = d + minutes
+                if nd < g.get(nxt, INF):
+                    h = self.heuristic(nxt, targets_list)
+                    if h == INF:
+                        continue
+                    g[nxt] = nd
+                    prev[nxt] = node
+                    heapq.heappush(heap, (nd + h, -nd, nxt))
+        return None
+
+
+# =====================================================
+# JOURNEY PLANNER (network + live in-station walking legs)
+# =====================================================
+class JourneyPlanner:
+    def __init__(self, data_access, route_engine=None, assignments=None, footfall=None,
+                 num_landmarks=NUM_LANDMARKS):
+        self.db = data_access
+        self.route_engine = route_engine or station_graph.RouteEngine(data_access)
+        self.assignments = assignments      # decayed per-path load (AssignmentEngine or SegmentCongestion)
+        self.footfall = footfall            # observed crowd (FootfallIngestor)
+        self.num_landmarks = num_landmarks
+        self._network = None
+        self._platforms = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def network(self):
+        # rebuilt (landmarks included) when the stations data changes
+        version = self.db.check_for_changes()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    lines, hops = line_sequences(self.db.query_rows(NETWORK_SQL))
+                    platforms = {}
+                    for station_name, location_name in self.db.query_rows(PLATFORMS_SQL):
+                        platforms.setdefault(station_name, []).append(location_name)
+                    self._platforms = {
+                        (station_name, line_name): line_platforms(platforms.get(station_name, []),
+                                                                  line_name, lines)
+                        for line_name, stations in lines.items() for station_name in stations
+                    }
+                    self._network = MetroNetwork(lines, self._free_flow_transfers(lines),
+                                                 self.num_landmarks, hops)
+                    self._version = version
+        return self._network
+
+    def available(self):
+        # no stop sequences loaded, no journeys
+        return len(self.network()) > 0
+
+    def state(self):
+        # what warm_cache.py saves: the network (landmarks included) + platforms
+        network = self.network()
+        return network, self._platforms
+
+    def warm_start(self, network, platforms):
+        with self._lock:
+            self._network = network
+            self._platforms = platforms
+            self._version = self.db.check_for_changes()
+
+    def _free_flow_transfers(self, lines):
+        lines_at = {}
+        for line_name, stations in lines.items():
+            for station_name in stations:
+                lines_at.setdefault(station_name, []).append(line_name)
+        transfers = {}
+        for station_name, station_lines in lines_at.items():
+            for a in station_lines:
+                for b in station_lines:
+                    if a != b:
+                        walk = self.walk(station_name, self.platforms(station_name, a),
+                                         self.platforms(station_name, b), live=False)
+                        transfers[(station_name, a, b)] = (walk[0] if walk else 0.0) + HEADWAY_MINUTES / 2
+        return transfers
+
+    def platforms(self, station_name, line_name):
+        return self._platforms.get((station_name, line_name), [])
+
+    def walk(self, station_name, starts, ends, live=True):
+        # quickest in-station footpath from any start to any end location:
+        # (minutes, start, end, path) or None. Live minutes are the results
+        # stage's "Live Estimated Time" with the expected background crowd
+        # (or the observed one) instead of a random draw.
+        best = None
+        for start in starts:
+            for end in ends:
+                if start == end:
+                    return 0.0, start, end, None
+                df = self.route_engine.route_table(station_name, start, end)
+                if df is None or df.empty:
+                    continue
+                paths = df["Path"].tolist()
+                base_time = df["Base Time (mins)"].to_numpy()
+                if live:
+                    observed = {}
+                    if self.footfall is not None:
+                        observed = self.footfall.path_crowd(station_name, start, end)
+                    loads = {}
+                    if self.assignments is not None:
+                        loads = self.assignments.loads(station_name, start, end)
+                    background = [observed.get(p, EXPECTED_CROWD) for p in paths]
+                    crowd = batch_assign.live_crowd(np.array(background),
+                                                    [loads.get(p, 0.0) for p in paths])
+                    minutes = batch_assign.live_time(base_time, crowd)
+                else:
+                    minutes = base_time.astype(float)
+                i = int(np.argmin(minutes))
+                if best is None or minutes[i] < best[0]:
+                    best = (float(minutes[i]), start, end, paths[i])
+        return best
+
+    def plan(self, origin_station, origin_location, dest_station, dest_location):
+        # quickest door-to-door journey as a Journey of legs, or None
+        network = self.network()
+        if origin_station == dest_station:
+            walk = self.walk(origin_station, [origin_location], [dest_location])
+            if walk is None:
+                return None
+            return Journey(walk[0], [Leg("walk", origin_station, None, origin_location,
+                                         dest_location, walk[0], walk[3], None)], 0)
+
+        access, egress, sources, targets = {}, {}, {}, {}
+        for line_name in network.lines_at.get(origin_station, []):
+            walk = self.walk(origin_station, [origin_location],
+                             self.platforms(origin_station, line_name))
+            if walk is not None:
+                node = network.node_of[(origin_station, line_name)]
+                access[node] = walk
+                sources[node] = walk[0] + HEADWAY_MINUTES / 2
+        for line_name in network.lines_at.get(dest_station, []):
+            walk = self.walk(dest_station, self.platforms(dest_station, line_name),
+                             [dest_location])
+            if walk is not None:
+                node = network.node_of[(dest_station, line_name)]
+                egress[node] = walk
+                targets[node] = walk[0]
+        if not sources or not targets:
+            return None
+
+        transfers = {}
+
+        def transfer_cost(u, v):
+            # live interchange walk, looked up once per query
+            if (u, v) not in transfers:
+                station_name, from_line = network.nodes[u]
+                _, to_line = network.nodes[v]
+                walk = self.walk(station_name, self.platforms(station_name, from_line),
+                                 self.platforms(station_name, to_line))
+                transfers[(u, v)] = walk or (0.0, None, None, None)
+            # the free-flow cost is the lower bound the landmarks rely on
+            free_flow = next(m for n, m, _ in network.adjacency[u] if n == v)
+            return max(transfers[(u, v)][0] + HEADWAY_MINUTES / 2, free_flow)
+
+        found = network.search(sources, targets, transfer_cost)
+        if found is None:
+            return None
+        minutes, nodes, settled = found
+        return Journey(round(minutes, 1),
+                       self._legs(network, nodes, access, egress, transfers), settled)
+
+    def _legs(self, network, nodes, access, egress, transfers):
+        legs = []
+        first_station, first_line = network.nodes[nodes[0]]
+        minutes, start, end, path = access[nodes[0]]
+        if path is not None:
+            legs.append(Leg("walk", first_station, first_line, start, end, minutes, path, None))
+        ride_from, stops, ride_minutes = first_station, 0, 0.0
+        for u, v in zip(nodes, nodes[1:]):
+            station_name, line_name = network.nodes[u]
+            next_station, next_line = network.nodes[v]
+            if next_line == line_name:
+                stops += 1
+                ride_minutes += next(m for n, m, _ in network.adjacency[u] if n == v)
+                continue
+            legs.append(self._ride(ride_from, station_name, line_name, stops, ride_minutes))
+            minutes, start, end, path = transfers.get((u, v), (0.0, None, None, None))
+            legs.append(Leg("transfer", station_name, f"{line_name} → {next_line}",
+                            start, end, minutes, path, None))
+            ride_from, stops, ride_minutes = next_station, 0, 0.0
+        last_station, last_line = network.nodes[nodes[-1]]
+        legs.append(self._ride(ride_from, last_station, last_line, stops, ride_minutes))
+        minutes, start, end, path = egress[nodes[-1]]
+        if path is not None:
+            legs.append(Leg("walk", last_station, last_line, start, end, minutes, path, None))
+        return legs
+
+    def _ride(self, from_station, to_station, line_name, stops, ride_minutes):
+        # waiting for the train is booked on the ride it boards
+        minutes = round(HEADWAY_MINUTES / 2 + ride_minutes, 1)
+        return Leg("ride", from_station, line_name, from_station, to_station, minutes, None, stops)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan a journey across metro lines.")
+    parser.add_argument("places", nargs="*",
+                        metavar="origin_station origin_location dest_station dest_location")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--import-stops", metavar="CSV", nargs="?", const=LINE_STOPS_CSV,
+                        help="load line stop order: line_name,station_name,minutes_to_next "
+                             f"(default {LINE_STOPS_CSV})")
+    args = parser.parse_args()
+
+    if args.import_stops:
+        for line_name, stops in import_line_stops(args.db, args.import_stops).items():
+            print(f"✅ {line_name}: {stops} stops")
+        return
+    if len(args.places) != 4:
+        parser.error("expected origin_station origin_location dest_station dest_location")
+
+    planner = JourneyPlanner(footpath_db.DataAccess(args.db))
+    if not planner.available():
+        print("❌ No line stop order loaded yet – see --import-stops.")
+        return
+    journey = planner.plan(*args.places)
+    if journey is None:
+        print("❌ No journey found.")
+        return
+    print(f"🚇 {journey.minutes} mins ({journey.settled} platforms searched)")
+    for leg in journey.legs:
+        if leg.kind == "ride":
+            print(f"  {leg.line}: {leg.start} → {leg.end}, {leg.stops} stops, {leg.minutes} mins")
+        else:
+            print(f"  {leg.kind} at {leg.station}: {leg.start} → {leg.end} "
+                  f"via {leg.path}, {leg.minutes} mins")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import pandas as pd
+
+# =====================================================
+# CONFIG
+# =====================================================
+LIVE_REFRESH_SECS = 3   # how often the live fragment of the results page reruns
+
+
+# =====================================================
+# CLIENT-SIDE (VEGA-LITE) CHART SPECS
+# =====================================================
+# The browser renders these charts, so a live refresh only ships the spec and
+# a few hundred bytes of Arrow data instead of a freshly rasterised PNG.
+# "sort": None keeps the time slots in data order rather than alphabetical.
+def crowd_chart_spec(start_loc, end_loc):
+    return {
+        "title": f"Crowd Variation for Paths from '{start_loc}' → '{end_loc}'",
+        "mark": {"type": "bar"},
+        "encoding": {
+            "x": {"field": "Time", "type": "nominal", "sort": None,
+                  "title": "Time Intervals", "axis": {"labelAngle": 0}},
+            "xOffset": {"field": "Path", "type": "nominal"},
+            "y": {"field": "Crowd", "type": "quantitative",
+                  "title": "Crowd Density (%)", "scale": {"domain": [0, 100]}},
+            "color": {"field": "Path", "type": "nominal"},
+            "tooltip": [{"field": "Path"}, {"field": "Time"}, {"field": "Crowd"}],
+        },
+    }
+
+
+def load_chart_spec(station_name):
+    return {
+        "title": f"Passenger Load at {station_name}",
+        "mark": {"type": "line", "point": True},
+        "encoding": {
+            "x": {"field": "Time", "type": "nominal", "sort": None, "title": "Time (Hours)"},
+            "y": {"field": "Passengers", "type": "quantitative", "title": "Passengers"},
+            "tooltip": [{"field": "Time"}, {"field": "Passengers"}],
+        },
+    }
+
+
+def crowd_frame(crowd_matrix, time_intervals):
+    # {path: per-slot crowd} -> long form (Time, Path, Crowd) for Vega-Lite
+    return pd.DataFrame({
+        "Time": [t for _ in crowd_matrix for t in time_intervals],
+        "Path": [path for path in crowd_matrix for _ in time_intervals],
+        "Crowd": [int(v) for values in crowd_matrix.values() for v in values],
+    })
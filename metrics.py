@@ -0,0 +1,238 @@
+import functools
+import os
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# =====================================================
+# CONFIG
+# =====================================================
+# Off unless FOOTPATH_METRICS=1: timer() then hands back one shared no-op
+# context manager, inc() returns straight away and @timed leaves the
+# function undecorated, so production reruns pay (almost) nothing.
+ENABLED = os.environ.get("FOOTPATH_METRICS", "").lower() in ("1", "true", "yes", "on")
+METRICS_FILE = os.environ.get("FOOTPATH_METRICS_FILE")          # Prometheus textfile
+METRICS_PORT = int(os.environ.get("FOOTPATH_METRICS_PORT") or 0)  # /metrics endpoint
+EXPORT_EVERY_SECS = 5
+PREFIX = "footpath_"
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NOOP = nullcontext()
+
+
+# =====================================================
+# REGISTRY (counters + latency histograms)
+# =====================================================
+class RerunStats:
+    # what one script run did: {(name, labels): [count, seconds]}
+    def __init__(self):
+        self.started = time.time()
+        self.values = {}
+
+    def add(self, key, count, seconds):
+        entry = self.values.get(key)
+        if entry is None:
+            self.values[key] = [count, seconds]
+        else:
+            entry[0] += count
+            entry[1] += seconds
+
+    def rows(self):
+        return [
+            {"metric": name,
+             "labels": ", ".join(f"{k}={v}" for k, v in labels),
+             "count": count,
+             "total (ms)": round(seconds * 1000, 3)}
+            for (name, labels), (count, seconds) in sorted(self.values.items())
+        ]
+
+
+class Registry:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}    # key -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def inc(self, name, n, labels):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+        rerun = getattr(self._local, "rerun", None)
+        if rerun is not None:
+            rerun.add(key, n, 0.0)
+
+    def observe(self, name, seconds, labels):
+        key = (name, labels)
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    hist[i] += 1
+                    break
+            hist[-2] += 1
+            hist[-1] += seconds
+        rerun = getattr(self._local, "rerun", None)
+        if rerun is not None:
+            rerun.add(key, 1, seconds)
+
+    def begin_rerun(self):
+        self._local.rerun = RerunStats()
+        return self._local.rerun
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def prometheus_text(self):
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((k, list(v)) for k, v in self.histograms.items())
+        lines, typed = [], set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                typed.add(name)
+            lines.append(f"{PREFIX}{name}{format_labels(labels)} {value}")
+        for (name, labels), hist in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip(self.buckets, hist):
+                cumulative += count
+                lines.append(f"{PREFIX}{name}_bucket{format_labels(labels + (('le', repr(bound)),))} "
+                             f"{cumulative}")
+            lines.append(f"{PREFIX}{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {hist[-2]}")
+            lines.append(f"{PREFIX}{name}_sum{format_labels(labels)} {hist[-1]:.6f}")
+            lines.append(f"{PREFIX}{name}_count{format_labels(labels)} {hist[-2]}")
+        return "\n".join(lines) + "\n"
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{escape_label(v)}"' for k, v in labels) + "}"
+
+
+registry = Registry()
+
+
+# =====================================================
+# INSTRUMENTATION API
+# =====================================================
+class _Timer:
+    __slots__ = ("name", "labels", "t0")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.observe(self.name, time.perf_counter() - self.t0, self.labels)
+        return False
+
+
+def inc(name, n=1, **labels):
+    if ENABLED:
+        registry.inc(name, n, tuple(sorted(labels.items())))
+
+
+def timer(name, **labels):
+    # with metrics.timer("db_query_seconds", query="get_routes"): ...
+    if not ENABLED:
+        return _NOOP
+    return _Timer(name, tuple(sorted(labels.items())))
+
+
+def timed(name, **labels):
+    # decorator; labels default to fn=<function name>
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        key = tuple(sorted(({"fn": fn.__name__} | labels).items()))
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                registry.observe(name, time.perf_counter() - t0, key)
+        return wrapper
+    return decorate
+
+
+def begin_rerun():
+    # start collecting what this script run does (for the debug panel)
+    return registry.begin_rerun() if ENABLED else None
+
+
+# =====================================================
+# EXPORT (Prometheus text: file and/or HTTP endpoint)
+# =====================================================
+def prometheus_text():
+    return registry.prometheus_text()
+
+
+def write_textfile(path=None):
+    # atomic replace, as the node_exporter textfile collector expects
+    path = path or METRICS_FILE
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200 if self.path.startswith("/metrics") else 404)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+_last_export = 0.0
+_export_lock = threading.Lock()
+
+
+def start_http_server(port=None, host="127.0.0.1"):
+    global _server
+    with _export_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port or METRICS_PORT), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
+
+
+def export():
+    # called once per dashboard rerun: lazily starts the endpoint and
+    # rewrites the textfile at most every EXPORT_EVERY_SECS
+    global _last_export
+    if not ENABLED:
+        return
+    if METRICS_PORT and _server is None:
+        start_http_server()
+    now = time.time()
+    if METRICS_FILE and now - _last_export >= EXPORT_EVERY_SECS:
+        _last_export = now
+        write_textfile()
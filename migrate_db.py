@@ -0,0 +1,635 @@
+import argparse
+import sqlite3
+import sys
+
+from footpath_db import DB_PATH, HOT_QUERIES
+from station_graph import build_station_graphs
+
+# Versioned schema migrations for metro_footpath.db.
+# The applied version lives in PRAGMA user_version; every migration runs in
+# its own transaction so a failure leaves the database on the previous version.
+# Each migration has a revert, so --target below the current version steps
+# back down one migration (and one transaction) at a time.
+
+WHITESPACE = "char(32, 9, 10, 13)"
+
+
+# =====================================================
+# MIGRATIONS
+# =====================================================
+def run_script(cur, script):
+    # executescript() would COMMIT first and break the per-migration
+    # transaction, so feed the statements one by one instead
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            cur.execute(statement)
+            statement = ""
+    if statement.strip():
+        cur.execute(statement)
+
+
+def trim_names(cur):
+    # names were compared with TRIM() on every lookup, which rules out any
+    # index – store them trimmed once instead (TRIM() alone misses \r\n)
+    run_script(cur, f"""
+        UPDATE stations SET
+            station_name = TRIM(station_name, {WHITESPACE}),
+            line_name    = TRIM(line_name, {WHITESPACE}),
+            station_size = TRIM(station_size, {WHITESPACE});
+        UPDATE station_locations SET
+            station_name  = TRIM(station_name, {WHITESPACE}),
+            location_name = TRIM(location_name, {WHITESPACE});
+        UPDATE routes SET
+            station_name   = TRIM(station_name, {WHITESPACE}),
+            start_location = TRIM(start_location, {WHITESPACE}),
+            end_location   = TRIM(end_location, {WHITESPACE});
+    """)
+
+
+def integer_keys(cur):
+    # one row per physical station (the stations table has one row per
+    # line membership, so station_name repeats across lines)
+    run_script(cur, """
+        CREATE TABLE station_index (
+            station_id   INTEGER PRIMARY KEY,
+            station_name TEXT NOT NULL UNIQUE,
+            station_size TEXT NOT NULL
+        );
+        INSERT INTO station_index (station_name, station_size)
+        SELECT s.station_name, s.station_size
+        FROM stations s
+        WHERE s.station_id = (
+            SELECT MIN(station_id) FROM stations WHERE station_name = s.station_name
+        )
+        ORDER BY s.station_id;
+        INSERT OR IGNORE INTO station_index (station_name, station_size)
+        SELECT DISTINCT station_name, 'small' FROM station_locations;
+
+        ALTER TABLE station_locations
+            ADD COLUMN station_id INTEGER REFERENCES station_index(station_id);
+        UPDATE station_locations SET station_id = (
+            SELECT station_id FROM station_index
+            WHERE station_index.station_name = station_locations.station_name
+        );
+
+        CREATE TABLE route_paths (
+            route_id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            station_id        INTEGER NOT NULL REFERENCES station_index(station_id),
+            start_location_id INTEGER NOT NULL REFERENCES station_locations(location_id),
+            end_location_id   INTEGER NOT NULL REFERENCES station_locations(location_id),
+            path_name         TEXT    NOT NULL,
+            base_distance     INTEGER NOT NULL,   -- in meters
+            base_time         INTEGER NOT NULL    -- in minutes
+        );
+        INSERT INTO route_paths
+            (route_id, station_id, start_location_id, end_location_id,
+             path_name, base_distance, base_time)
+        SELECT r.route_id, s.station_id, a.location_id, b.location_id,
+               r.path_name, r.base_distance, r.base_time
+        FROM routes r
+        JOIN station_index s     ON s.station_name = r.station_name
+        JOIN station_locations a ON a.station_name = r.station_name
+                                AND a.location_name = r.start_location
+        JOIN station_locations b ON b.station_name = r.station_name
+                                AND b.location_name = r.end_location;
+        DROP TABLE routes;
+    """)
+    create_compat_views(cur)
+
+
+def lookup_indexes(cur):
+    # covering indexes for the dashboard's hot queries (see footpath_db.HOT_QUERIES)
+    run_script(cur, """
+        CREATE INDEX idx_stations_line
+            ON stations (line_name, station_name);
+        CREATE UNIQUE INDEX idx_locations_by_station_id
+            ON station_locations (station_id, location_name);
+        CREATE INDEX idx_locations_by_station_name
+            ON station_locations (station_name, location_name);
+        CREATE INDEX idx_route_paths_lookup
+            ON route_paths (station_id, start_location_id, end_location_id,
+                            path_name, base_distance, base_time);
+    """)
+
+
+def walkway_graph(cur):
+    # stations as weighted graphs of walkway segments; storage is linear in
+    # the number of segments instead of quadratic in locations (station_graph.py)
+    run_script(cur, """
+        CREATE TABLE walkway_nodes (
+            node_id     INTEGER PRIMARY KEY,
+            station_id  INTEGER NOT NULL REFERENCES station_index(station_id),
+            node_name   TEXT    NOT NULL,
+            node_kind   TEXT    NOT NULL,   -- street / concourse / platform / gate / link
+            location_id INTEGER REFERENCES station_locations(location_id)
+        );
+        CREATE TABLE walkway_edges (
+            edge_id    INTEGER PRIMARY KEY,
+            station_id INTEGER NOT NULL REFERENCES station_index(station_id),
+            from_node  INTEGER NOT NULL REFERENCES walkway_nodes(node_id),
+            to_node    INTEGER NOT NULL REFERENCES walkway_nodes(node_id),
+            edge_kind  TEXT    NOT NULL,    -- corridor / stairs / escalator / gate
+            length_m   REAL    NOT NULL
+        );
+        CREATE INDEX idx_walkway_nodes_station
+            ON walkway_nodes (station_id, node_name, node_kind);
+        CREATE INDEX idx_walkway_edges_station
+            ON walkway_edges (station_id, from_node, to_node, edge_kind, length_m);
+    """)
+    build_station_graphs(cur)
+
+
+def route_generation_state(cur):
+    # content hash of each station's layout as of its last route generation,
+    # so generate_routes.py only rebuilds stations that actually changed
+    run_script(cur, """
+        CREATE TABLE route_generation (
+            station_id   INTEGER PRIMARY KEY REFERENCES station_index(station_id),
+            content_hash TEXT    NOT NULL,
+            route_count  INTEGER NOT NULL,
+            generated_at TEXT    NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
+
+def route_summaries(cur):
+    # one row per (station, start, end): route count, shortest route and the
+    # distance/time range, so stage 2 needs neither the route rows nor a sort
+    run_script(cur, """
+        CREATE TABLE route_summaries (
+            station_id        INTEGER NOT NULL REFERENCES station_index(station_id),
+            start_location_id INTEGER NOT NULL REFERENCES station_locations(location_id),
+            end_location_id   INTEGER NOT NULL REFERENCES station_locations(location_id),
+            route_count       INTEGER NOT NULL,
+            shortest_route_id INTEGER NOT NULL REFERENCES route_paths(route_id),
+            min_distance      INTEGER NOT NULL,
+            max_distance      INTEGER NOT NULL,
+            min_time          INTEGER NOT NULL,
+            max_time          INTEGER NOT NULL,
+            PRIMARY KEY (station_id, start_location_id, end_location_id)
+        ) WITHOUT ROWID;
+    """)
+    refresh_route_summaries(cur)
+
+
+GENERATION_TABLES = ("route_paths", "station_index", "station_locations", "stations")
+
+
+def data_generation(cur):
+    # a counter bumped by every write to the tables derived artefacts are
+    # built from (route store snapshot, warm cache), so an edit to an
+    # existing row invalidates them as surely as an insert or delete
+    run_script(cur, """
+        CREATE TABLE data_generation (
+            id         INTEGER PRIMARY KEY CHECK (id = 0),
+            generation INTEGER NOT NULL
+        );
+        INSERT INTO data_generation (id, generation) VALUES (0, 0);
+    """)
+    for table in GENERATION_TABLES:
+        generation_triggers(cur, table)
+
+
+def generation_triggers(cur, table):
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cur.execute(f"""
+            CREATE TRIGGER {table}_generation_{event.lower()} AFTER {event} ON {table}
+            BEGIN
+                UPDATE data_generation SET generation = generation + 1 WHERE id = 0;
+            END;
+        """)
+
+
+def route_summary_triggers(cur):
+    # generate_routes.py refreshes route_summaries per station; edits made
+    # through the "routes" view refresh the summary of the pair they touch
+    run_script(cur, f"""
+        DROP TRIGGER routes_insert;
+        DROP TRIGGER routes_update;
+        DROP TRIGGER routes_delete;
+
+        CREATE TRIGGER routes_insert INSTEAD OF INSERT ON routes
+        BEGIN
+            SELECT RAISE(ABORT, 'routes: unknown station or location')
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM station_index s
+                JOIN station_locations a ON a.station_id = s.station_id
+                JOIN station_locations b ON b.station_id = s.station_id
+                WHERE s.station_name = TRIM(NEW.station_name, {WHITESPACE})
+                  AND a.location_name = TRIM(NEW.start_location, {WHITESPACE})
+                  AND b.location_name = TRIM(NEW.end_location, {WHITESPACE})
+            );
+            INSERT INTO route_paths
+                (route_id, station_id, start_location_id, end_location_id,
+                 path_name, base_distance, base_time)
+            SELECT NEW.route_id, s.station_id, a.location_id, b.location_id,
+                   NEW.path_name, NEW.base_distance, NEW.base_time
+            FROM station_index s
+            JOIN station_locations a ON a.station_id = s.station_id
+            JOIN station_locations b ON b.station_id = s.station_id
+            WHERE s.station_name = TRIM(NEW.station_name, {WHITESPACE})
+              AND a.location_name = TRIM(NEW.start_location, {WHITESPACE})
+              AND b.location_name = TRIM(NEW.end_location, {WHITESPACE});
+            {refresh_pair_sql(f"TRIM(NEW.station_name, {WHITESPACE})",
+                              f"TRIM(NEW.start_location, {WHITESPACE})",
+                              f"TRIM(NEW.end_location, {WHITESPACE})")}
+        END;
+
+        CREATE TRIGGER routes_update INSTEAD OF UPDATE ON routes
+        BEGIN
+            UPDATE route_paths
+            SET path_name = NEW.path_name,
+                base_distance = NEW.base_distance,
+                base_time = NEW.base_time
+            WHERE route_id = OLD.route_id;
+            {refresh_pair_sql("OLD.station_name", "OLD.start_location", "OLD.end_location")}
+        END;
+
+        CREATE TRIGGER routes_delete INSTEAD OF DELETE ON routes
+        BEGIN
+            DELETE FROM route_paths WHERE route_id = OLD.route_id;
+            {refresh_pair_sql("OLD.station_name", "OLD.start_location", "OLD.end_location")}
+        END;
+    """)
+
+
+def line_stops(cur):
+    # the order of stops along each line and the ride time to the next one;
+    # the stations table lists memberships in insertion order, which is not
+    # line order, so the journey planner only uses lines loaded here
+    # (journey_planner.py --import-stops, which defaults to line_stops.csv)
+    run_script(cur, """
+        CREATE TABLE line_stops (
+            line_name       TEXT    NOT NULL,
+            stop_seq        INTEGER NOT NULL,
+            station_name    TEXT    NOT NULL REFERENCES station_index(station_name),
+            minutes_to_next REAL,               -- NULL at the end of the line
+            PRIMARY KEY (line_name, stop_seq),
+            UNIQUE (line_name, station_name)
+        ) WITHOUT ROWID;
+    """)
+    generation_triggers(cur, "line_stops")
+
+
+# =====================================================
+# REVERTS
+# =====================================================
+def revert_trim_names(cur):
+    # the untrimmed originals are gone; trimmed names are valid at version 0 too
+    pass
+
+
+def revert_integer_keys(cur):
+    # back to the text-keyed routes table; station_locations is rebuilt
+    # because SQLite cannot drop a column used by a foreign key
+    run_script(cur, """
+        DROP TRIGGER station_locations_keys;
+        DROP TRIGGER stations_keys;
+        DROP VIEW routes;
+        CREATE TABLE routes_table (
+            route_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+            station_name  TEXT    NOT NULL,
+            start_location TEXT   NOT NULL,
+            end_location   TEXT   NOT NULL,
+            path_name      TEXT   NOT NULL,
+            base_distance  INTEGER NOT NULL,   -- in meters
+            base_time      INTEGER NOT NULL    -- in minutes
+        );
+        INSERT INTO routes_table
+        SELECT r.route_id, s.station_name, a.location_name, b.location_name,
+               r.path_name, r.base_distance, r.base_time
+        FROM route_paths r
+        JOIN station_index s     ON s.station_id = r.station_id
+        JOIN station_locations a ON a.location_id = r.start_location_id
+        JOIN station_locations b ON b.location_id = r.end_location_id
+        ORDER BY r.route_id;
+        ALTER TABLE routes_table RENAME TO routes;
+        DROP TABLE route_paths;
+
+        CREATE TABLE station_locations_table (
+            "location_id"   INTEGER NOT NULL,
+            "station_name"  TEXT NOT NULL,
+            "location_name" TEXT NOT NULL,
+            PRIMARY KEY("location_id" AUTOINCREMENT)
+        );
+        INSERT INTO station_locations_table
+        SELECT location_id, station_name, location_name FROM station_locations;
+        DROP TABLE station_locations;
+        ALTER TABLE station_locations_table RENAME TO station_locations;
+        DROP TABLE station_index;
+    """)
+
+
+def revert_lookup_indexes(cur):
+    run_script(cur, """
+        DROP INDEX idx_stations_line;
+        DROP INDEX idx_locations_by_station_id;
+        DROP INDEX idx_locations_by_station_name;
+        DROP INDEX idx_route_paths_lookup;
+    """)
+
+
+def revert_walkway_graph(cur):
+    run_script(cur, """
+        DROP TABLE walkway_edges;
+        DROP TABLE walkway_nodes;
+    """)
+
+
+def revert_route_generation_state(cur):
+    cur.execute("DROP TABLE route_generation;")
+
+
+def revert_route_summaries(cur):
+    cur.execute("DROP TABLE route_summaries;")
+
+
+def revert_data_generation(cur):
+    for table in GENERATION_TABLES:
+        for event in ("insert", "update", "delete"):
+            cur.execute(f"DROP TRIGGER {table}_generation_{event};")
+    cur.execute("DROP TABLE data_generation;")
+
+
+def revert_route_summary_triggers(cur):
+    # the view's original triggers come back with the view itself
+    run_script(cur, """
+        DROP VIEW routes;
+        DROP TRIGGER stations_keys;
+        DROP TRIGGER station_locations_keys;
+    """)
+    create_compat_views(cur)
+
+
+def revert_line_stops(cur):
+    cur.execute("DROP TABLE line_stops;")     # its generation triggers go with it
+
+
+MIGRATIONS = [
+    (1, "trim_names", trim_names, revert_trim_names),
+    (2, "integer_keys", integer_keys, revert_integer_keys),
+    (3, "lookup_indexes", lookup_indexes, revert_lookup_indexes),
+    (4, "walkway_graph", walkway_graph, revert_walkway_graph),
+    (5, "route_generation_state", route_generation_state, revert_route_generation_state),
+    (6, "route_summaries", route_summaries, revert_route_summaries),
+    (7, "data_generation", data_generation, revert_data_generation),
+    (8, "route_summary_triggers", route_summary_triggers, revert_route_summary_triggers),
+    (9, "line_stops", line_stops, revert_line_stops),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# =====================================================
+# ROUTE SUMMARIES (materialised per pair)
+# =====================================================
+# Ties on distance go to the first path name, the same row idxmin() picked
+# from the name-ordered route table.
+SUMMARY_SELECT_SQL = """
+    SELECT r.station_id, r.start_location_id, r.end_location_id,
+           COUNT(*),
+           (SELECT p.route_id FROM route_paths p
+            WHERE p.station_id = r.station_id
+              AND p.start_location_id = r.start_location_id
+              AND p.end_location_id = r.end_location_id
+            ORDER BY p.base_distance, p.path_name
+            LIMIT 1),
+           MIN(r.base_distance), MAX(r.base_distance),
+           MIN(r.base_time), MAX(r.base_time)
+    FROM route_paths r
+"""
+SUMMARY_GROUP_SQL = " GROUP BY r.station_id, r.start_location_id, r.end_location_id;"
+
+
+def refresh_pair_sql(station, start, end):
+    # trigger-body statements re-summarising one pair, given SQL expressions
+    # for its station and location names
+    station_id = f"(SELECT station_id FROM station_index WHERE station_name = {station})"
+    start_id = (f"(SELECT location_id FROM station_locations "
+                f"WHERE station_name = {station} AND location_name = {start})")
+    end_id = (f"(SELECT location_id FROM station_locations "
+              f"WHERE station_name = {station} AND location_name = {end})")
+    return f"""DELETE FROM route_summaries
+            WHERE station_id = {station_id}
+              AND start_location_id = {start_id}
+              AND end_location_id = {end_id};
+            INSERT INTO route_summaries {SUMMARY_SELECT_SQL.strip()}
+            WHERE r.station_id = {station_id}
+              AND r.start_location_id = {start_id}
+              AND r.end_location_id = {end_id}
+            {SUMMARY_GROUP_SQL.strip()}"""
+
+
+def refresh_route_summaries(cur, station_ids=None):
+    # all stations, or only the given ones (generate_routes.py, per rewritten station)
+    if station_ids is None:
+        cur.execute("DELETE FROM route_summaries;")
+        cur.execute("INSERT INTO route_summaries " + SUMMARY_SELECT_SQL + SUMMARY_GROUP_SQL)
+        return
+    for station_id in station_ids:
+        cur.execute("DELETE FROM route_summaries WHERE station_id = ?;", (station_id,))
+        cur.execute("INSERT INTO route_summaries " + SUMMARY_SELECT_SQL
+                    + " WHERE r.station_id = ?" + SUMMARY_GROUP_SQL, (station_id,))
+
+
+# =====================================================
+# COMPATIBILITY VIEWS
+# =====================================================
+def create_compat_views(cur):
+    # generate_routes.py and older tooling still read/write a text-keyed
+    # "routes" table; serve it as a view that maps names <-> integer keys
+    run_script(cur, f"""
+        CREATE VIEW routes AS
+        SELECT r.route_id,
+               s.station_name,
+               a.location_name AS start_location,
+               b.location_name AS end_location,
+               r.path_name,
+               r.base_distance,
+               r.base_time
+        FROM route_paths r
+        JOIN station_index s     ON s.station_id = r.station_id
+        JOIN station_locations a ON a.location_id = r.start_location_id
+        JOIN station_locations b ON b.location_id = r.end_location_id;
+
+        CREATE TRIGGER routes_insert INSTEAD OF INSERT ON routes
+        BEGIN
+            SELECT RAISE(ABORT, 'routes: unknown station or location')
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM station_index s
+                JOIN station_locations a ON a.station_id = s.station_id
+                JOIN station_locations b ON b.station_id = s.station_id
+                WHERE s.station_name = TRIM(NEW.station_name, {WHITESPACE})
+                  AND a.location_name = TRIM(NEW.start_location, {WHITESPACE})
+                  AND b.location_name = TRIM(NEW.end_location, {WHITESPACE})
+            );
+            INSERT INTO route_paths
+                (route_id, station_id, start_location_id, end_location_id,
+                 path_name, base_distance, base_time)
+            SELECT NEW.route_id, s.station_id, a.location_id, b.location_id,
+                   NEW.path_name, NEW.base_distance, NEW.base_time
+            FROM station_index s
+            JOIN station_locations a ON a.station_id = s.station_id
+            JOIN station_locations b ON b.station_id = s.station_id
+            WHERE s.station_name = TRIM(NEW.station_name, {WHITESPACE})
+              AND a.location_name = TRIM(NEW.start_location, {WHITESPACE})
+              AND b.location_name = TRIM(NEW.end_location, {WHITESPACE});
+        END;
+
+        CREATE TRIGGER routes_update INSTEAD OF UPDATE ON routes
+        BEGIN
+            UPDATE route_paths
+            SET path_name = NEW.path_name,
+                base_distance = NEW.base_distance,
+                base_time = NEW.base_time
+            WHERE route_id = OLD.route_id;
+        END;
+
+        CREATE TRIGGER routes_delete INSTEAD OF DELETE ON routes
+        BEGIN
+            DELETE FROM route_paths WHERE route_id = OLD.route_id;
+        END;
+
+        -- rows added by older tooling arrive untrimmed and without integer keys
+        CREATE TRIGGER stations_keys AFTER INSERT ON stations
+        BEGIN
+            UPDATE stations SET
+                station_name = TRIM(NEW.station_name, {WHITESPACE}),
+                line_name    = TRIM(NEW.line_name, {WHITESPACE}),
+                station_size = TRIM(NEW.station_size, {WHITESPACE})
+            WHERE station_id = NEW.station_id;
+            INSERT OR IGNORE INTO station_index (station_name, station_size)
+            VALUES (TRIM(NEW.station_name, {WHITESPACE}), TRIM(NEW.station_size, {WHITESPACE}));
+        END;
+
+        CREATE TRIGGER station_locations_keys AFTER INSERT ON station_locations
+        WHEN NEW.station_id IS NULL
+        BEGIN
+            INSERT OR IGNORE INTO station_index (station_name, station_size)
+            VALUES (TRIM(NEW.station_name, {WHITESPACE}), 'small');
+            UPDATE station_locations SET
+                station_name  = TRIM(NEW.station_name, {WHITESPACE}),
+                location_name = TRIM(NEW.location_name, {WHITESPACE}),
+                station_id    = (SELECT station_id FROM station_index
+                                 WHERE station_name = TRIM(NEW.station_name, {WHITESPACE}))
+            WHERE location_id = NEW.location_id;
+        END;
+    """)
+
+
+# =====================================================
+# RUNNER
+# =====================================================
+def current_version(conn):
+    return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def migrate(db_path=DB_PATH, target=LATEST_VERSION, verbose=False):
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        version = current_version(conn)
+        if target >= version:
+            steps = [(number, name, apply, number)
+                     for number, name, apply, _ in MIGRATIONS
+                     if version < number <= target]
+        else:
+            steps = [(number, name, revert, number - 1)
+                     for number, name, _, revert in reversed(MIGRATIONS)
+                     if target < number <= version]
+        for number, name, step, result in steps:
+            cur = conn.cursor()
+            cur.execute("BEGIN IMMEDIATE;")
+            try:
+                # re-check under the write lock: another process may have won
+                if current_version(conn) != (number - 1 if result == number else number):
+                    cur.execute("COMMIT;")
+                    continue
+                step(cur)
+                cur.execute(f"PRAGMA user_version = {result};")
+                cur.execute("COMMIT;")
+            except Exception:
+                if conn.in_transaction:
+                    cur.execute("ROLLBACK;")
+                raise
+            if verbose:
+                verb = "Applied" if result == number else "Reverted"
+                print(f"{verb} migration {number}: {name}")
+        return current_version(conn)
+    finally:
+        conn.close()
+
+
+def ensure_current(db_path=DB_PATH):
+    # cheap on every start-up: a single PRAGMA read when nothing is pending
+    conn = sqlite3.connect(db_path)
+    try:
+        version = current_version(conn)
+    finally:
+        conn.close()
+    if version < LATEST_VERSION:
+        version = migrate(db_path)
+    return version
+
+
+# =====================================================
+# QUERY PLAN CHECKS
+# =====================================================
+def explain(conn, sql, params=()):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def full_scans(plan):
+    # "SCAN t" reads the whole table; "SCAN t USING COVERING INDEX i" only
+    # walks an index (used for the DISTINCT line list) and is acceptable
+    return [
+        step for step in plan
+        if step.startswith("SCAN") and "USING" not in step
+        or "TEMP B-TREE" in step
+    ]
+
+
+def check_query_plans(db_path=DB_PATH, verbose=False):
+    conn = sqlite3.connect(db_path)
+    problems = []
+    try:
+        for name, (sql, params) in HOT_QUERIES.items():
+            plan = explain(conn, sql, params)
+            if verbose:
+                print(f"{name}:")
+                for step in plan:
+                    print(f"    {step}")
+            for step in full_scans(plan):
+                problems.append(f"{name}: {step}")
+    finally:
+        conn.close()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate metro_footpath.db to the latest schema.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--target", type=int, default=LATEST_VERSION)
+    parser.add_argument("--check", action="store_true",
+                        help="only verify that hot queries use index searches")
+    args = parser.parse_args()
+
+    if not args.check:
+        version = migrate(args.db, args.target, verbose=True)
+        print(f"✅ {args.db} is at schema version {version}.")
+        if version < LATEST_VERSION:
+            return
+
+    problems = check_query_plans(args.db, verbose=True)
+    if problems:
+        print("❌ Hot queries not served by an index:")
+        for problem in problems:
+            print(f"    {problem}")
+        sys.exit(1)
+    print("✅ Every hot query is an index search.")
+
+
+if __name__ == "__main__":
+    main()
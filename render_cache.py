@@ -0,0 +1,72 @@
+import io
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+
+import metrics
+
+# =====================================================
+# CONFIG
+# =====================================================
+MAX_ENTRIES = 256                 # rendered images kept before LRU eviction
+MAX_BYTES = 64 * 1024 * 1024      # ...or until they take this much memory
+SAVEFIG_KWARGS = {"bbox_inches": "tight", "dpi": 200}   # same as st.pyplot
+
+
+# =====================================================
+# RENDERED FIGURE CACHE (PNG/SVG bytes, LRU)
+# =====================================================
+# Figures are rasterised once per key and closed straight away, so pyplot
+# never accumulates open figures across autorefresh reruns; every session
+# then reuses the same bytes.
+class RenderCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.renders = 0
+
+    def get_or_render(self, key, draw_fn, fmt="png"):
+        key = (fmt,) + tuple(key)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                metrics.inc("render_cache_hits_total", chart=key[1])
+                return image
+        metrics.inc("render_cache_misses_total", chart=key[1])
+        with metrics.timer("chart_render_seconds", chart=key[1]):
+            image = figure_bytes(draw_fn(), fmt)
+        with self._lock:
+            self.renders += 1
+            if key not in self._images:
+                self._images[key] = image
+                self._bytes += len(image)
+            self._images.move_to_end(key)
+            while self._images and (len(self._images) > self.max_entries
+                                    or self._bytes > self.max_bytes):
+                _, evicted = self._images.popitem(last=False)
+                self._bytes -= len(evicted)
+        return image
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._images)
+
+
+def figure_bytes(fig, fmt="png"):
+    buf = io.BytesIO()
+    try:
+        fig.savefig(buf, format=fmt, **SAVEFIG_KWARGS)
+    finally:
+        plt.close(fig)
+    return buf.getvalue()
@@ -0,0 +1,289 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from footpath_db import DB_PATH
+
+# =====================================================
+# CONFIG
+# =====================================================
+MAGIC = b"FPROUTE1"
+ALIGN = 64          # every array starts on a cache-line boundary in the snapshot
+FORMAT_VERSION = 1
+
+
+def snapshot_path(db_path):
+    # metro_footpath.db -> metro_footpath.routes
+    return os.path.splitext(os.path.abspath(db_path))[0] + ".routes"
+
+
+# =====================================================
+# SOURCE FINGERPRINT (is a snapshot still current?)
+# =====================================================
+# data_generation (migration 7) is bumped by triggers on every insert,
+# update or delete of the source tables, so in-place edits count too; the
+# cheap aggregates still cover databases written without the triggers
+FINGERPRINT_SQL = """
+    SELECT
+        (SELECT COUNT(*) || ':' || IFNULL(MAX(route_id), 0) FROM route_paths),
+        (SELECT COUNT(*) || ':' || TOTAL(length(station_name)) FROM station_index),
+        (SELECT COUNT(*) || ':' || IFNULL(MAX(location_id), 0) FROM station_locations);
+"""
+GENERATION_SQL = "SELECT generation FROM data_generation WHERE id = 0;"
+
+ROUTE_ROWS_SQL = """
+    SELECT s.station_name, a.location_name, b.location_name,
+           r.path_name, r.base_distance, r.base_time
+    FROM route_paths r
+    JOIN station_index s ON s.station_id = r.station_id
+    JOIN station_locations a ON a.location_id = r.start_location_id
+    JOIN station_locations b ON b.location_id = r.end_location_id
+    ORDER BY r.station_id, r.start_location_id, r.end_location_id, r.path_name;
+"""
+
+
+def fingerprint(conn):
+    user_version = conn.execute("PRAGMA user_version;").fetchone()[0]
+    parts = conn.execute(FINGERPRINT_SQL).fetchone()
+    try:
+        generation = conn.execute(GENERATION_SQL).fetchone()[0]
+    except sqlite3.OperationalError:
+        generation = None       # not migrated yet
+    payload = json.dumps([FORMAT_VERSION, user_version, generation, *parts])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+# =====================================================
+# ROUTE STORE (interned strings, integer codes, flat arrays)
+# =====================================================
+# Routes are sorted by (station, start, end), so every pair owns one
+# contiguous [lo, hi) range of the route arrays:
+#   station i       -> pairs   station_pairs[i] : station_pairs[i + 1]
+#   pair j          -> routes  pair_routes[j]   : pair_routes[j + 1]
+# Every name is stored once in the string table and referenced by code.
+class RouteStore:
+    ARRAYS = ("string_offsets", "string_blob", "station_name", "station_pairs",
+              "pair_start", "pair_end", "pair_routes",
+              "route_path", "route_distance", "route_time")
+
+    def __init__(self, arrays, fingerprint, buffer=None):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.fingerprint = fingerprint
+        self._buffer = buffer           # keeps the mmap alive while views exist
+        offsets = self.string_offsets.tolist()
+        blob = self.string_blob.tobytes()
+        self.strings = [blob[offsets[i]:offsets[i + 1]].decode("utf-8")
+                        for i in range(len(offsets) - 1)]
+        self.codes = {s: i for i, s in enumerate(self.strings)}
+        self.stations = {self.strings[code]: i for i, code in enumerate(self.station_name.tolist())}
+        self._pairs = {}                # station index -> {(start, end): pair index}, built lazily
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.route_path)
+
+    @property
+    def num_pairs(self):
+        return len(self.pair_start)
+
+    # ---------------- lookups ----------------
+    def _station_pairs(self, station):
+        pairs = self._pairs.get(station)
+        if pairs is None:
+            lo, hi = int(self.station_pairs[station]), int(self.station_pairs[station + 1])
+            pairs = {
+                (start, end): lo + k
+                for k, (start, end) in enumerate(zip(self.pair_start[lo:hi].tolist(),
+                                                     self.pair_end[lo:hi].tolist()))
+            }
+            with self._lock:
+                self._pairs[station] = pairs
+        return pairs
+
+    def route_range(self, station_name, start_location, end_location):
+        # [lo, hi) into the route arrays, or None for an unknown pair
+        station = self.stations.get(station_name)
+        start = self.codes.get(start_location)
+        end = self.codes.get(end_location)
+        if station is None or start is None or end is None:
+            return None
+        pair = self._station_pairs(station).get((start, end))
+        if pair is None:
+            return None
+        return int(self.pair_routes[pair]), int(self.pair_routes[pair + 1])
+
+    def routes(self, station_name, start_location, end_location):
+        # zero-copy views: (path codes, distances, times)
+        bounds = self.route_range(station_name, start_location, end_location)
+        if bounds is None:
+            return None
+        lo, hi = bounds
+        return self.route_path[lo:hi], self.route_distance[lo:hi], self.route_time[lo:hi]
+
+    def route_frame(self, station_name, start_location, end_location):
+        # same columns as footpath_db.ROUTES_SQL
+        views = self.routes(station_name, start_location, end_location)
+        if views is None:
+            return None
+        paths, distances, times = views
+        strings = self.strings
+        return pd.DataFrame({
+            "Path": [strings[code] for code in paths.tolist()],
+            "Base Distance (m)": distances,
+            "Base Time (mins)": times,
+        })
+
+    # ---------------- build / save / load ----------------
+    @classmethod
+    def build(cls, conn):
+        fp = fingerprint(conn)
+        rows = conn.execute(ROUTE_ROWS_SQL).fetchall()
+        strings, codes = [], {}
+
+        def intern(value):
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(strings)
+                strings.append(value)
+            return code
+
+        station_name, station_pairs = [], []
+        pair_start, pair_end, pair_routes = [], [], []
+        route_path = np.empty(len(rows), dtype=np.int32)
+        route_distance = np.empty(len(rows), dtype=np.int32)
+        route_time = np.empty(len(rows), dtype=np.int32)
+        last_station = last_pair = None
+        for i, (station, start, end, path, distance, minutes) in enumerate(rows):
+            if station != last_station:
+                station_name.append(intern(station))
+                station_pairs.append(len(pair_start))
+                last_station, last_pair = station, None
+            if (start, end) != last_pair:
+                pair_start.append(intern(start))
+                pair_end.append(intern(end))
+                pair_routes.append(i)
+                last_pair = (start, end)
+            route_path[i] = intern(path)
+            route_distance[i] = distance
+            route_time[i] = minutes
+        station_pairs.append(len(pair_start))
+        pair_routes.append(len(rows))
+
+        encoded = [s.encode("utf-8") for s in strings]
+        string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=string_offsets[1:])
+        arrays = {
+            "string_offsets": string_offsets,
+            "string_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "station_name": np.array(station_name, dtype=np.int32),
+            "station_pairs": np.array(station_pairs, dtype=np.int64),
+            "pair_start": np.array(pair_start, dtype=np.int32),
+            "pair_end": np.array(pair_end, dtype=np.int32),
+            "pair_routes": np.array(pair_routes, dtype=np.int64),
+            "route_path": route_path,
+            "route_distance": route_distance,
+            "route_time": route_time,
+        }
+        return cls(arrays, fp)
+
+    def save(self, path):
+        # header (magic, length, JSON layout) then 64-byte aligned raw arrays;
+        # written to a temp file and renamed so readers never see half a file
+        layout, offset = {}, 0
+        for name in self.ARRAYS:
+            array = np.ascontiguousarray(getattr(self, name))
+            layout[name] = [array.dtype.str, len(array), offset]
+            offset += -(-array.nbytes // ALIGN) * ALIGN
+        header = json.dumps({"format": FORMAT_VERSION, "fingerprint": self.fingerprint,
+                             "arrays": layout}).encode("utf-8")
+        data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC + len(header).to_bytes(8, "little") + header)
+            for name in self.ARRAYS:
+                array = np.ascontiguousarray(getattr(self, name))
+                f.seek(data_start + layout[name][2])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        # arrays are read-only views over one shared mapping of the file, so
+        # every worker process uses the same page-cache copy
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if buffer[:len(MAGIC)] != MAGIC:
+            buffer.close()
+            raise ValueError(f"{path} is not a route store snapshot")
+        header_len = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 8], "little")
+        header = json.loads(buffer[len(MAGIC) + 8:len(MAGIC) + 8 + header_len])
+        if header["format"] != FORMAT_VERSION:
+            buffer.close()
+            raise ValueError(f"{path} has snapshot format {header['format']}")
+        data_start = -(-(len(MAGIC) + 8 + header_len) // ALIGN) * ALIGN
+        arrays = {
+            name: np.frombuffer(buffer, dtype=np.dtype(dtype), count=count,
+                                offset=data_start + offset)
+            for name, (dtype, count, offset) in header["arrays"].items()
+        }
+        return cls(arrays, header["fingerprint"], buffer)
+
+
+def open_store(db_path=DB_PATH, path=None, rebuild=True):
+    # load the snapshot if it matches the database, else rebuild and save it;
+    # None if there is nothing to load and rebuild is False
+    path = path or snapshot_path(db_path)
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    try:
+        current = fingerprint(conn)
+        if os.path.exists(path):
+            try:
+                store = RouteStore.load(path)
+                if store.fingerprint == current:
+                    return store
+            except (ValueError, KeyError, OSError):
+                pass        # unreadable or old format: rebuild below
+        if not rebuild:
+            return None
+        store = RouteStore.build(conn)
+    finally:
+        conn.close()
+    try:
+        store.save(path)
+    except OSError:
+        pass                # read-only checkout: keep the in-memory store
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the memory-mapped route store snapshot.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    path = args.out or snapshot_path(args.db)
+    t0 = time.perf_counter()
+    conn = sqlite3.connect(f"file:{os.path.abspath(args.db)}?mode=ro", uri=True)
+    store = RouteStore.build(conn)
+    conn.close()
+    store.save(path)
+    t1 = time.perf_counter()
+    RouteStore.load(path)
+    t2 = time.perf_counter()
+    print(f"✅ {len(store)} routes, {store.num_pairs} pairs, {len(store.strings)} strings "
+          f"-> {path} ({os.path.getsize(path) / 1024:.0f} KB); "
+          f"built in {t1 - t0:.2f} s, loads in {(t2 - t1) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
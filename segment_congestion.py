@@ -0,0 +1,330 @@
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from assignment_engine import STATE_DB_PATH
+from crowd_counters import HALF_LIFE_SECS, cold_cutoff, decayed
+
+# =====================================================
+# CONFIG
+# =====================================================
+SYNC_EVERY_SECS = 1.0       # pick up other processes' segment loads at most this often
+SYNC_SLACK_SECS = 5.0       # re-read rows this far behind the watermark (clock skew, late commits)
+MAX_STATIONS = 256          # station indexes kept in memory before LRU eviction
+REBASE_HALF_LIVES = 32      # renormalise scaled loads before the exponent gets large
+PRUNE_EVERY = 1000          # segment writes between sweeps of decayed-away rows
+
+
+# =====================================================
+# SEGMENT INDEX (one station: routes -> shared walkway segments)
+# =====================================================
+# A route's congestion is the time-weighted mean load of the segments it
+# walks, so two routes through the same concourse slow down together:
+#     load(route) = sum(minutes_e * load_e for e in route) / sum(minutes_e)
+# Loads are kept "scaled" to a fixed epoch, load_e = scale(now) * scaled_e,
+# so the decay of every segment is one shared factor and only an assignment
+# changes a segment. weighted[row] caches sum(minutes_e * scaled_e) per
+# route, and routes_of (the inverted index) says which rows to touch when a
+# segment changes – an update costs O(routes through the changed segments).
+class SegmentIndex:
+    def __init__(self, graph):
+        self.graph = graph
+        self.row_of = {}            # (start, end, path_name) -> row
+        self.pair_rows = {}         # (start, end) -> rows of that pair, in route order
+        self.path_names = []        # row -> path name
+        self.route_edges = []       # row -> edge ids
+        self.free = []              # row -> free-flow minutes
+        self.weighted = np.zeros(64)   # row -> sum(minutes_e * scaled_e), grown by doubling
+        self.routes_of = {}         # edge id -> rows walking it
+        self._rows = {}             # edge id -> routes_of[edge] as an index array
+        self.scaled = {}            # edge id -> scaled load
+
+    def add_routes(self, start_location, end_location, routes):
+        # routes: station_graph.Route list for one pair (registered once)
+        rows = self.pair_rows.setdefault((start_location, end_location), [])
+        for route in routes:
+            key = (start_location, end_location, route.path_name)
+            if key in self.row_of:
+                continue
+            row = len(self.route_edges)
+            minutes = [self.graph.edges[e].minutes for e in route.edges]
+            self.row_of[key] = row
+            rows.append(row)
+            self.path_names.append(route.path_name)
+            self.route_edges.append(route.edges)
+            self.free.append(sum(minutes) or 1.0)
+            if row == len(self.weighted):
+                self.weighted = np.concatenate([self.weighted, np.zeros(row)])
+            self.weighted[row] = sum(m * self.scaled.get(e, 0.0)
+                                     for e, m in zip(route.edges, minutes))
+            for e in route.edges:
+                self.routes_of.setdefault(e, []).append(row)
+                self._rows.pop(e, None)
+
+    def set_load(self, edge_id, scaled):
+        # returns how many routes had to be touched
+        delta = scaled - self.scaled.get(edge_id, 0.0)
+        if not delta:
+            return 0
+        self.scaled[edge_id] = scaled
+        rows = self._rows.get(edge_id)
+        if rows is None:
+            rows = self._rows[edge_id] = np.array(self.routes_of.get(edge_id, ()), dtype=np.int64)
+        if len(rows) and edge_id in self.graph.edges:
+            self.weighted[rows] += self.graph.edges[edge_id].minutes * delta
+        return len(rows)
+
+    def add_load(self, edges, amount):
+        touched = 0
+        for e in edges:
+            touched += self.set_load(e, self.scaled.get(e, 0.0) + amount)
+        return touched
+
+    def route_load(self, row, scale):
+        return float(scale * self.weighted[row] / self.free[row])
+
+    def rescale(self, factor):
+        for e in self.scaled:
+            self.scaled[e] *= factor
+        self.recompute()
+
+    def recompute(self):
+        # full pass over every route – only after a rescale (and as the
+        # benchmark's baseline); also clears accumulated rounding
+        edges = self.graph.edges
+        for row, route_edges in enumerate(self.route_edges):
+            self.weighted[row] = sum(edges[e].minutes * self.scaled.get(e, 0.0)
+                                     for e in route_edges)
+
+    def overlap(self, rows):
+        # share[p, q]: fraction of route q's walk spent on segments of route p,
+        # i.e. how much one assignment to p raises q's load (1 on the diagonal)
+        share = np.eye(len(rows))
+        edges = self.graph.edges
+        for p, row_p in enumerate(rows):
+            if row_p is None:
+                continue
+            on_p = set(self.route_edges[row_p])
+            for q, row_q in enumerate(rows):
+                if q != p and row_q is not None:
+                    shared = sum(edges[e].minutes for e in self.route_edges[row_q] if e in on_p)
+                    share[p, q] = shared / self.free[row_q]
+        return share
+
+
+# =====================================================
+# SHARED SEGMENT CONGESTION (drop-in for AssignmentEngine.loads / record)
+# =====================================================
+# Segment loads live in the shared WAL state DB next to path_assignments,
+# decayed with the same half-life; each process keeps SegmentIndexes for the
+# stations it serves and applies other processes' changes incrementally.
+# Path counts still go to the AssignmentEngine, which also answers for
+# stations (or paths) without a walkway graph.
+class SegmentCongestion:
+    UPSERT_SQL = """
+        INSERT INTO segment_loads (station_name, edge_id, live_load, updated_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (station_name, edge_id)
+        DO UPDATE SET
+            live_load = decayed(live_load, updated_at, excluded.updated_at) + excluded.live_load,
+            updated_at = MAX(updated_at, excluded.updated_at);
+    """
+
+    def __init__(self, route_engine, assignments, db_path=STATE_DB_PATH,
+                 half_life=HALF_LIFE_SECS, clock=time.time):
+        self.route_engine = route_engine
+        self.assignments = assignments
+        self.half_life = half_life
+        self.clock = clock
+        self._lock = threading.Lock()          # indexes and the read connection
+        self._write_lock = threading.Lock()    # the write connection; never held with _lock
+        self._stations = OrderedDict()  # station -> SegmentIndex, or False without a graph
+        self._version = None
+        self._epoch = clock()
+        self._watermark = self._epoch
+        self._last_sync = self._epoch
+        self._writes = 0
+        self.conn = self._connect(db_path)
+        # writes go through their own connection, so waiting for the database
+        # write lock never blocks loads() and reads never see uncommitted rows
+        self.writer = self._connect(db_path)
+        self.conn.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS segment_loads (
+                station_name TEXT    NOT NULL,
+                edge_id      INTEGER NOT NULL,
+                live_load    REAL    NOT NULL,
+                updated_at   REAL    NOT NULL,
+                PRIMARY KEY (station_name, edge_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_segment_loads_age ON segment_loads (updated_at);
+        """)
+
+    def _connect(self, db_path):
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None,
+                               check_same_thread=False)
+        conn.create_function(
+            "decayed", 3,
+            lambda value, updated_at, now: decayed(value, updated_at, now, self.half_life),
+            deterministic=True
+        )
+        conn.execute("PRAGMA synchronous = NORMAL;")
+        return conn
+
+    # ---------------- scaled loads ----------------
+    def _scaled(self, live_load, updated_at):
+        return live_load * 2.0 ** ((updated_at - self._epoch) / self.half_life)
+
+    def _scale(self, now):
+        return 0.5 ** ((now - self._epoch) / self.half_life)
+
+    def _rebase(self, now):
+        if (now - self._epoch) / self.half_life < REBASE_HALF_LIVES:
+            return
+        factor = self._scale(now)
+        for index in self._stations.values():
+            if index:
+                index.rescale(factor)
+        self._epoch = now
+
+    # ---------------- per-station indexes ----------------
+    def _index(self, station_name):
+        version = self.route_engine.db.check_for_changes()
+        if version != self._version:
+            self._stations.clear()      # walkway graphs may have been rebuilt
+            self._version = version
+        index = self._stations.get(station_name)
+        if index is None:
+            graph = self.route_engine.graph(station_name)
+            index = SegmentIndex(graph) if graph is not None else False
+            if index:
+                for edge_id, live_load, updated_at in self.conn.execute(
+                        "SELECT edge_id, live_load, updated_at FROM segment_loads "
+                        "WHERE station_name = ?;", (station_name,)):
+                    index.scaled[edge_id] = self._scaled(live_load, updated_at)
+            self._stations[station_name] = index
+            while len(self._stations) > MAX_STATIONS:
+                self._stations.popitem(last=False)
+        self._stations.move_to_end(station_name)
+        return index
+
+    def _pair_rows(self, station_name, start_location, end_location):
+        # (index, rows) with the pair's routes registered on first use
+        index = self._index(station_name)
+        if not index:
+            return None, []
+        rows = index.pair_rows.get((start_location, end_location))
+        if rows is None:
+            # the paths are the ones the dashboard and API list (route_table),
+            # so loads() keys join on path name; each is walked along the
+            # graph route of the same name, the rest stay with the AssignmentEngine
+            table = self.route_engine.route_table(station_name, start_location, end_location)
+            graph_routes = {r.path_name: r for r in
+                            self.route_engine.routes(station_name, start_location, end_location) or []}
+            paths = [] if table is None else table["Path"]
+            index.add_routes(start_location, end_location,
+                             [graph_routes[p] for p in paths if p in graph_routes])
+            rows = index.pair_rows[(start_location, end_location)]
+        return index, rows
+
+    # ---------------- cross-process updates ----------------
+    def sync(self, now=None, force=False):
+        # fold in segment loads written by other processes since the last sync
+        now = self.clock() if now is None else now
+        if not force and now - self._last_sync < SYNC_EVERY_SECS:
+            return 0
+        with self._lock:
+            self._last_sync = now
+            self._rebase(now)
+            rows = self.conn.execute(
+                "SELECT station_name, edge_id, live_load, updated_at FROM segment_loads "
+                "WHERE updated_at >= ?;", (self._watermark - SYNC_SLACK_SECS,)
+            ).fetchall()
+            touched = 0
+            for station_name, edge_id, live_load, updated_at in rows:
+                index = self._stations.get(station_name)
+                if index:
+                    touched += index.set_load(edge_id, self._scaled(live_load, updated_at))
+                self._watermark = max(self._watermark, updated_at)
+            return touched
+
+    # ---------------- AssignmentEngine interface ----------------
+    def loads(self, station_name, start_location, end_location, now=None):
+        now = self.clock() if now is None else now
+        self.sync(now)
+        loads = self.assignments.loads(station_name, start_location, end_location, now)
+        with self._lock:
+            index, rows = self._pair_rows(station_name, start_location, end_location)
+            if index:
+                # paths the walkway graph knows: load of the segments they walk
+                scale = self._scale(now)
+                for row in rows:
+                    loads[index.path_names[row]] = index.route_load(row, scale)
+        return loads
+
+    def overlap(self, station_name, start_location, end_location, paths):
+        with self._lock:
+            index, _ = self._pair_rows(station_name, start_location, end_location)
+            if not index:
+                return np.eye(len(paths))
+            return index.overlap([index.row_of.get((start_location, end_location, p))
+                                  for p in paths])
+
+    def record(self, station_name, start_location, end_location, path_name, now=None):
+        return self.record_many([(station_name, start_location, end_location, path_name)], now)
+
+    def record_many(self, keys, now=None):
+        # path counts as before, plus +1 on every segment of each chosen route
+        # (one transaction), then the affected routes are patched in memory
+        keys = [tuple(key) for key in keys]
+        if not keys:
+            return 0
+        self.assignments.record_many(keys, now)
+        with self._lock:
+            counts = Counter()
+            for station_name, start_location, end_location, path_name in keys:
+                index, _ = self._pair_rows(station_name, start_location, end_location)
+                row = index.row_of.get((start_location, end_location, path_name)) if index else None
+                if row is not None:
+                    for edge_id in index.route_edges[row]:
+                        counts[(station_name, edge_id)] += 1
+        if not counts:
+            return len(keys)
+        with self._write_lock:
+            self.writer.execute("BEGIN IMMEDIATE;")
+            try:
+                # stamped once the write lock is ours, so the rows commit
+                # within moments of updated_at and other processes' sync()
+                # watermarks cannot have moved past them
+                now = self.clock() if now is None else now
+                self.writer.executemany(self.UPSERT_SQL, [
+                    (station_name, edge_id, float(n), now)
+                    for (station_name, edge_id), n in counts.items()
+                ])
+                self.writer.execute("COMMIT;")
+            except Exception:
+                self.writer.execute("ROLLBACK;")
+                raise
+            self._writes += len(counts)
+            prune = self._writes >= PRUNE_EVERY
+            if prune:
+                self._writes = 0
+                # untouched for COLD_AFTER_HALF_LIVES: a range delete on
+                # idx_segment_loads_age instead of decaying every row
+                self.writer.execute(
+                    "DELETE FROM segment_loads WHERE updated_at < ?;",
+                    (cold_cutoff(now, self.half_life),))
+        with self._lock:
+            unit = self._scaled(1.0, now)
+            for (station_name, edge_id), n in counts.items():
+                index = self._stations.get(station_name)
+                if index:
+                    index.set_load(edge_id, index.scaled.get(edge_id, 0.0) + n * unit)
+        return len(keys)
+
+    def close(self):
+        self.conn.close()
+        self.writer.close()
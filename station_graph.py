@@ -0,0 +1,412 @@
+import argparse
+import heapq
+import random
+import threading
+from collections import namedtuple
+
+import pandas as pd
+
+import footpath_db
+import route_store
+from footpath_db import DB_PATH, QueryCache
+
+# =====================================================
+# CONFIG
+# =====================================================
+# walking speed per segment type in metres per minute, plus a fixed delay for
+# queuing at the segment (ticket gates, stepping onto an escalator)
+SEGMENT_SPEED = {
+    "corridor": (70, 0.0),
+    "gate": (60, 0.3),
+    "stairs": (35, 0.0),
+    "escalator": (45, 0.2),
+}
+SIZE_SCALE = {"big": 1.6, "medium": 1.2, "small": 0.8}
+ROUTE_CACHE_SIZE = 4096
+GRAPH_CACHE_SIZE = 256
+
+Edge = namedtuple("Edge", "edge_id from_node to_node kind length_m minutes")
+Route = namedtuple("Route", "path_name distance minutes edges nodes")
+
+
+def segment_minutes(kind, length_m):
+    speed, delay = SEGMENT_SPEED[kind]
+    return length_m / speed + delay
+
+
+def route_count(start_location, end_location):
+    # more choices for Entry → Platform, like the precomputed routes table had
+    if "Entry" in start_location and "Platform" in end_location:
+        return 4
+    return 2
+
+
+def short_name(location_name):
+    return location_name.split('-')[0].strip()
+
+
+# =====================================================
+# STATION GRAPH
+# =====================================================
+class StationGraph:
+    def __init__(self, station_name, nodes, edges):
+        # nodes: node_id -> (node_name, node_kind); edges: list of Edge
+        self.station_name = station_name
+        self.nodes = nodes
+        self.edges = {edge.edge_id: edge for edge in edges}
+        self.node_by_name = {name: node_id for node_id, (name, _) in nodes.items()}
+        self.adjacency = {node_id: [] for node_id in nodes}
+        # fixed edge order keeps tie-breaking identical whether the graph was
+        # loaded from the database or built in memory by generate_routes.py
+        for edge in sorted(edges, key=lambda e: e.edge_id):
+            self.adjacency[edge.from_node].append((edge.to_node, edge.edge_id, edge.minutes))
+            self.adjacency[edge.to_node].append((edge.from_node, edge.edge_id, edge.minutes))
+
+    def is_terminal(self, node_id):
+        # entrances, exits and platforms end a walk – never route *through* them
+        return self.nodes[node_id][1] in ("street", "platform")
+
+    def shortest_path(self, source, target, banned_edges=(), banned_nodes=()):
+        # plain Dijkstra over segment minutes; returns (minutes, nodes, edges)
+        dist = {source: 0.0}
+        prev = {}
+        heap = [(0.0, source)]
+        while heap:
+            d, node = heapq.heappop(heap)
+            if node == target:
+                break
+            if d > dist[node]:
+                continue
+            if node != source and self.is_terminal(node):
+                continue
+            for nxt, edge_id, minutes in self.adjacency[node]:
+                if edge_id in banned_edges or nxt in banned_nodes:
+                    continue
+                nd = d + minutes
+                if nd < dist.get(nxt, float("inf")):
+                    dist[nxt] = nd
+                    prev[nxt] = (node, edge_id)
+                    heapq.heappush(heap, (nd, nxt))
+        if target not in dist:
+            return None
+        nodes, edges = [target], []
+        while nodes[-1] != source:
+            node, edge_id = prev[nodes[-1]]
+            nodes.append(node)
+            edges.append(edge_id)
+        nodes.reverse()
+        edges.reverse()
+        return dist[target], nodes, edges
+
+    def k_shortest_paths(self, source, target, k):
+        # Yen's algorithm; paths are edge sequences so parallel stairs and
+        # escalators between the same two levels count as distinct routes
+        first = self.shortest_path(source, target)
+        if first is None:
+            return []
+        found = [first]
+        candidates = []
+        seen = {tuple(first[2])}
+        while len(found) < k:
+            _, last_nodes, last_edges = found[-1]
+            for i in range(len(last_nodes) - 1):
+                spur_node = last_nodes[i]
+                root_nodes = last_nodes[:i + 1]
+                root_edges = last_edges[:i]
+                # same root *edges*, not just nodes: a path that reached the
+                # spur node over a parallel segment must not ban this one's spurs
+                banned_edges = {
+                    edges[i] for _, _, edges in found
+                    if len(edges) > i and edges[:i] == root_edges
+                }
+                spur = self.shortest_path(spur_node, target, banned_edges, set(root_nodes[:-1]))
+                if spur is None:
+                    continue
+                edges = root_edges + spur[2]
+                if tuple(edges) in seen:
+                    continue
+                seen.add(tuple(edges))
+                cost = sum(self.edges[e].minutes for e in edges)
+                heapq.heappush(candidates, (cost, len(edges), root_nodes[:-1] + spur[1], edges))
+            if not candidates:
+                break
+            cost, _, nodes, edges = heapq.heappop(candidates)
+            found.append((cost, nodes, edges))
+        return found
+
+    def path_minutes(self, edges, edge_crowd=None):
+        # live walking time with congestion applied per segment, so routes
+        # sharing a corridor slow down together
+        if not edge_crowd:
+            return sum(self.edges[e].minutes for e in edges)
+        return sum(
+            self.edges[e].minutes * (1 + edge_crowd.get(e, 0) / 100) for e in edges
+        )
+
+
+def plan_routes(graph, start_location, end_location):
+    source = graph.node_by_name.get(start_location)
+    target = graph.node_by_name.get(end_location)
+    if source is None or target is None or source == target:
+        return []
+    k = route_count(start_location, end_location)
+    routes = []
+    for i, (minutes, nodes, edges) in enumerate(graph.k_shortest_paths(source, target, k)):
+        routes.append(Route(
+            path_name=f"Route {i+1}: {short_name(start_location)} → {short_name(end_location)}",
+            distance=int(round(sum(graph.edges[e].length_m for e in edges))),
+            minutes=minutes,
+            edges=tuple(edges),
+            nodes=tuple(nodes),
+        ))
+    return routes
+
+
+def base_minutes(route):
+    # whole minutes, as stored in routes.base_time
+    return max(1, int(round(route.minutes)))
+
+
+# =====================================================
+# ROUTE ENGINE (on-demand Dijkstra / Yen, cached per pair)
+# =====================================================
+class RouteEngine:
+    def __init__(self, data_access, route_cache_size=ROUTE_CACHE_SIZE,
+                 graph_cache_size=GRAPH_CACHE_SIZE, use_store=True):
+        self.db = data_access
+        self._graphs = QueryCache(graph_cache_size)
+        self._routes = QueryCache(route_cache_size)
+        self._version = None
+        self._lock = threading.Lock()
+        self.use_store = use_store
+        self._store = None
+
+    def _sync(self):
+        # graphs and routes are derived from the database – drop them as soon
+        # as the data-access layer sees a change
+        version = self.db.check_for_changes()
+        with self._lock:
+            if version != self._version:
+                self._graphs.clear()
+                self._routes.clear()
+                self._store = None      # reopened (and rebuilt if stale) on next use
+                self._version = version
+
+    def store(self):
+        # memory-mapped snapshot of every materialised route (route_store.py)
+        if self._store is None and self.use_store:
+            with self._lock:
+                if self._store is None:
+                    self._store = route_store.open_store(self.db.db_path) or False
+        return self._store or None
+
+    def graph(self, station_name):
+        self._sync()
+        graph = self._graphs.get(station_name)
+        if graph is not None:
+            return graph or None
+        nodes = {
+            node_id: (name, kind)
+            for node_id, name, kind in self.db.query_rows(
+                footpath_db.GRAPH_NODES_SQL, (station_name,))
+        }
+        edges = [
+            Edge(edge_id, a, b, kind, length_m, segment_minutes(kind, length_m))
+            for edge_id, a, b, kind, length_m in self.db.query_rows(
+                footpath_db.GRAPH_EDGES_SQL, (station_name,))
+        ]
+        graph = StationGraph(station_name, nodes, edges) if nodes else False
+        self._graphs.put(station_name, graph)
+        return graph or None
+
+    def routes(self, station_name, start_location, end_location):
+        self._sync()
+        key = (station_name, start_location, end_location)
+        routes = self._routes.get(key)
+        if routes is not None:
+            return routes
+        graph = self.graph(station_name)
+        if graph is None:
+            return None
+        routes = plan_routes(graph, start_location, end_location)
+        self._routes.put(key, routes)
+        return routes
+
+    def routes_df(self, station_name, start_location, end_location):
+        # same columns as the old routes-table query; None if the station
+        # has no walkway graph yet
+        routes = self.routes(station_name, start_location, end_location)
+        if routes is None:
+            return None
+        key = ("df", station_name, start_location, end_location)
+        df = self._routes.get(key)
+        if df is None:
+            df = pd.DataFrame({
+                "Path": [r.path_name for r in routes],
+                "Base Distance (m)": [r.distance for r in routes],
+                "Base Time (mins)": [base_minutes(r) for r in routes],
+            })
+            self._routes.put(key, df)
+        return df
+
+    def route_table(self, station_name, start_location, end_location):
+        # what the dashboard, API and benchmarks show: an O(1) slice of the
+        # route store, else the graph routes, else the precomputed table
+        self._sync()
+        store = self.store()
+        if store is not None:
+            key = ("store", station_name, start_location, end_location)
+            df = self._routes.get(key)
+            if df is None:
+                df = store.route_frame(station_name, start_location, end_location)
+                if df is not None:
+                    self._routes.put(key, df)
+            if df is not None:
+                return df
+        df = self.routes_df(station_name, start_location, end_location)
+        if df is not None:
+            return df
+        return self.db.query_df(footpath_db.ROUTES_SQL,
+                                (start_location, end_location, station_name))
+
+
+# =====================================================
+# GRAPH SYNTHESIS (no surveyed layouts yet)
+# =====================================================
+def classify_location(location_name):
+    if "Platform" in location_name:
+        return "platform"
+    if "Entry" in location_name or "Exit" in location_name:
+        return "street"
+    if "Concourse" in location_name or "Interchange" in location_name:
+        return "concourse"
+    return "link"
+
+
+def synthesize_station_graph(station_name, station_size, locations):
+    # Builds a plausible walkway graph from the location names: street
+    # entrances reach the concourse through fare gate arrays, platforms hang
+    # off the concourse by stairs and escalators, and concourses are joined by
+    # corridors. Seeded by station name so rebuilding is deterministic.
+    rng = random.Random(station_name)
+    scale = SIZE_SCALE.get(station_size, 1.0)
+    nodes = []   # (node_name, node_kind, location_name or None)
+    edges = []   # (from_index, to_index, kind, length_m)
+
+    def add_node(name, kind, location=None):
+        nodes.append((name, kind, location))
+        return len(nodes) - 1
+
+    def add_edge(a, b, kind, lo, hi):
+        edges.append((a, b, kind, round(rng.uniform(lo, hi) * scale, 1)))
+
+    by_kind = {"street": [], "platform": [], "concourse": [], "link": []}
+    for location in locations:
+        kind = classify_location(location)
+        by_kind[kind].append(add_node(location, kind, location))
+
+    concourses = by_kind["concourse"] or [add_node("Concourse", "concourse")]
+    for a, b in zip(concourses, concourses[1:]):
+        add_edge(a, b, "corridor", 40, 90)
+    if len(concourses) > 2:
+        add_edge(concourses[-1], concourses[0], "corridor", 60, 120)
+
+    num_gates = 1 if station_size == "small" and len(by_kind["street"]) < 3 else 2
+    gates = [add_node(f"Fare Gates {i+1}", "gate") for i in range(num_gates)]
+    for i, gate in enumerate(gates):
+        add_edge(gate, concourses[i % len(concourses)], "corridor", 15, 35)
+    if num_gates == 1:
+        # small stations: a second, longer way round through the side passage
+        side = add_node("Side Passage", "link")
+        add_edge(side, concourses[0], "corridor", 30, 60)
+        gates.append(side)
+
+    for street in by_kind["street"]:
+        for gate in gates:
+            add_edge(street, gate, "gate", 40, 120)
+
+    for i, platform in enumerate(by_kind["platform"]):
+        home = concourses[i % len(concourses)]
+        add_edge(home, platform, "stairs", 25, 40)
+        add_edge(home, platform, "escalator", 30, 45)
+        if len(concourses) > 1:
+            other = concourses[(i + 1) % len(concourses)]
+            add_edge(other, platform, "stairs", 45, 70)
+
+    for link in by_kind["link"]:
+        add_edge(link, concourses[0], "corridor", 30, 80)
+        add_edge(link, gates[-1], "corridor", 30, 80)
+
+    return nodes, edges
+
+
+def graph_from_layout(station_name, nodes, edges):
+    # in-memory StationGraph straight from synthesize_station_graph() output;
+    # ids are list positions, in the same order the database assigns them
+    return StationGraph(
+        station_name,
+        {i: (name, kind) for i, (name, kind, _) in enumerate(nodes)},
+        [Edge(i, a, b, kind, length, segment_minutes(kind, length))
+         for i, (a, b, kind, length) in enumerate(edges)]
+    )
+
+
+def write_station_graph(cur, station_id, nodes, edges, location_ids):
+    cur.execute("DELETE FROM walkway_edges WHERE station_id = ?;", (station_id,))
+    cur.execute("DELETE FROM walkway_nodes WHERE station_id = ?;", (station_id,))
+    first_id = cur.execute(
+        "SELECT COALESCE(MAX(node_id), 0) + 1 FROM walkway_nodes;").fetchone()[0]
+    cur.executemany(
+        "INSERT INTO walkway_nodes (node_id, station_id, node_name, node_kind, location_id) "
+        "VALUES (?, ?, ?, ?, ?);",
+        [(first_id + i, station_id, name, kind, location_ids.get(location))
+         for i, (name, kind, location) in enumerate(nodes)]
+    )
+    cur.executemany(
+        "INSERT INTO walkway_edges (station_id, from_node, to_node, edge_kind, length_m) "
+        "VALUES (?, ?, ?, ?, ?);",
+        [(station_id, first_id + a, first_id + b, kind, length) for a, b, kind, length in edges]
+    )
+
+
+def build_station_graphs(cur, station_names=None):
+    # (re)writes walkway_nodes / walkway_edges for the given stations
+    # (all stations when None) inside the caller's transaction
+    if station_names is None:
+        station_names = [row[0] for row in cur.execute(
+            "SELECT station_name FROM station_index ORDER BY station_id;")]
+    for station_name in station_names:
+        row = cur.execute(
+            "SELECT station_id, station_size FROM station_index WHERE station_name = ?;",
+            (station_name,)
+        ).fetchone()
+        if row is None:
+            continue
+        station_id, station_size = row
+        locations = dict(cur.execute(
+            "SELECT location_name, location_id FROM station_locations "
+            "WHERE station_id = ? ORDER BY location_id;",
+            (station_id,)
+        ).fetchall())
+        if len(locations) < 2:
+            write_station_graph(cur, station_id, [], [], locations)
+            continue
+        nodes, edges = synthesize_station_graph(station_name, station_size, list(locations))
+        write_station_graph(cur, station_id, nodes, edges, locations)
+
+
+def main():
+    # walkway graphs and route_paths are written together by generate_routes.py
+    # (one transaction per run, keyed by the station's content hash); a graph
+    # rebuilt on its own would leave the routes and segment loads describing
+    # the old one, so this entry point only says where to go
+    parser = argparse.ArgumentParser(description="Rebuild synthetic walkway graphs.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("stations", nargs="*", help="station names (default: all)")
+    args = parser.parse_args()
+    parser.error("walkway graphs are rebuilt together with their routes – run "
+                 "generate_routes.py --full [station ...] instead")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import matplotlib.pyplot as plt
+
+
+# =====================================================
+# SCHEMATIC STATION LAYOUT (matplotlib)
+# =====================================================
+def draw_station_layout(station_name, size):
+    fig, ax = plt.subplots(figsize=(6, 4))
+    ax.set_title(f"Schematic Layout – {station_name}", fontsize=11)
+
+    if size == "big":
+        ax.add_patch(plt.Rectangle((0.05, 0.65), 0.35, 0.12, fill=False))
+        ax.text(0.225, 0.71, "Main Platforms", ha="center", va="center", fontsize=8)
+        ax.add_patch(plt.Rectangle((0.6, 0.65), 0.35, 0.12, fill=False))
+        ax.text(0.775, 0.71, "Branch Platforms", ha="center", va="center", fontsize=8)
+        ax.add_patch(plt.Rectangle((0.1, 0.4), 0.8, 0.15, fill=False))
+        ax.text(0.5, 0.475, "Large Concourse", ha="center", va="center", fontsize=8)
+        ax.text(0.05, 0.45, "Entry Side", fontsize=7)
+        ax.text(0.95, 0.45, "Exit Side", fontsize=7, ha="right")
+    elif size == "medium":
+        ax.add_patch(plt.Rectangle((0.2, 0.65), 0.6, 0.12, fill=False))
+        ax.text(0.5, 0.71, "Platform Zone", ha="center", va="center", fontsize=8)
+        ax.add_patch(plt.Rectangle((0.25, 0.4), 0.5, 0.15, fill=False))
+        ax.text(0.5, 0.475, "Concourse", ha="center", va="center", fontsize=8)
+        ax.text(0.1, 0.45, "Entry A", fontsize=7)
+        ax.text(0.9, 0.45, "Exit C", fontsize=7, ha="right")
+    else:
+        ax.add_patch(plt.Rectangle((0.25, 0.6), 0.5, 0.12, fill=False))
+        ax.text(0.5, 0.66, "Platform", ha="center", va="center", fontsize=8)
+        ax.add_patch(plt.Rectangle((0.3, 0.4), 0.4, 0.12, fill=False))
+        ax.text(0.5, 0.46, "Concourse", ha="center", va="center", fontsize=8)
+        ax.text(0.2, 0.42, "Entry", fontsize=7)
+        ax.text(0.8, 0.42, "Exit", fontsize=7, ha="right")
+
+    ax.set_xticks([])
+    ax.set_yticks([])
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    ax.axis("off")
+    return fig
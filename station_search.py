@@ -0,0 +1,171 @@
+import re
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+# =====================================================
+# CONFIG
+# =====================================================
+MIN_SCORE = 0.5         # query coverage plus the Dice tie-break; below is noise
+DICE_WEIGHT = 0.25      # tie-break towards names of a similar length
+PREFIX_BONUS = 0.5      # a name starting with the query always ranks first
+SUBSTRING_BONUS = 0.25
+STATION_BONUS = 0.05    # prefer the station itself over one of its locations
+MAX_CANDIDATES = 64     # best trigram scores re-ranked with the bonuses
+
+SEARCH_STATIONS_SQL = "SELECT station_name, line_name FROM stations ORDER BY station_id;"
+SEARCH_LOCATIONS_SQL = """
+    SELECT location_name, station_name FROM station_locations ORDER BY location_id;
+"""
+
+# kind: "station" or "location"; stations: the station itself, or every
+# station that has a location with this name; lines: lines serving them
+Match = namedtuple("Match", "kind name stations lines score")
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text):
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def trigrams(text):
+    # padded so that short queries and word starts still produce trigrams
+    padded = f"  {normalize(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# =====================================================
+# TRIGRAM INDEX (stations + location names, every line)
+# =====================================================
+class SearchIndex:
+    def __init__(self, station_rows, location_rows):
+        names, kinds, owners = [], [], []
+        lines = {}
+        for station_name, line_name in station_rows:
+            lines.setdefault(station_name, [])
+            if line_name not in lines[station_name]:
+                lines[station_name].append(line_name)
+        doc_of = {}
+        for station_name in lines:
+            doc_of[("station", station_name)] = len(names)
+            names.append(station_name)
+            kinds.append("station")
+            owners.append([station_name])
+        for location_name, station_name in location_rows:
+            key = ("location", location_name)
+            if key not in doc_of:
+                doc_of[key] = len(names)
+                names.append(location_name)
+                kinds.append("location")
+                owners.append([])
+            owners[doc_of[key]].append(station_name)
+
+        postings = {}
+        doc_len = np.empty(len(names), dtype=np.float32)
+        for doc, name in enumerate(names):
+            grams = trigrams(name)
+            doc_len[doc] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(doc)
+        self.postings = {gram: np.array(docs, dtype=np.int32) for gram, docs in postings.items()}
+        self.doc_lines = [sorted({line for s in stations for line in lines.get(s, [])})
+                          for stations in owners]
+        self.names = names
+        self.normalized = [normalize(name) for name in names]
+        self.is_station = np.array([kind == "station" for kind in kinds])
+        self.kinds = kinds
+        self.owners = owners
+        self.lines = lines
+        self.doc_len = doc_len
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, query, limit=10, kind=None):
+        # ranked, typo-tolerant matches; kind="station"/"location" filters
+        grams = trigrams(query)
+        lists = [self.postings[g] for g in grams if g in self.postings]
+        if not lists or not normalize(query):
+            return []
+        hits = np.bincount(np.concatenate(lists), minlength=len(self.names))
+        # share of the query found in the name (typos only lose a few
+        # trigrams), tie-broken by Dice similarity of the two trigram sets
+        scores = hits / len(grams) + DICE_WEIGHT * 2.0 * hits / (len(grams) + self.doc_len)
+        scores[self.is_station & (hits > 0)] += STATION_BONUS
+        if kind == "station":
+            scores[~self.is_station] = 0
+        elif kind == "location":
+            scores[self.is_station] = 0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > MAX_CANDIDATES:
+            top = np.argpartition(scores[candidates], -MAX_CANDIDATES)[-MAX_CANDIDATES:]
+            candidates = candidates[top]
+
+        needle = normalize(query)
+        ranked = []
+        for doc in candidates.tolist():
+            score = float(scores[doc])
+            text = self.normalized[doc]
+            if text.startswith(needle):
+                score += PREFIX_BONUS
+            elif needle in text:
+                score += SUBSTRING_BONUS
+            if score >= MIN_SCORE:
+                ranked.append((-score, self.names[doc], doc))
+        ranked.sort()
+        matches = []
+        for neg_score, name, doc in ranked[:limit]:
+            matches.append(Match(self.kinds[doc], name, self.owners[doc], self.doc_lines[doc],
+                                 round(-neg_score, 3)))
+        return matches
+
+    def search_stations(self, query, limit=10):
+        # station names to offer, best first: direct hits plus the stations
+        # owning a matching location (e.g. "brigade road" -> MG Road)
+        seen, stations = set(), []
+        for match in self.search(query, limit):
+            for station_name in match.stations:
+                if station_name not in seen:
+                    seen.add(station_name)
+                    stations.append(station_name)
+                    if len(stations) == limit:
+                        return stations
+        return stations
+
+
+# =====================================================
+# SELF-REFRESHING WRAPPER (rebuilt when the stations table changes)
+# =====================================================
+class StationSearch:
+    def __init__(self, data_access):
+        self.db = data_access
+        self._index = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def index(self):
+        version = self.db.check_for_changes()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._index = SearchIndex(self.db.query_rows(SEARCH_STATIONS_SQL),
+                                              self.db.query_rows(SEARCH_LOCATIONS_SQL))
+                    self._version = version
+        return self._index
+
+    def warm_start(self, index):
+        # adopt a prebuilt index (warm_cache.py) as current for this database
+        with self._lock:
+            self._index = index
+            self._version = self.db.check_for_changes()
+
+    def search(self, query, limit=10, kind=None):
+        return self.index().search(query, limit, kind)
+
+    def search_stations(self, query, limit=10):
+        return self.index().search_stations(query, limit)
+
+    def lines_of(self, station_name):
+        return self.index().lines.get(station_name, [])
@@ -0,0 +1,16 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def metro_db(tmp_path):
+    # a private copy of the checked-in route database
+    path = tmp_path / "metro_footpath.db"
+    shutil.copy(os.path.join(ROOT, "metro_footpath.db"), path)
+    return str(path)
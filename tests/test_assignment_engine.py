@@ -0,0 +1,93 @@
+import multiprocessing
+import threading
+
+import pytest
+
+from assignment_engine import AssignmentEngine
+from crowd_counters import HALF_LIFE_SECS, cold_cutoff
+
+PAIR = ("Majestic", "Entry A", "Platform 1")
+PATHS = ["Route 1", "Route 2", "Route 3"]
+
+
+def hammer(db_path, worker, n):
+    engine = AssignmentEngine(db_path)
+    for i in range(n):
+        if i % 10 == 0:
+            engine.record_many([PAIR + (PATHS[(worker + i) % 3],)] * 5)
+        else:
+            engine.record(*PAIR, PATHS[(worker + i) % 3])
+    engine.close()
+
+
+def expected_total(workers, n):
+    return workers * sum(5 if i % 10 == 0 else 1 for i in range(n))
+
+
+def test_counts_are_exact_under_concurrent_threads(tmp_path):
+    db_path = str(tmp_path / "state.db")
+    AssignmentEngine(db_path).close()
+    threads = [threading.Thread(target=hammer, args=(db_path, w, 200)) for w in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine = AssignmentEngine(db_path)
+    assert engine.total() == expected_total(8, 200)
+    assert sum(engine.counts(*PAIR).values()) == expected_total(8, 200)
+
+
+def test_counts_are_exact_under_concurrent_processes(tmp_path):
+    db_path = str(tmp_path / "state.db")
+    AssignmentEngine(db_path).close()
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=hammer, args=(db_path, w, 150)) for w in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+    assert AssignmentEngine(db_path).total() == expected_total(4, 150)
+
+
+def test_load_halves_every_half_life(tmp_path):
+    engine = AssignmentEngine(str(tmp_path / "state.db"), clock=lambda: 0.0)
+    engine.record(*PAIR, "Route 1", n=8, now=0.0)
+    assert engine.loads(*PAIR, now=0.0)["Route 1"] == pytest.approx(8.0)
+    assert engine.loads(*PAIR, now=HALF_LIFE_SECS)["Route 1"] == pytest.approx(4.0)
+    assert engine.loads(*PAIR, now=3 * HALF_LIFE_SECS)["Route 1"] == pytest.approx(1.0)
+    # the lifetime count never decays
+    assert engine.get(*PAIR, "Route 1") == 8
+
+
+def test_new_assignments_add_to_the_decayed_load(tmp_path):
+    engine = AssignmentEngine(str(tmp_path / "state.db"), half_life=60.0)
+    engine.record(*PAIR, "Route 1", n=4, now=0.0)
+    engine.record(*PAIR, "Route 1", n=1, now=60.0)
+    assert engine.loads(*PAIR, now=60.0)["Route 1"] == pytest.approx(3.0)
+    assert engine.loads(*PAIR, now=120.0)["Route 1"] == pytest.approx(1.5)
+    # an out-of-order (older) write decays to the newer timestamp, not back
+    engine.record(*PAIR, "Route 1", n=2, now=0.0)
+    assert engine.loads(*PAIR, now=120.0)["Route 1"] == pytest.approx(1.5 + 2 * 0.5)
+    assert engine.get(*PAIR, "Route 1") == 7
+
+
+def test_reset_clears_every_pair(tmp_path):
+    engine = AssignmentEngine(str(tmp_path / "state.db"))
+    engine.record_many([PAIR + ("Route 1",), ("Indiranagar", "Exit B", "Platform 2", "Route 2")])
+    engine.reset()
+    assert engine.total() == 0
+    assert engine.counts(*PAIR) == {}
+
+
+def test_prune_keeps_the_lifetime_total(tmp_path):
+    engine = AssignmentEngine(str(tmp_path / "state.db"), half_life=60.0, max_keys=2)
+    engine.record(*PAIR, "Route 0", n=3, now=0.0)
+    later = -cold_cutoff(0.0, 60.0) + 1.0
+    for i, path in enumerate(PATHS):
+        engine.record(*PAIR, path, n=2, now=later + i)
+    assert engine.prune(now=later + 3) == 2     # Route 0 is cold, Route 1 over budget
+    assert engine.counts(*PAIR) == {"Route 2": 2, "Route 3": 2}
+    assert engine.total() == 3 + 3 * 2
+    engine.reset()
+    assert engine.total() == 0
@@ -0,0 +1,82 @@
+import glob
+import os
+import time
+
+import pytest
+
+import assignment_log
+from assignment_log import OPEN_SUFFIX, SEALED_SUFFIX, AssignmentLog
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def record(i):
+    return ("Majestic", "Entry A", "Platform 1", f"Route {i % 3 + 1}", 40, 2.5)
+
+
+def segments(log_dir, suffix):
+    return sorted(glob.glob(os.path.join(log_dir, f"*{suffix}")))
+
+
+def exported_rows(out_dir):
+    files = glob.glob(os.path.join(out_dir, "date=*", "*.parquet"))
+    return sum(pq.read_table(f).num_rows for f in files)
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = AssignmentLog(str(tmp_path / "log"), batch_size=16, flush_every=0.01)
+    yield log
+    log.close()
+
+
+def test_live_writer_keeps_its_open_segment(tmp_path, log):
+    log.append_many(record(i) for i in range(10))
+    assert log.flush()
+    open_segments = segments(log.log_dir, OPEN_SUFFIX)
+    assert len(open_segments) == 1
+
+    # long idle, but the writer's pid is alive: neither sealed nor compacted
+    far_future = time.time() + 10 * assignment_log.ORPHAN_SECS
+    assert assignment_log.seal_orphans(log.log_dir, now=far_future) == 0
+    out = str(tmp_path / "parquet")
+    assert assignment_log.compact(log.log_dir, out) == (0, 0, 0)
+    assert segments(log.log_dir, OPEN_SUFFIX) == open_segments
+
+    log.append_many(record(i) for i in range(10, 25))
+    log.close()
+    assert segments(log.log_dir, OPEN_SUFFIX) == []
+    assert assignment_log.compact(log.log_dir, out) == (1, 25, 0)
+    assert exported_rows(out) == 25
+    assert segments(log.log_dir, SEALED_SUFFIX) == []
+
+
+def test_segment_sealed_under_a_live_writer(tmp_path, log):
+    log.append_many(record(i) for i in range(5))
+    assert log.flush()
+    path, = segments(log.log_dir, OPEN_SUFFIX)
+    os.replace(path, path[:-len(OPEN_SUFFIX)] + SEALED_SUFFIX)
+
+    # the writer still holds the renamed file; sealing it again is a no-op
+    log.append_many(record(i) for i in range(5, 8))
+    log.close()
+    assert log.written == 8 and log.dropped == 0
+    assert segments(log.log_dir, OPEN_SUFFIX) == []
+    out = str(tmp_path / "parquet")
+    assert assignment_log.compact(log.log_dir, out) == (1, 8, 0)
+    assert exported_rows(out) == 8
+
+
+def test_orphan_of_a_dead_writer_is_sealed(tmp_path):
+    log_dir = tmp_path / "log"
+    log_dir.mkdir()
+    orphan = log_dir / f"assignments-20240101-000000-99999999-1{OPEN_SUFFIX}"
+    orphan.write_text('{"ts": 1704067200.0, "station": "Majestic", "start": "Entry A", '
+                      '"end": "Platform 1", "path": "Route 1", "live_crowd": 40, '
+                      '"live_time": 2.5}\n{"ts": 17040')     # torn last line
+    assert not assignment_log.writer_alive(str(orphan))
+    now = os.path.getmtime(orphan) + assignment_log.ORPHAN_SECS
+    assert assignment_log.seal_orphans(str(log_dir), now=now) == 1
+    out = str(tmp_path / "parquet")
+    assert assignment_log.compact(str(log_dir), out) == (1, 1, 1)
+    assert exported_rows(out) == 1
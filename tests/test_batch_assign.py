@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import batch_assign
+from assignment_engine import AssignmentEngine
+from crowd_forecast import CrowdForecaster
+
+NOW = 1_700_000_000.0
+ROUTES = {
+    ("Majestic", "Entry A", "Platform 1"): {"Route 1": 4, "Route 2": 5, "Route 3": 7},
+    ("Majestic", "Exit B", "Platform 2"): {"Route 1": 3, "Route 2": 3},
+    ("Trinity", "Entry A", "Platform 1"): {"Route 1": 2, "Route 2": 6, "Route 3": 6, "Route 4": 9},
+}
+# measured crowd on every path, so no pick depends on the random draw
+OBSERVED = {
+    ("Majestic", "Entry A", "Platform 1"): {"Route 1": 80, "Route 2": 40, "Route 3": 10},
+    ("Majestic", "Exit B", "Platform 2"): {"Route 1": 50, "Route 2": 35},
+    ("Trinity", "Entry A", "Platform 1"): {"Route 1": 60, "Route 2": 20, "Route 3": 30, "Route 4": 5},
+}
+
+
+def route_lookup(station, start, end):
+    paths = ROUTES.get((station, start, end))
+    if paths is None:
+        return None
+    return pd.DataFrame({"Path": list(paths), "Base Time (mins)": list(paths.values())})
+
+
+def observed(station, start, end):
+    return OBSERVED.get((station, start, end), {})
+
+
+@pytest.fixture
+def forecaster(tmp_path):
+    forecaster = CrowdForecaster(str(tmp_path / "forecast.db"), clock=lambda: NOW)
+    rng = np.random.default_rng(1)
+    for (station, start, end), paths in ROUTES.items():
+        for minutes in range(0, 120, 5):
+            forecaster.observe(station, start, end, list(paths),
+                               rng.integers(5, 95, len(paths)), now=NOW + minutes * 60)
+    yield forecaster
+    forecaster.close()
+
+
+def requests(n, seed=0):
+    rng = np.random.default_rng(seed)
+    keys = list(ROUTES) + [("Trinity", "Nowhere", "Platform 1")]
+    return [keys[i] for i in rng.integers(0, len(keys), n)]
+
+
+def test_batch_picks_match_one_request_at_a_time(tmp_path, forecaster):
+    batch = requests(40)
+    engine = AssignmentEngine(str(tmp_path / "batch.db"), clock=lambda: NOW)
+    together = batch_assign.assign_batch(batch, route_lookup, engine=engine, observed=observed,
+                                         forecaster=forecaster, rng=np.random.default_rng(7))
+    engine = AssignmentEngine(str(tmp_path / "single.db"), clock=lambda: NOW)
+    one_by_one = pd.concat([
+        batch_assign.assign_batch([request], route_lookup, engine=engine, observed=observed,
+                                  forecaster=forecaster, rng=np.random.default_rng(7))
+        for request in batch
+    ], ignore_index=True)
+    pd.testing.assert_frame_equal(together, one_by_one)
+    assert together["Path"].isna().sum() == batch.count(("Trinity", "Nowhere", "Platform 1"))
+
+
+def test_vectorised_forecast_matches_each_pair_alone(forecaster):
+    keys = list(ROUTES)
+    width = max(len(paths) for paths in ROUTES.values())
+    names = np.full((len(keys), width), None, dtype=object)
+    base = np.full((len(keys), width), np.inf)
+    crowd = np.full((len(keys), width), 50.0)
+    for k, key in enumerate(keys):
+        names[k, :len(ROUTES[key])] = list(ROUTES[key])
+        base[k, :len(ROUTES[key])] = list(ROUTES[key].values())
+        crowd[k, :len(ROUTES[key])] = list(OBSERVED[key].values())
+    together = forecaster.expected_crowd_many(keys, names, base, crowd, NOW)
+    for k, key in enumerate(keys):
+        n = len(ROUTES[key])
+        alone = forecaster.expected_crowd(*key, list(names[k, :n]), base[k, :n], crowd[k, :n], NOW)
+        np.testing.assert_allclose(together[k, :n], alone)
+        np.testing.assert_array_equal(together[k, n:], crowd[k, n:])    # padding untouched
+    assert not np.allclose(together[:, :2], crowd[:, :2])               # the profiles do count
+
+
+def test_requests_for_one_pair_see_each_others_load():
+    batch = [("Majestic", "Exit B", "Platform 2")] * 6
+    df = batch_assign.assign_batch(batch, route_lookup, engine=None, observed=observed,
+                                   rng=np.random.default_rng(0))
+    # the quieter path goes first, then its own assignments push requests to the other
+    assert df["Path"].iloc[0] == "Route 2"
+    assert set(df["Path"]) == {"Route 1", "Route 2"}
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from crowd_forecast import CrowdForecaster, slot_of
+from footfall_ingest import PATH_CAPACITY_PER_MIN, FootfallIngestor
+
+NOW = 1_700_000_000.0
+MINUTE = int(NOW // 900) * 900 - 900        # first minute of a completed 15-minute slot
+PAIR = ("Majestic", "Entry A", "Platform 1")
+
+
+@pytest.fixture
+def setup(tmp_path):
+    log_path = tmp_path / "events.jsonl"
+    state_db = str(tmp_path / "state.db")
+    ingest = FootfallIngestor(str(log_path), state_db, clock=lambda: NOW)
+    forecaster = CrowdForecaster(state_db, clock=lambda: NOW)
+
+    def add(ts, count):
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"ts": ts, "station": PAIR[0], "start": PAIR[1], "end": PAIR[2],
+                                "path": "Route 1", "count": count}) + "\n")
+        ingest.poll()
+        forecaster.learn_footfall(NOW)
+    yield add, forecaster
+    forecaster.close()
+    ingest.close()
+
+
+def profile(forecaster, ts):
+    return forecaster.conn.execute(
+        "SELECT samples, mean FROM crowd_profiles WHERE path_name = 'Route 1' AND slot = ?;",
+        (slot_of(ts),)
+    ).fetchone()
+
+
+def crowd(people):
+    return 100.0 * people / PATH_CAPACITY_PER_MIN
+
+
+def test_each_minute_is_one_sample(setup):
+    add, forecaster = setup
+    add(MINUTE, 4)
+    add(MINUTE + 60, 8)
+    samples, mean = profile(forecaster, MINUTE)
+    assert samples == 2
+    assert mean == pytest.approx((crowd(4) + crowd(8)) / 2)
+
+
+def test_late_events_replace_the_minute_they_belong_to(setup):
+    add, forecaster = setup
+    add(MINUTE, 4)
+    add(MINUTE + 60, 8)
+    add(MINUTE, 6)          # late: the first minute now totals 10 people
+    samples, mean = profile(forecaster, MINUTE)
+    assert samples == 2
+    assert mean == pytest.approx((crowd(10) + crowd(8)) / 2)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+import crowd_sim
+
+
+@pytest.fixture
+def model():
+    # one pair, two paths: a short one through a narrow gate and a longer
+    # one through a wide corridor
+    return crowd_sim.StationModel(
+        "Test", "small", [("Entry A", "Platform 1")], [1.0], [["Route 1", "Route 2"]],
+        [[2.0, 3.0]], [[0, 1]], ["gate", "corridor"], [5.0, 100.0])
+
+
+def test_zero_demand_gives_an_empty_day(model):
+    empty = np.empty(0), np.empty(0, dtype=np.int64)
+    for policy in crowd_sim.POLICIES:
+        result = crowd_sim.simulate(model, *empty, policy, rng=np.random.default_rng(0))
+        assert result.summary["pedestrians"] == 0
+        assert result.summary["mean queue (mins)"] == 0.0
+        assert result.paths.empty
+
+
+def test_queue_aware_spreads_a_burst_that_shortest_queues_up(model):
+    # a burst within one tick: only this tick's own picks can show the queue
+    times = np.linspace(0.0, 0.1, 40)
+    pairs = np.zeros(40, dtype=np.int64)
+    shortest = crowd_sim.simulate(model, times, pairs, "shortest", rng=np.random.default_rng(0))
+    queue_aware = crowd_sim.simulate(model, times, pairs, "queue_aware",
+                                     rng=np.random.default_rng(0))
+    assert (shortest.arrivals["Path Index"] == 0).all()
+    assert (queue_aware.arrivals["Path Index"] == 1).any()
+    assert queue_aware.summary["mean total (mins)"] < shortest.summary["mean total (mins)"]
+    assert queue_aware.summary["max queue (mins)"] < shortest.summary["max queue (mins)"]
+
+
+def test_policies_agree_without_congestion(model):
+    # one pedestrian every five minutes: no queue, so the shorter path always wins
+    times = np.arange(10) * 5.0
+    pairs = np.zeros(10, dtype=np.int64)
+    shortest = crowd_sim.simulate(model, times, pairs, "shortest")
+    queue_aware = crowd_sim.simulate(model, times, pairs, "queue_aware")
+    assert (queue_aware.arrivals["Path Index"] == shortest.arrivals["Path Index"]).all()
+    assert shortest.summary == dict(queue_aware.summary, policy="shortest")
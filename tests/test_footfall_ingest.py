@@ -0,0 +1,114 @@
+import json
+
+import footfall_ingest
+from footfall_ingest import FootfallIngestor, local_day_start
+
+NOW = 1_700_000_000.0
+
+
+def event(**fields):
+    return json.dumps(fields).encode("utf-8") + b"\n"
+
+
+def ingestor(tmp_path):
+    return FootfallIngestor(str(tmp_path / "events.jsonl"), str(tmp_path / "state.db"),
+                            clock=lambda: NOW)
+
+
+def append(tmp_path, *lines):
+    with open(tmp_path / "events.jsonl", "ab") as f:
+        f.write(b"".join(lines))
+
+
+def test_bad_lines_are_skipped(tmp_path):
+    good = dict(station="Majestic", start="Entry A", end="Platform 1", path="Route 1", ts=NOW)
+    append(
+        tmp_path,
+        event(**good, count=3),
+        b"not json\n",
+        b"null\n",
+        b"[1, 2]\n",
+        event(count=1),                                   # no station
+        event(station="", ts=NOW),
+        event(station=7, ts=NOW),
+        event(**good, count=-1),
+        event(**good, count=True),
+        event(**good, count=1.5),
+        event(**good, count=10 ** 6),
+        event(**dict(good, ts=1e12)),
+        event(**dict(good, ts="noon")),
+        event(**dict(good, path=None), count=2),          # station only: no path bucket
+    )
+    ingest = ingestor(tmp_path)
+    assert ingest.poll() == 2
+    assert ingest.skipped == 12
+    assert ingest.path_counts("Majestic", "Entry A", "Platform 1") == {"Route 1": 3}
+    assert sum(ingest.station_hourly("Majestic", local_day_start(NOW)).values()) == 5
+    ingest.close()
+
+
+def test_half_written_line_waits_for_its_newline(tmp_path):
+    line = event(station="Majestic", start="Entry A", end="Platform 1", path="Route 1", ts=NOW)
+    append(tmp_path, line[:20])
+    ingest = ingestor(tmp_path)
+    assert ingest.poll() == 0
+    append(tmp_path, line[20:])
+    assert ingest.poll() == 1
+    assert ingest.skipped == 0
+    ingest.close()
+
+
+def test_line_longer_than_a_chunk_is_dropped(tmp_path):
+    huge = event(station="x" * 500, ts=NOW)
+    good = event(station="Majestic", start="Entry A", end="Platform 1", path="Route 1", ts=NOW)
+    append(tmp_path, huge, good)
+    ingest = ingestor(tmp_path)
+    assert ingest.poll(max_bytes=128) == 1
+    assert ingest.skipped == 1
+    assert ingest.path_counts("Majestic", "Entry A", "Platform 1") == {"Route 1": 1}
+    assert ingest.poll(max_bytes=128) == 0
+    ingest.close()
+
+
+def test_resumes_from_the_committed_offset(tmp_path):
+    line = event(station="Majestic", start="Entry A", end="Platform 1", path="Route 1", ts=NOW)
+    append(tmp_path, line, b"{broken\n")
+    first = ingestor(tmp_path)
+    assert first.poll() == 1
+    first.close()
+    append(tmp_path, line)
+    second = ingestor(tmp_path)
+    assert second.poll() == 1
+    assert second.path_counts("Majestic", "Entry A", "Platform 1") == {"Route 1": 2}
+    second.close()
+
+
+def test_timestamp_zero_is_not_replaced_by_now(tmp_path):
+    path = dict(station="Majestic", start="Entry A", end="Platform 1", path="Route 1")
+    append(tmp_path, event(**path, ts=0), event(**path))      # no ts: counted at now
+    ingest = ingestor(tmp_path)
+    ingest._last_prune = NOW        # keep the epoch bucket past poll()'s retention sweep
+    assert ingest.poll() == 2
+    buckets = ingest._query("SELECT bucket FROM path_footfall ORDER BY bucket;", ())
+    assert buckets == [(0,), (int(NOW // 60) * 60,)]
+    ingest.close()
+
+
+def test_poll_step_bounds_the_work_per_call(tmp_path, monkeypatch):
+    line = event(station="Majestic", start="Entry A", end="Platform 1", path="Route 1", ts=NOW)
+    append(tmp_path, line * 10)
+    monkeypatch.setattr(footfall_ingest, "STEP_BYTES", 4 * len(line))
+    ingest = ingestor(tmp_path)
+    assert [ingest.poll_step() for _ in range(4)] == [4, 4, 2, 0]
+    assert ingest.path_counts("Majestic", "Entry A", "Platform 1") == {"Route 1": 10}
+    ingest.close()
+
+
+def test_path_crowd_is_people_over_window_capacity(tmp_path):
+    line = event(station="Majestic", start="Entry A", end="Platform 1", path="Route 1", ts=NOW)
+    append(tmp_path, line * 3)
+    ingest = ingestor(tmp_path)
+    ingest.poll()
+    # 3 people against 40 per minute over a one-minute window
+    assert ingest.path_crowd("Majestic", "Entry A", "Platform 1", window_secs=60) == {"Route 1": 8}
+    ingest.close()
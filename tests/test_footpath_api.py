@@ -0,0 +1,137 @@
+import asyncio
+import json
+
+import pytest
+
+import footpath_api
+from footpath_api import ApiError, content_length, parse_assign_body
+
+
+class FakeService:
+    # the handler and dispatch only, no database behind them
+    warm = False
+
+    def lines(self):
+        return ["Purple Line"]
+
+    def assign(self, requests):
+        return [{"station": s, "start": a, "end": b, "path": "Route 1"} for s, a, b in requests]
+
+
+@pytest.mark.parametrize("body", [
+    b"not json",
+    b"[]",
+    b"null",
+    b'"Majestic"',
+    b'{"station": "Majestic", "start": "Entry A"}',
+    b'{"station": "Majestic", "start": "Entry A", "end": 3}',
+    b'{"station": "", "start": "Entry A", "end": "Platform 1"}',
+    b'{"requests": {"station": "Majestic"}}',
+    b'{"requests": [{"station": "Majestic", "start": "Entry A", "end": "Platform 1"}, 7]}',
+    b'{"requests": [{"station": "Majestic", "start": ["Entry A"], "end": "Platform 1"}]}',
+    b"\xff\xfe",
+])
+def test_bad_assign_bodies_are_400(body):
+    with pytest.raises(ApiError) as exc:
+        parse_assign_body(body)
+    assert exc.value.status == 400
+
+
+def test_assign_bodies():
+    one = b'{"station": "Majestic", "start": "Entry A", "end": "Platform 1"}'
+    assert parse_assign_body(one) == ([("Majestic", "Entry A", "Platform 1")], False)
+    batch = b'{"requests": [{"station": "Majestic", "start": "Entry A", "end": "Platform 1"}]}'
+    assert parse_assign_body(batch) == ([("Majestic", "Entry A", "Platform 1")], True)
+    assert parse_assign_body(b'{"requests": []}') == ([], True)
+
+
+@pytest.mark.parametrize("value", ["-1", "+5", "1e3", "0x10", " 12", "12abc", "١٢"])
+def test_bad_content_length_is_400(value):
+    with pytest.raises(ApiError) as exc:
+        content_length(value)
+    assert exc.value.status == 400
+
+
+def test_content_length():
+    assert content_length(None) == 0
+    assert content_length("") == 0
+    assert content_length("42") == 42
+
+
+# ---------------- over a socket ----------------
+def exchange(*messages):
+    # send each raw request on one connection; returns [(status, headers, body)]
+    # for the responses received before the server closed it
+    async def run():
+        api = footpath_api.FootpathAPI(FakeService(), workers=2)
+        server = await asyncio.start_server(api.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        responses = []
+        try:
+            for message in messages:
+                writer.write(message)
+                await writer.drain()
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+                except asyncio.IncompleteReadError:
+                    break
+                status_line, *lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+                headers = dict(line.split(": ", 1) for line in lines)
+                body = await reader.readexactly(int(headers["Content-Length"]))
+                responses.append((int(status_line.split()[1]), headers, body))
+        finally:
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            api.executor.shutdown(wait=False)
+        return responses
+    return asyncio.run(run())
+
+
+def post(body, headers=""):
+    return (f"POST /assign HTTP/1.1\r\nHost: x\r\nContent-Length: {len(body)}\r\n{headers}\r\n"
+            .encode("latin-1") + body)
+
+
+GET_LINES = b"GET /lines HTTP/1.1\r\nHost: x\r\n\r\n"
+
+
+def test_bad_body_keeps_the_connection_alive():
+    (status, headers, body), (next_status, _, next_body) = exchange(post(b"{oops"), GET_LINES)
+    assert status == 400 and "error" in json.loads(body)
+    assert headers["Connection"] == "keep-alive"
+    assert next_status == 200 and json.loads(next_body) == {"lines": ["Purple Line"]}
+
+
+def test_malformed_content_length_closes_the_connection():
+    message = b"POST /assign HTTP/1.1\r\nHost: x\r\nContent-Length: 5x\r\n\r\n{}"
+    responses = exchange(message, GET_LINES)
+    assert len(responses) == 1
+    status, headers, _ = responses[0]
+    assert status == 400 and headers["Connection"] == "close"
+
+
+def test_oversized_body_is_413_and_not_read():
+    message = (f"POST /assign HTTP/1.1\r\nHost: x\r\n"
+               f"Content-Length: {footpath_api.MAX_BODY_BYTES + 1}\r\n\r\n").encode("latin-1")
+    (status, headers, _), = exchange(message)
+    assert status == 413 and headers["Connection"] == "close"
+
+
+def test_garbage_request_line_closes_without_a_response():
+    assert exchange(b"HELLO\r\n\r\n", GET_LINES) == []
+
+
+def test_wrong_method_and_unknown_endpoint():
+    responses = exchange(b"GET /assign HTTP/1.1\r\nHost: x\r\n\r\n",
+                         post(b"{}").replace(b"/assign", b"/lines"),
+                         b"GET /nowhere HTTP/1.1\r\nHost: x\r\n\r\n")
+    assert [status for status, _, _ in responses] == [405, 405, 404]
+
+
+def test_assign_round_trip():
+    body = b'{"requests": [{"station": "Majestic", "start": "Entry A", "end": "Platform 1"}]}'
+    (status, _, payload), = exchange(post(body, "Connection: close\r\n"))
+    assert status == 200
+    assert json.loads(payload)["assignments"][0]["path"] == "Route 1"
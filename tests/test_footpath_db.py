@@ -0,0 +1,78 @@
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+import footpath_db
+from footpath_db import LINES_SQL, DataAccess, QueryCache
+
+
+@pytest.fixture
+def data(metro_db):
+    data = DataAccess(metro_db, pool_size=2)
+    yield data
+    data.close()
+
+
+def rename_line(db_path, old, new):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("UPDATE stations SET line_name = ? WHERE line_name = ?;", (new, old))
+    conn.close()
+
+
+def test_pool_reuses_idle_connections(data):
+    with data.pool.connection() as first:
+        pass
+    with data.pool.connection() as second:
+        assert second is first
+    assert data.pool._opened == 1
+
+
+def test_pool_closes_handles_returned_after_a_reset(data):
+    with data.pool.connection() as conn:
+        data.pool.close()
+    assert data.pool._opened == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1;")
+
+
+def test_cache_evicts_the_least_recently_used():
+    cache = QueryCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_writes_invalidate_cached_results(data, metro_db):
+    assert ("Purple Line",) in data.query_rows(LINES_SQL)
+    assert data.cache.get(("rows", LINES_SQL, ())) is not None
+    rename_line(metro_db, "Purple Line", "Violet Line")
+    lines = data.query_rows(LINES_SQL)
+    assert ("Violet Line",) in lines and ("Purple Line",) not in lines
+    assert (data.query_df(LINES_SQL)["line_name"] == "Violet Line").any()
+
+
+def test_result_read_before_a_write_is_not_cached(data, metro_db, monkeypatch):
+    # another thread sees a commit (and clears the cache) while this query runs
+    connection = data.pool.connection
+
+    @contextmanager
+    def racing_connection():
+        with connection() as conn:
+            yield conn
+        rename_line(metro_db, "Purple Line", "Violet Line")
+        data.check_for_changes()
+
+    monkeypatch.setattr(data.pool, "connection", racing_connection)
+    assert ("Purple Line",) in data.query_rows(LINES_SQL)
+    monkeypatch.setattr(data.pool, "connection", connection)
+    assert ("Violet Line",) in data.query_rows(LINES_SQL)
+
+
+def test_one_data_access_per_database(metro_db):
+    assert footpath_db.get_data_access(metro_db) is footpath_db.get_data_access(metro_db)
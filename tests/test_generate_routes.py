@@ -0,0 +1,77 @@
+import sqlite3
+
+import footpath_db
+import generate_routes
+import station_graph
+
+ROUTES_SQL = "SELECT * FROM route_paths ORDER BY route_id;"
+
+
+def rows(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def test_shipped_routes_are_up_to_date(metro_db):
+    before = rows(metro_db, ROUTES_SQL)
+    assert generate_routes.main(metro_db, workers=1, verbose=False) == 0
+    assert rows(metro_db, ROUTES_SQL) == before
+    assert len(before) == 3360
+
+
+def test_only_changed_stations_regenerate(metro_db):
+    (station_id, station_name), = rows(
+        metro_db, "SELECT station_id, station_name FROM station_index "
+                  "WHERE station_name = 'Indiranagar';")
+    others = "SELECT * FROM route_paths WHERE station_id != ? ORDER BY route_id;"
+    before = rows(metro_db, others, (station_id,))
+    conn = sqlite3.connect(metro_db)
+    with conn:
+        conn.execute("INSERT INTO station_locations (station_name, location_name) VALUES (?, ?);",
+                     (station_name, "Entry Z"))
+    conn.close()
+
+    assert generate_routes.main(metro_db, workers=1, verbose=False) > 0
+    assert rows(metro_db, others, (station_id,)) == before
+    new = rows(metro_db, "SELECT COUNT(*) FROM routes WHERE station_name = ? "
+                         "AND (start_location = 'Entry Z' OR end_location = 'Entry Z');",
+               (station_name,))[0][0]
+    assert new > 0
+    assert generate_routes.main(metro_db, workers=1, verbose=False) == 0
+
+
+def test_synthetic_routes_follow_the_original_rules():
+    locations = ["Entry A", "Platform 1", "Concourse"]
+    routes = generate_routes.synthetic_routes("Test", "medium", locations)
+    assert routes == generate_routes.synthetic_routes("Test", "medium", locations)
+    by_pair = {}
+    for start, end, path_name, dist, minutes in routes:
+        by_pair.setdefault((start, end), []).append((path_name, dist, minutes))
+    assert len(by_pair) == 6
+    assert len(by_pair[("Entry A", "Platform 1")]) == 4
+    assert len(by_pair[("Platform 1", "Entry A")]) == 2
+    for alternatives in by_pair.values():
+        base = alternatives[0][1]
+        assert 160 <= base <= 360
+        # alternative i is 10-50 m per step longer than the first
+        assert all(10 * i <= dist - base <= 50 * i for i, (_, dist, _) in enumerate(alternatives))
+        assert all(minutes == max(2, int(dist / 70)) for _, dist, minutes in alternatives)
+
+
+def test_graph_routes_are_opt_in(metro_db):
+    generate_routes.main(metro_db, full=True, workers=1, verbose=False,
+                         mode=generate_routes.FROM_GRAPHS)
+    engine = station_graph.RouteEngine(footpath_db.DataAccess(metro_db), use_store=False)
+    station, start, end = rows(metro_db, "SELECT station_name, start_location, end_location "
+                                         "FROM routes ORDER BY route_id LIMIT 1;")[0]
+    stored = rows(metro_db, "SELECT path_name, base_distance, base_time FROM routes "
+                            "WHERE station_name = ? AND start_location = ? AND end_location = ? "
+                            "ORDER BY path_name;", (station, start, end))
+    planned = [(r.path_name, r.distance, station_graph.base_minutes(r))
+               for r in engine.routes(station, start, end)]
+    assert stored == sorted(planned)
+    # switching back to the default mode regenerates every station
+    assert generate_routes.main(metro_db, workers=1, verbose=False) > 0
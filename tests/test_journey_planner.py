@@ -0,0 +1,71 @@
+import itertools
+
+import pytest
+
+import footpath_db
+from journey_planner import (NETWORK_SQL, JourneyPlanner, MetroNetwork, import_line_stops,
+                             line_sequences)
+
+MAJESTIC = "Majestic (Kempegowda Interchange)"
+
+
+@pytest.fixture
+def planner(metro_db):
+    return JourneyPlanner(footpath_db.DataAccess(metro_db))
+
+
+def shipped_network(planner):
+    lines, hops = line_sequences(planner.db.query_rows(NETWORK_SQL))
+    return lines, hops
+
+
+def test_shipped_lines_meet_at_majestic(planner):
+    lines, _ = shipped_network(planner)
+    assert set(lines) == {"Purple Line", "Green Line", "Yellow Line"}
+    assert MAJESTIC in lines["Purple Line"] and MAJESTIC in lines["Green Line"]
+    assert planner.available()
+
+
+def test_journey_changes_lines_at_majestic(planner):
+    journey = planner.plan("Peenya", "Exit", "Whitefield (Kadugodi)", "Exit A - ITPL")
+    rides = [leg for leg in journey.legs if leg.kind == "ride"]
+    transfers = [leg for leg in journey.legs if leg.kind == "transfer"]
+    assert [leg.line for leg in rides] == ["Green Line", "Purple Line"]
+    assert [(leg.station, leg.line) for leg in transfers] == [(MAJESTIC, "Green Line → Purple Line")]
+    assert rides[0].end == rides[1].start == MAJESTIC
+    assert journey.minutes == pytest.approx(sum(leg.minutes for leg in journey.legs))
+
+
+def test_yellow_line_reaches_purple_via_rv_road_and_majestic(planner):
+    journey = planner.plan("Electronic City Phase 1", "Exit", "Indiranagar", "Exit A")
+    assert [leg.line for leg in journey.legs if leg.kind == "ride"] == \
+        ["Yellow Line", "Green Line", "Purple Line"]
+    assert [leg.station for leg in journey.legs if leg.kind == "transfer"] == ["RV Road", MAJESTIC]
+
+
+def test_alt_search_agrees_with_dijkstra(planner):
+    lines, hops = shipped_network(planner)
+    network = MetroNetwork(lines, num_landmarks=8, ride_minutes=hops)
+    assert network.landmarks
+    for source, target in itertools.permutations(range(len(network)), 2):
+        minutes, nodes, _ = network.search({source: 0.0}, {target: 0.0})
+        assert minutes == pytest.approx(network.distances(source)[target])
+        assert nodes[0] == source and nodes[-1] == target
+
+
+def test_no_route_between_unconnected_lines():
+    network = MetroNetwork({"Red": ["A", "B", "C"], "Blue": ["D", "E"]})
+    assert network.search({network.node_of[("A", "Red")]: 0.0},
+                          {network.node_of[("E", "Blue")]: 0.0}) is None
+
+
+def test_no_journey_without_a_platform_walk(planner):
+    assert planner.plan("Peenya", "Exit", "Indiranagar", "No Such Exit") is None
+
+
+def test_import_rejects_unknown_stations(metro_db, tmp_path):
+    csv_path = tmp_path / "stops.csv"
+    csv_path.write_text("line_name,station_name,minutes_to_next\n"
+                        "Pink Line,Nowhere,2\nPink Line,Peenya,\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="Nowhere"):
+        import_line_stops(metro_db, str(csv_path))
@@ -0,0 +1,76 @@
+import sqlite3
+
+import pytest
+
+import migrate_db
+
+DATA_SQL = {
+    "route_paths": "SELECT * FROM route_paths ORDER BY route_id;",
+    "station_locations": "SELECT location_id, station_name, location_name "
+                         "FROM station_locations ORDER BY location_id;",
+    "stations": "SELECT * FROM stations ORDER BY station_id;",
+}
+
+
+def snapshot(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        objects = conn.execute("SELECT type, name FROM sqlite_master ORDER BY type, name;").fetchall()
+        data = {name: conn.execute(sql).fetchall() for name, sql in DATA_SQL.items()}
+        return migrate_db.current_version(conn), objects, data
+    finally:
+        conn.close()
+
+
+def test_down_to_zero_restores_the_text_keyed_schema(metro_db):
+    _, _, data = snapshot(metro_db)
+    assert migrate_db.migrate(metro_db, target=0) == 0
+
+    conn = sqlite3.connect(metro_db)
+    tables = {name for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'view');")}
+    assert tables == {"stations", "station_locations", "routes", "sqlite_sequence"}
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(station_locations);")]
+    assert columns == ["location_id", "station_name", "location_name"]
+    routes = conn.execute("SELECT route_id, path_name, base_distance, base_time "
+                          "FROM routes ORDER BY route_id;").fetchall()
+    conn.close()
+    assert routes == [(r[0], r[4], r[5], r[6]) for r in data["route_paths"]]
+
+
+def test_down_and_up_again_is_lossless(metro_db):
+    before = snapshot(metro_db)
+    migrate_db.migrate(metro_db, target=0)
+    assert migrate_db.migrate(metro_db) == migrate_db.LATEST_VERSION
+    assert snapshot(metro_db) == before
+    assert migrate_db.check_query_plans(metro_db) == []
+
+
+@pytest.mark.parametrize("number", [n for n, *_ in migrate_db.MIGRATIONS])
+def test_each_migration_reverts_and_reapplies(metro_db, number):
+    before = snapshot(metro_db)
+    migrate_db.migrate(metro_db, target=number)
+    assert migrate_db.migrate(metro_db, target=number - 1) == number - 1
+    assert migrate_db.migrate(metro_db, target=number) == number
+    migrate_db.migrate(metro_db)
+    assert snapshot(metro_db) == before
+
+
+def test_ensure_current_upgrades_an_old_database(metro_db):
+    migrate_db.migrate(metro_db, target=5)
+    assert migrate_db.ensure_current(metro_db) == migrate_db.LATEST_VERSION
+
+
+def test_failed_migration_leaves_the_previous_version(metro_db, monkeypatch):
+    def broken(cur):
+        cur.execute("CREATE TABLE half_done (x);")
+        raise RuntimeError("boom")
+
+    latest = migrate_db.LATEST_VERSION
+    monkeypatch.setattr(migrate_db, "MIGRATIONS",
+                        migrate_db.MIGRATIONS + [(latest + 1, "broken", broken, None)])
+    with pytest.raises(RuntimeError):
+        migrate_db.migrate(metro_db, target=latest + 1)
+    version, objects, _ = snapshot(metro_db)
+    assert version == latest
+    assert ("table", "half_done") not in objects
@@ -0,0 +1,70 @@
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+
+from render_cache import RenderCache
+
+
+def counting_draw(calls, label="layout"):
+    def draw():
+        calls.append(label)
+        fig, ax = plt.subplots(figsize=(1, 1))
+        ax.plot([0, 1], [0, 1])
+        return fig
+    return draw
+
+
+def test_second_request_is_a_cache_hit():
+    cache, calls = RenderCache(), []
+    first = cache.get_or_render(("layout", "small", "Majestic"), counting_draw(calls))
+    second = cache.get_or_render(("layout", "small", "Majestic"), counting_draw(calls))
+    assert second is first
+    assert first.startswith(b"\x89PNG")
+    assert calls == ["layout"]
+    assert (cache.hits, cache.renders) == (1, 1)
+    # the figure is closed once its bytes are saved
+    assert plt.get_fignums() == []
+
+
+def test_new_key_or_format_renders_again():
+    cache, calls = RenderCache(), []
+    cache.get_or_render(("layout", "small", "Majestic"), counting_draw(calls))
+    # a station resized by the operator changes the key, so it is redrawn
+    cache.get_or_render(("layout", "large", "Majestic"), counting_draw(calls))
+    svg = cache.get_or_render(("layout", "large", "Majestic"), counting_draw(calls), fmt="svg")
+    assert b"<svg" in svg
+    assert len(calls) == 3
+    assert len(cache) == 3
+
+
+def test_clear_invalidates_every_image():
+    cache, calls = RenderCache(), []
+    cache.get_or_render(("layout", "small", "Majestic"), counting_draw(calls))
+    cache.clear()
+    assert len(cache) == 0 and cache._bytes == 0
+    cache.get_or_render(("layout", "small", "Majestic"), counting_draw(calls))
+    assert len(calls) == 2
+
+
+def test_least_recently_used_image_is_evicted():
+    cache, calls = RenderCache(max_entries=2), []
+    cache.get_or_render(("layout", "a"), counting_draw(calls))
+    cache.get_or_render(("layout", "b"), counting_draw(calls))
+    cache.get_or_render(("layout", "a"), counting_draw(calls))   # a is now newest
+    cache.get_or_render(("layout", "c"), counting_draw(calls))
+    assert len(calls) == 3
+    cache.get_or_render(("layout", "a"), counting_draw(calls))
+    assert len(calls) == 3
+    cache.get_or_render(("layout", "b"), counting_draw(calls))
+    assert len(calls) == 4
+
+
+def test_byte_budget_evicts_oldest():
+    cache, calls = RenderCache(), []
+    first = cache.get_or_render(("layout", "a"), counting_draw(calls))
+    cache.max_bytes = len(first) + 1
+    cache.get_or_render(("layout", "b"), counting_draw(calls))
+    assert len(cache) == 1
+    assert cache._bytes <= cache.max_bytes
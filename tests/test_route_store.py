@@ -0,0 +1,63 @@
+import sqlite3
+
+import route_store
+
+PAIR_SQL = """
+    SELECT station_name, start_location, end_location, path_name, base_time
+    FROM routes ORDER BY route_id LIMIT 1;
+"""
+
+
+def fingerprint(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return route_store.fingerprint(conn)
+    finally:
+        conn.close()
+
+
+def edit(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute(sql, params)
+    conn.close()
+
+
+def test_snapshot_is_reused_while_the_data_is_unchanged(metro_db, tmp_path):
+    path = str(tmp_path / "metro_footpath.routes")
+    store = route_store.open_store(metro_db, path)
+    assert route_store.open_store(metro_db, path, rebuild=False).fingerprint == store.fingerprint
+
+
+def test_in_place_update_invalidates_the_snapshot(metro_db, tmp_path):
+    path = str(tmp_path / "metro_footpath.routes")
+    conn = sqlite3.connect(metro_db)
+    station, start, end, path_name, base_time = conn.execute(PAIR_SQL).fetchone()
+    conn.close()
+    store = route_store.open_store(metro_db, path)
+    before = fingerprint(metro_db)
+
+    # same row count, same max id: only the generation counter sees this
+    edit(metro_db, "UPDATE route_paths SET base_time = base_time + 7 "
+                   "WHERE route_id = (SELECT MIN(route_id) FROM route_paths);")
+    assert fingerprint(metro_db) != before
+    assert route_store.open_store(metro_db, path, rebuild=False) is None
+
+    fresh = route_store.open_store(metro_db, path)
+    assert fresh.fingerprint != store.fingerprint
+    frame = fresh.route_frame(station, start, end)
+    assert frame.loc[frame["Path"] == path_name, "Base Time (mins)"].item() == base_time + 7
+
+
+def test_edit_through_the_routes_view_invalidates_the_snapshot(metro_db):
+    before = fingerprint(metro_db)
+    edit(metro_db, "UPDATE routes SET path_name = path_name || ' (closed)' "
+                   "WHERE route_id = (SELECT MAX(route_id) FROM route_paths);")
+    assert fingerprint(metro_db) != before
+
+
+def test_location_rename_invalidates_the_snapshot(metro_db):
+    before = fingerprint(metro_db)
+    edit(metro_db, "UPDATE station_locations SET location_name = location_name || ' East' "
+                   "WHERE location_id = (SELECT MIN(location_id) FROM station_locations);")
+    assert fingerprint(metro_db) != before
@@ -0,0 +1,81 @@
+import sqlite3
+
+import pytest
+
+import migrate_db
+from footpath_db import ROUTE_SUMMARY_SQL, ROUTES_SQL
+
+STATION = "Trinity"
+START, END = "Entry A", "Platform - Kengeri Direction"
+PARAMS = (START, END, STATION)
+
+
+@pytest.fixture
+def conn(metro_db):
+    conn = sqlite3.connect(metro_db)
+    yield conn
+    conn.close()
+
+
+def summary(conn, params=PARAMS):
+    return conn.execute(ROUTE_SUMMARY_SQL, params).fetchone()
+
+
+def expected_summary(conn, params):
+    # what the dashboard used to work out from the full route table
+    routes = conn.execute(ROUTES_SQL, params).fetchall()
+    path, distance, minutes = min(routes, key=lambda r: (r[1], r[0]))
+    return len(routes), path, distance, minutes, min(r[2] for r in routes), max(r[2] for r in routes)
+
+
+def test_known_route_summary(conn):
+    count, route_id, path, distance, minutes, min_time, max_time = summary(conn)
+    assert (count, path, distance, minutes) == (4, "Route 1: Entry A → Platform", 171, 2)
+    assert (min_time, max_time) == (2, 3)
+    assert conn.execute("SELECT path_name FROM route_paths WHERE route_id = ?;",
+                        (route_id,)).fetchone() == (path,)
+
+
+def test_every_summary_matches_its_route_table(conn):
+    pairs = conn.execute("SELECT DISTINCT start_location, end_location, station_name "
+                         "FROM routes;").fetchall()
+    assert len(pairs) == conn.execute("SELECT COUNT(*) FROM route_summaries;").fetchone()[0]
+    for params in pairs:
+        row = summary(conn, params)
+        assert (row[0],) + row[2:] == expected_summary(conn, params)
+
+
+def test_view_edits_refresh_the_pair_summary(conn):
+    with conn:
+        conn.execute("INSERT INTO routes (station_name, start_location, end_location, "
+                     "path_name, base_distance, base_time) VALUES (?, ?, ?, ?, ?, ?);",
+                     (STATION, START, END, "Route 5: Entry A → Platform", 150, 4))
+    assert summary(conn)[0] == 5
+    assert summary(conn)[2:] == ("Route 5: Entry A → Platform", 150, 4, 2, 4)
+
+    with conn:
+        conn.execute("UPDATE routes SET base_distance = 300 WHERE path_name = ? "
+                     "AND station_name = ?;", ("Route 5: Entry A → Platform", STATION))
+    assert summary(conn)[2:] == ("Route 1: Entry A → Platform", 171, 2, 2, 4)
+
+    with conn:
+        conn.execute("DELETE FROM routes WHERE station_name = ? AND start_location = ? "
+                     "AND end_location = ?;", (STATION, START, END))
+    assert summary(conn) is None
+
+
+def test_refresh_for_one_station_leaves_the_others(conn):
+    station_id = conn.execute("SELECT station_id FROM station_index WHERE station_name = ?;",
+                              (STATION,)).fetchone()[0]
+    other = ("Entry A", "Exit", "BTM Layout")
+    before = summary(conn, other)[-2:]
+    with conn:
+        # raw route_paths writes bypass the view triggers
+        conn.execute("UPDATE route_paths SET base_time = base_time + 10 WHERE station_id = ?;",
+                     (station_id,))
+        conn.execute("UPDATE route_paths SET base_time = base_time + 10 WHERE station_id != ?;",
+                     (station_id,))
+        migrate_db.refresh_route_summaries(conn.cursor(), [station_id])
+    assert summary(conn)[-2:] == (12, 13)
+    # the other stations keep their range until they are refreshed too
+    assert summary(conn, other)[-2:] == before
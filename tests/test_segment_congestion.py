@@ -0,0 +1,137 @@
+import random
+
+import numpy as np
+import pytest
+
+import footpath_db
+import segment_congestion
+import station_graph
+from assignment_engine import AssignmentEngine
+from crowd_counters import cold_cutoff
+from segment_congestion import SegmentCongestion, SegmentIndex
+
+LOCATIONS = ["Entry A", "Entry B", "Exit C", "Concourse", "Platform 1", "Platform 2",
+             "Foot Overbridge"]
+
+
+@pytest.fixture
+def graph():
+    nodes, edges = station_graph.synthesize_station_graph("Test", "big", LOCATIONS)
+    return station_graph.graph_from_layout("Test", nodes, edges)
+
+
+def register(index, graph, pairs):
+    for start, end in pairs:
+        index.add_routes(start, end, station_graph.plan_routes(graph, start, end))
+
+
+def recomputed(index):
+    incremental = index.weighted[:len(index.route_edges)].copy()
+    index.recompute()
+    return incremental, index.weighted[:len(index.route_edges)]
+
+
+def all_pairs():
+    return [(a, b) for a in LOCATIONS for b in LOCATIONS if a != b]
+
+
+def test_incremental_updates_match_recompute(graph):
+    index = SegmentIndex(graph)
+    register(index, graph, all_pairs())
+    rng = random.Random(0)
+    for _ in range(500):
+        row = rng.randrange(len(index.route_edges))
+        index.add_load(index.route_edges[row], rng.choice([1.0, 0.5, -0.25]))
+    incremental, full = recomputed(index)
+    assert np.abs(full).sum() > 0
+    np.testing.assert_allclose(incremental, full, rtol=1e-9, atol=1e-9)
+
+
+def test_routes_registered_after_loads_see_them(graph):
+    pairs = all_pairs()
+    index = SegmentIndex(graph)
+    register(index, graph, pairs[:10])
+    for row in range(len(index.route_edges)):
+        index.add_load(index.route_edges[row], 1.0)
+    register(index, graph, pairs[10:])     # grows the weighted array past its first size
+    for row in range(0, len(index.route_edges), 3):
+        index.add_load(index.route_edges[row], 2.0)
+    incremental, full = recomputed(index)
+    np.testing.assert_allclose(incremental, full, rtol=1e-9, atol=1e-9)
+
+
+def test_set_load_touches_only_routes_on_the_segment(graph):
+    index = SegmentIndex(graph)
+    register(index, graph, all_pairs())
+    edge = index.route_edges[0][0]
+    before = index.weighted[:len(index.route_edges)].copy()
+    assert index.set_load(edge, 3.0) == len(index.routes_of[edge])
+    assert index.set_load(edge, 3.0) == 0       # unchanged load: nothing to touch
+    changed = np.flatnonzero(index.weighted[:len(index.route_edges)] != before)
+    assert set(changed) == set(index.routes_of[edge])
+
+
+def test_rescale_and_route_load(graph):
+    index = SegmentIndex(graph)
+    register(index, graph, all_pairs())
+    row = 0
+    index.add_load(index.route_edges[row], 4.0)
+    load = index.route_load(row, 1.0)
+    index.rescale(0.5)
+    assert index.route_load(row, 2.0) == pytest.approx(load)
+    # the time-weighted mean load of the route's segments
+    edges = graph.edges
+    expected = sum(edges[e].minutes * index.scaled.get(e, 0.0) for e in index.route_edges[row])
+    assert index.route_load(row, 1.0) == pytest.approx(expected / index.free[row])
+
+
+def test_overlap_is_one_on_the_diagonal(graph):
+    index = SegmentIndex(graph)
+    register(index, graph, [("Entry A", "Platform 1")])
+    rows = index.pair_rows[("Entry A", "Platform 1")]
+    share = index.overlap(rows)
+    np.testing.assert_allclose(np.diag(share), 1.0)
+    assert ((share >= 0) & (share <= 1 + 1e-12)).all()
+
+
+@pytest.fixture
+def congestion(metro_db, tmp_path):
+    state_db = str(tmp_path / "state.db")
+    engine = station_graph.RouteEngine(footpath_db.DataAccess(metro_db), use_store=False)
+    congestion = SegmentCongestion(engine, AssignmentEngine(state_db), state_db, clock=lambda: 0.0)
+    yield congestion
+    congestion.close()
+
+
+def pairs(congestion):
+    # the first pair of each station, in route order
+    return congestion.route_engine.db.query_rows(
+        "SELECT station_name, start_location, end_location FROM routes "
+        "GROUP BY station_name ORDER BY MIN(route_id);"
+    )
+
+
+def first_path(congestion, station, start, end):
+    return congestion.route_engine.route_table(station, start, end)["Path"].iloc[0]
+
+
+def test_congestion_paths_are_the_route_table_paths(congestion):
+    station, start, end = pairs(congestion)[0]
+    paths = list(congestion.route_engine.route_table(station, start, end)["Path"])
+    congestion.record(station, start, end, paths[0], now=0.0)
+    loads = congestion.loads(station, start, end, now=0.0)
+    index, _ = congestion._pair_rows(station, start, end)
+    assert index.path_names and set(index.path_names) <= set(paths)
+    assert set(loads) <= set(paths)
+    assert loads[paths[0]] > 0
+
+
+def test_prune_drops_only_cold_segments(congestion, monkeypatch):
+    cold, warm = pairs(congestion)[:2]
+    congestion.record(*cold, first_path(congestion, *cold), now=0.0)
+    later = -cold_cutoff(0.0, congestion.half_life) + 1.0
+    monkeypatch.setattr(segment_congestion, "PRUNE_EVERY", 1)
+    congestion.record(*warm, first_path(congestion, *warm), now=later)
+    stations = congestion.conn.execute(
+        "SELECT DISTINCT station_name FROM segment_loads;").fetchall()
+    assert stations == [(warm[0],)]
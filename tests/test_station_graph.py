@@ -0,0 +1,77 @@
+import pytest
+
+import generate_routes
+import station_graph
+
+LOCATIONS = ["Entry A", "Entry B", "Exit C", "Concourse", "West Concourse", "Platform 1",
+             "Platform 2"]
+
+
+@pytest.fixture(params=["big", "small"])
+def graph(request):
+    nodes, edges = station_graph.synthesize_station_graph("Test", request.param, LOCATIONS)
+    return station_graph.graph_from_layout("Test", nodes, edges)
+
+
+def all_paths(graph, source, target):
+    # every loopless walk, by depth-first search: (minutes, nodes, edges)
+    found = []
+
+    def walk(node, nodes, edges, minutes):
+        if node == target:
+            found.append((minutes, nodes, edges))
+            return
+        if node != source and graph.is_terminal(node):
+            return
+        for nxt, edge_id, step in graph.adjacency[node]:
+            if nxt not in nodes:
+                walk(nxt, nodes + [nxt], edges + [edge_id], minutes + step)
+    walk(source, [source], [], 0.0)
+    return sorted(found, key=lambda path: path[0])
+
+
+def location_pairs(graph):
+    ids = [graph.node_by_name[name] for name in LOCATIONS]
+    return [(a, b) for a in ids for b in ids if a != b]
+
+
+def test_dijkstra_finds_the_cheapest_walk(graph):
+    for source, target in location_pairs(graph):
+        minutes, nodes, edges = graph.shortest_path(source, target)
+        assert minutes == pytest.approx(all_paths(graph, source, target)[0][0])
+        assert (nodes[0], nodes[-1]) == (source, target)
+        assert minutes == pytest.approx(graph.path_minutes(edges))
+
+
+def test_yen_returns_the_k_cheapest_loopless_walks(graph):
+    for source, target in location_pairs(graph):
+        every = all_paths(graph, source, target)
+        for k in (1, 2, 4, 6):
+            paths = graph.k_shortest_paths(source, target, k)
+            costs = [minutes for minutes, _, _ in paths]
+            assert len(paths) == min(k, len(every))
+            assert costs == sorted(costs)
+            assert costs == pytest.approx([minutes for minutes, _, _ in every[:len(paths)]])
+            assert len({tuple(edges) for _, _, edges in paths}) == len(paths)
+            for minutes, nodes, edges in paths:
+                assert len(set(nodes)) == len(nodes)
+                assert minutes == pytest.approx(graph.path_minutes(edges))
+
+
+def test_plan_routes_names_and_counts(graph):
+    routes = station_graph.plan_routes(graph, "Entry A", "Platform 1")
+    assert [r.path_name for r in routes] == [f"Route {i}: Entry A → Platform 1" for i in (1, 2, 3, 4)]
+    assert len(station_graph.plan_routes(graph, "Platform 1", "Exit C")) == 2
+    assert station_graph.plan_routes(graph, "Entry A", "Entry A") == []
+
+
+def test_graphs_are_only_rebuilt_with_their_routes(metro_db, monkeypatch):
+    monkeypatch.setattr("sys.argv", ["station_graph.py", "--db", metro_db])
+    with pytest.raises(SystemExit):
+        station_graph.main()
+    # the per-station rebuild rewrites one station's graph and routes together
+    assert generate_routes.main(metro_db, full=True, workers=1, verbose=False,
+                                station_names=["Trinity"]) > 0
+    assert generate_routes.main(metro_db, workers=1, verbose=False) == 0
+    with pytest.raises(ValueError, match="Nowhere"):
+        generate_routes.main(metro_db, workers=1, verbose=False, station_names=["Nowhere"])
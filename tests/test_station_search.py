@@ -0,0 +1,80 @@
+import sqlite3
+
+import pytest
+
+from footpath_db import DataAccess
+from station_search import SearchIndex, StationSearch
+
+STATIONS = [("Peenya", "Green Line"), ("Peenya Industry", "Green Line"),
+            ("Indiranagar", "Purple Line"), ("Jayanagar", "Green Line"),
+            ("Trinity", "Purple Line")]
+LOCATIONS = [("Concourse", "Peenya"), ("Concourse", "Trinity"),
+             ("Trinity", "Indiranagar"), ("Exit - Peenya Side", "Jayanagar")]
+
+
+@pytest.fixture
+def index():
+    return SearchIndex(STATIONS, LOCATIONS)
+
+
+@pytest.fixture
+def search(metro_db):
+    data = DataAccess(metro_db, pool_size=2)
+    yield StationSearch(data)
+    data.close()
+
+
+def names(matches):
+    return [match.name for match in matches]
+
+
+def test_typo_ranks_the_intended_station_first(index):
+    matches = index.search("indranagar")
+    assert names(matches)[:2] == ["Indiranagar", "Jayanagar"]
+    assert matches[0].score > matches[1].score
+
+
+def test_prefix_outranks_substring_match(index):
+    # both contain "peenya"; the names starting with it come first, shortest first
+    assert names(index.search("peenya")) == ["Peenya", "Peenya Industry", "Exit - Peenya Side"]
+
+
+def test_station_outranks_location_of_the_same_name(index):
+    matches = index.search("trinity")
+    assert [(m.kind, m.name) for m in matches] == [("station", "Trinity"), ("location", "Trinity")]
+    assert matches[1].stations == ["Indiranagar"]
+
+
+def test_location_matches_carry_their_stations_and_lines(index):
+    (match,) = index.search("concourse", kind="location")
+    assert match.stations == ["Peenya", "Trinity"]
+    assert match.lines == ["Green Line", "Purple Line"]
+    assert index.search("concourse", kind="station") == []
+    assert index.search_stations("concourse") == ["Peenya", "Trinity"]
+
+
+def test_unrelated_query_finds_nothing(index):
+    assert index.search("xqzv") == []
+    assert index.search("  ") == []
+
+
+def test_every_line_is_searchable(search):
+    assert names(search.search("yeshwantpr", kind="station")) == ["Yeshwantpur"]
+    assert names(search.search("electronic city")) == ["Electronic City Phase 1",
+                                                       "Electronic City Phase 2"]
+    assert search.search_stations("skywalk to railway")[0] == "Baiyappanahalli"
+    assert sorted(search.lines_of("Majestic (Kempegowda Interchange)")) == ["Green Line",
+                                                                            "Purple Line"]
+
+
+def test_index_is_rebuilt_when_stations_change(search, metro_db):
+    first = search.index()
+    assert search.index() is first
+    conn = sqlite3.connect(metro_db)
+    with conn:
+        conn.execute("UPDATE stations SET station_name = 'Hoodi Circle' "
+                     "WHERE station_name = 'Hoodi';")
+    conn.close()
+    assert search.index() is not first
+    assert names(search.search("hoodi", kind="station"))[0] == "Hoodi Circle"
+    assert "Hoodi" not in names(search.search("hoodi", kind="station"))
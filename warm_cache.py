@@ -0,0 +1,110 @@
+import argparse
+import os
+import pickle
+import sqlite3
+import time
+
+import footpath_db
+import journey_planner
+import route_store
+import station_graph
+import station_search
+from footpath_db import DB_PATH
+
+# =====================================================
+# CONFIG
+# =====================================================
+FORMAT_VERSION = 1
+WARM_CACHE_PATH = os.environ.get("FOOTPATH_WARM_CACHE")   # default: next to the DB
+
+
+def artefact_path(db_path):
+    # metro_footpath.db -> metro_footpath.warm
+    return os.path.splitext(os.path.abspath(db_path))[0] + ".warm"
+
+
+def current_fingerprint(db_path):
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    try:
+        return route_store.fingerprint(conn)
+    finally:
+        conn.close()
+
+
+# =====================================================
+# WARM-START ARTEFACT (everything a worker would build on first use)
+# =====================================================
+# The route store snapshot already covers the routes; this file adds the
+# structures that are built in Python on first use: the trigram search
+# index and the journey network with its landmark distances (~1 s at 10k
+# stations, ~0.15 s to load). Two pickles back to back: a small header
+# checked against the database fingerprint, then the payload. Only ever
+# read from a file this module wrote next to the database.
+def build(db_path=DB_PATH, path=None):
+    path = path or WARM_CACHE_PATH or artefact_path(db_path)
+    db = footpath_db.get_data_access(db_path)
+    engine = station_graph.RouteEngine(db)
+    engine.store()                      # builds the .routes snapshot if stale
+    planner = journey_planner.JourneyPlanner(db, engine)
+    network, platforms = planner.state()
+    header = {"format": FORMAT_VERSION, "fingerprint": current_fingerprint(db_path),
+              "num_landmarks": planner.num_landmarks}
+    payload = {"search": station_search.StationSearch(db).index(),
+               "network": network, "platforms": platforms}
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return path
+
+
+def load(db_path=DB_PATH, path=None):
+    # (header, payload), or None when missing, unreadable or stale
+    path = path or WARM_CACHE_PATH or artefact_path(db_path)
+    try:
+        with open(path, "rb") as f:
+            header = pickle.load(f)
+            if (header.get("format") != FORMAT_VERSION
+                    or header.get("fingerprint") != current_fingerprint(db_path)):
+                return None
+            return header, pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        return None
+
+
+def warm(data_access, route_engine=None, search=None, planner=None, path=None):
+    # seed a process's caches from the artefact; anything it cannot supply
+    # is simply built lazily as before. True if the artefact was used.
+    if route_engine is not None:
+        route_engine.store()            # map the shared snapshot up front
+    if search is None and planner is None:
+        return False
+    loaded = load(data_access.db_path, path)
+    if loaded is None:
+        return False
+    header, payload = loaded
+    if search is not None:
+        search.warm_start(payload["search"])
+    if planner is not None and header["num_landmarks"] == planner.num_landmarks:
+        planner.warm_start(payload["network"], payload["platforms"])
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the warm-start cache artefact for workers.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    path = build(args.db, args.out)
+    t1 = time.perf_counter()
+    load(args.db, path)
+    t2 = time.perf_counter()
+    print(f"✅ {path} ({os.path.getsize(path) / 1024:.0f} KB); "
+          f"built in {t1 - t0:.2f} s, loads in {(t2 - t1) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()